@@ -0,0 +1,112 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# The action that creates an artifact.
+#
+# By default ('touch'), each build process creates an artifact with
+# 'touch', so a full build measures little beyond the cost of starting
+# a process for each artifact.  With '--action simulate', each build
+# process instead runs a shim, written at the root of the source tree,
+# that does the work of a compiler in proportion to the module's
+# size:
+#
+#   . it reads the module's source and every interface it imports,
+#     computing a digest of them --action-passes times, and
+#   . it writes an artifact holding the digest and a copy of the
+#     source, so the artifact has content and grows with the source.
+#
+# With '--depfile', the imported interfaces are not named in the
+# build file; the shim is given the dependency file written by the
+# scanner instead, and reads the interfaces it lists, so the work is
+# the same with and without '--depfile'.
+#
+# The sizes are those of the files, chosen when the modules were
+# generated (Module.random_file_length()).  The artifact is written
+# under a temporary name, so an interrupted action leaves no artifact.
+
+import os
+
+import buildtool
+
+TOUCH    = "touch"
+SIMULATE = "simulate"
+ACTIONS  = [ TOUCH, SIMULATE ]
+SCRIPT   = "action.sh"
+
+
+def script_path(src_root, kind):
+    # The shim run by actions of 'kind', or None if artifacts are
+    # touched.
+    assert(kind in ACTIONS)
+    if kind == TOUCH:
+        return None
+    return os.path.join(os.path.normpath(src_root), SCRIPT)
+
+
+def command(script, target, inputs, depfile = None):
+    # The shell command that creates 'target' from 'inputs', the
+    # source first, and the interfaces listed in 'depfile', if any.
+    # The arguments may be build tool variables.
+    if script is None:
+        return "touch %s" % (target)
+    if depfile is None:
+        return "%s %s %s" % (script, target, inputs)
+    return "%s --depfile %s %s %s" % (script, depfile, target, inputs)
+
+
+class Shim(buildtool.BuildTool):
+    # Written as a build system is, so the script is recorded in the
+    # manifest.  It refers to no module.
+    def __init__(self, src_root, modules, passes):
+        super(Shim, self).__init__(modules)
+        assert(passes >= 1)
+        self.pathname_ = script_path(src_root, SIMULATE)
+        self.passes_   = passes
+
+    def begin(self):
+        with self.open_output(self.pathname_, executable = True) as fp:
+            fp.write("#!/bin/bash\n"
+                     "# Usage: %s [--depfile <depfile>] <artifact> <source> "
+                     "[<interface> ...]\n"
+                     "set -o nounset;\n"
+                     "set -o errexit;\n"
+                     "set -o pipefail;\n\n"
+                     "depfile=\"\";\n"
+                     "if [ \"${1}\" == \"--depfile\" ] ; then\n"
+                     "    depfile=\"${2}\";\n"
+                     "    shift 2;\n"
+                     "fi;\n\n"
+                     "target=\"${1}\";\n"
+                     "source=\"${2}\";\n"
+                     "shift 1;\n\n"
+                     "# The depfile lists the interfaces after the target,\n"
+                     "# one to a continued line.\n"
+                     "if [ -n \"${depfile}\" ] ; then\n"
+                     "    deps=( $(< \"${depfile}\") );\n"
+                     "    for d in \"${deps[@]:1}\" ; do\n"
+                     "        if [ \"${d}\" != \"\\\\\" ] ; then\n"
+                     "            set -- \"${@}\" \"${d}\";\n"
+                     "        fi;\n"
+                     "    done;\n"
+                     "fi;\n\n"
+                     "# Each pass reads every input.\n"
+                     "inputs=( );\n"
+                     "for (( p = 0; p < %d; p++ )) ; do\n"
+                     "    inputs+=( \"${@}\" );\n"
+                     "done;\n\n"
+                     "{\n"
+                     "    md5sum \"${inputs[@]}\" | md5sum;\n"
+                     "    cat \"${source}\";\n"
+                     "} > \"${target}.tmp\";\n"
+                     "mv \"${target}.tmp\" \"${target}\";\n" %
+                     (SCRIPT, self.passes_))
+
+    def add_module(self, m):
+        pass
+
+
+def create(verbose, src_root, files_per_dir, modules, passes):
+    assert(isinstance(verbose, bool))
+
+    return Shim(src_root, modules, passes)
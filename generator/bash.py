@@ -4,38 +4,78 @@
 
 import os
 
+import action
 import buildtool
-import stat
 import utility
 
+# The commands shared by the Bash scripts (bash.py, pbash.py and
+# mbash.py).
+
+def prolog(fp):
+    fp.write("#!/bin/bash\n"
+             "set -o nounset;\n"
+             "\n\n")
+
+    fp.write("BOD=${BPC_BOD:?\"BPC_BOD is not set.\"};\n"
+             "if [ ! -z ${BPC_VERBOSE:-\"\"} ] ; then\n"
+             "    VERBOSE=t;\n"
+             "fi;\n\n")
+
+
+def make_directories(fp, artifact_dirs):
+    # Make all the directories, iff they are not already present.
+    fp.write("# Create artifact directories.\n")
+    for ad in artifact_dirs:
+        ad = "${BOD}/%s" % (ad)
+        fp.write("[ -d \"%s\" ] || mkdir --parents \"%s\";\n" % (ad, ad))
+
+
+def artifact_action(action_script, m):
+    # The command creating the artifact of 'm'.
+    inputs = "\"%s\"" % (m.source_)
+    for imp in m.imports_:
+        inputs += " \"%s\"" % (imp.interface_)
+    return action.command(action_script, "\"${BOD}/%s\"" % (m.artifact_),
+                          inputs)
+
+
+def out_of_date_tests(m):
+    # The tests, any of which is true if the artifact of 'm' is out of
+    # date.
+    tests = [ "[ ! -f \"${BOD}/%s\" ]" % (m.artifact_),
+              "[ \"${BOD}/%s\" -ot \"%s\" ]" % (m.artifact_, m.source_),
+              "[ \"${BOD}/%s\" -ot \"%s\" ]" % (m.artifact_, m.interface_) ]
+    for imp in m.imports_:
+        tests.append("[ \"${BOD}/%s\" -ot \"%s\" ]" % (m.artifact_,
+                                                        imp.interface_))
+    return tests
+
+
+def create_artifact(fp, m, action_script):
+    fp.write("\n%s \\"
+             "\n&& %s \\"
+             "\n&& [ ! -z \"${VERBOSE:-}\" ] \\"
+             "\n&& builtin echo \"Creating '${BOD}/%s'\";\n" %
+             (" \\\n|| ".join(out_of_date_tests(m)),
+              artifact_action(action_script, m), m.artifact_))
+
+
 class Script(buildtool.BuildTool):
-    def __init__(self, src_root, n_modules, files_per_dir):
-        super(Script, self).__init__()
+    def __init__(self, src_root, modules, files_per_dir, action_script):
+        super(Script, self).__init__(modules)
         self.pathname_          = os.path.join(src_root, "build.sh")
         self.bash_dir_          = os.path.join(src_root, "bash")
         self.rela_artifact_dir_ = None
         self.src_root_          = src_root
-        self.n_modules_         = n_modules
         self.files_per_dir_     = files_per_dir
+        self.n_files_per_snippet_ = 100
+        self.snippet_fp_        = None
+        self.snippet_pathname_  = None
+        self.action_script_     = action_script # None: touch.
 
     def set_rela_artifact_dir(self, rela_dir):
         self.rela_artifact_dir_ = rela_dir
 
-    def set_execute(self, pathname):
-        os.chmod(pathname, (stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR |
-                            stat.S_IRGRP | stat.S_IXGRP |
-                            stat.S_IROTH | stat.S_IXOTH))
-
-    def prolog(self, fp):
-        fp.write("#!/bin/bash\n"
-                 "set -o nounset;\n"
-                 "\n\n")
-
-        fp.write("BOD=${BPC_BOD:?\"BPC_BOD is not set.\"};\n"
-                 "if [ ! -z ${BPC_VERBOSE:-\"\"} ] ; then\n"
-                 "    VERBOSE=t;\n"
-                 "fi;\n\n")
-
     def artifact_script(self, file_num):
         assert(isinstance(file_num, int));
         return os.path.join(self.bash_dir_, "artifacts_%d.sh" % (file_num))
@@ -44,79 +84,57 @@ class Script(buildtool.BuildTool):
         fp.write("\nexec \"%s\";\n" % self.artifact_script(file_number))
 
     def create_directories(self, pathname, artifact_file_number):
-        # Gather directories of all artifacts into a set to remove
-        # duplicates.
-        artifact_dir = set()
-        for m in self.modules_:
-            artifact_dir.add(os.path.dirname(m.artifact_))
-
-        with open(pathname, "w") as fp:
-            # Make all the directories, iff they are not already present.
-            self.prolog(fp)
-            fp.write("# Create artifact directories.\n")
-            for ad in sorted(artifact_dir):
-                ad = "${BOD}/%s" % (ad)
-                fp.write("[ -d \"%s\" ] || mkdir --parents \"%s\";\n" % (ad, ad))
-
+        with self.open_output(pathname, executable = True) as fp:
+            prolog(fp)
+            make_directories(fp, self.artifact_dirs())
             fp.write("\n")
 
             self.chain_script(fp, artifact_file_number)
 
-            self.set_execute(pathname)
-
-    def create_artifact(self, fp, m):
-        fp.write("\n"
-                 "[ ! -f \"${BOD}/%s\" ] \\\n"
-                 "|| [ \"${BOD}/%s\" -ot \"%s\" ] \\\n"
-                 "|| [ \"${BOD}/%s\" -ot \"%s\" ] \\" %
-                 (m.artifact_,
-                  m.artifact_, m.source_,
-                  m.artifact_, m.interface_))
-        for imp in m.imports_:
-            fp.write("\n"
-                     "|| [ \"${BOD}/%s\" -ot \"%s\" ] \\" % (m.artifact_,
-                                                             imp.interface_))
-        fp.write("\n&& touch \"${BOD}/%s\" \\"
-                 "\n&& [ ! -z \"${VERBOSE:-}\" ] \\"
-                 "\n&& builtin echo \"Creating '${BOD}/%s'\";\n" %
-                 (m.artifact_, m.artifact_))
-
-    def create_artifacts(self, fp):
-        n_files_per_snippet = 100
-        for script_idx  in range(0, len(self.modules_), n_files_per_snippet):
-            pathname = self.artifact_script(script_idx)
-            with open(pathname, "w") as fp:
-                self.prolog(fp)
-                offset = 0;
-                while (offset < 100 and
-                       script_idx + offset < len(self.modules_)):
-                    m = self.modules_[script_idx + offset]
-                    self.create_artifact(fp, m)
-                    offset = offset + 1
-                if script_idx + n_files_per_snippet < len(self.modules_):
-                    self.chain_script(fp, script_idx + n_files_per_snippet)
-                self.set_execute(pathname)
-
-    def write(self):
+    def begin_snippet(self, script_idx):
+        self.snippet_pathname_ = self.artifact_script(script_idx)
+        self.snippet_fp_       = self.open_output(self.snippet_pathname_,
+                                                  executable = True)
+        prolog(self.snippet_fp_)
+
+    def end_snippet(self, script_idx):
+        # Chain to the script for the next set of modules, if any.
+        next_idx = script_idx + self.n_files_per_snippet_
+        if next_idx < self.n_modules_:
+            self.chain_script(self.snippet_fp_, next_idx)
+        self.snippet_fp_.close()
+        self.snippet_fp_ = None
+
+    def begin(self):
         utility.mkdir(os.path.dirname(self.pathname_))
         utility.mkdir(self.bash_dir_)
 
-        with open(self.pathname_, "w") as fp:
-            self.prolog(fp)
+        with self.open_output(self.pathname_, executable = True) as fp:
+            prolog(fp)
             pathname = os.path.join(self.bash_dir_, "create_directories.sh")
             fp.write("exec \"%s\"" % (pathname))
             self.create_directories(pathname, 0)
-            self.create_artifacts(fp)
             fp.write("\n");
-            self.set_execute(self.pathname_)
 
+    def add_module(self, m):
+        # Each artifact script creates the artifacts of
+        # n_files_per_snippet_ modules.
+        offset     = m.module_num_ % self.n_files_per_snippet_
+        script_idx = m.module_num_ - offset
+        if offset == 0:
+            self.begin_snippet(script_idx)
+        create_artifact(self.snippet_fp_, m, self.action_script_)
+        if (offset == self.n_files_per_snippet_ - 1 or
+            m.module_num_ == self.n_modules_ - 1):
+            self.end_snippet(script_idx)
 
-def create(verbose, src_root, files_per_dir, modules):
-    assert(isinstance(verbose, bool))
+    def end(self):
+        assert(self.snippet_fp_ is None)
 
-    n_modules     = len(modules)
-    script = Script(src_root, n_modules, files_per_dir)
-    for m in modules:
-        script.add_module(m)
 
-    return script
+def create(verbose, src_root, files_per_dir, modules,
+           action_kind = action.TOUCH):
+    assert(isinstance(verbose, bool))
+
+    return Script(src_root, modules, files_per_dir,
+                  action.script_path(src_root, action_kind))
@@ -4,55 +4,63 @@
 
 import os
 
+import action
 import buildtool
-import utility
 
 class Builder(buildtool.BuildTool):
-    def __init__(self, src_root, n_modules, files_per_dir):
-        super(Builder, self).__init__()
-        self.rela_artifact_dir_ = None
-        self.n_modules_         = n_modules
-        self.files_per_dir_     = files_per_dir
-        self.src_root_          = src_root
-        self.bod_               = os.environ["BPC_BOD"]
-
-    # def set_rela_artifact_dir(self, rela_dir):
-    #     self.rela_artifact_dir_ = rela_dir
+    def __init__(self, src_root, modules, action_script):
+        super(Builder, self).__init__(modules)
+        self.src_root_      = src_root
+        self.action_script_ = action_script # None: touch.
 
     def write_workspace(self):
         workspace = os.path.join(self.src_root_, "WORKSPACE")
-        with open(workspace, "w") as fp:
+        with self.open_output(workspace) as fp:
             fp.write("\n")
 
     def write_artifact_bzl(self):
+        # The action's shim is a tool of the genrule, so Bazel makes
+        # it available to the action.
+        if self.action_script_ is None:
+            cmd   = "touch $@"
+            tools = ""
+        else:
+            label = "//:%s" % (os.path.basename(self.action_script_))
+            cmd   = action.command("$(location %s)" % (label),
+                                   "$@", "$(SRCS)")
+            tools = "\n        tools = [\"%s\"]," % (label)
+
         artifact = os.path.join(self.src_root_, "artifact.bzl")
-        with open(artifact, "w") as fp:
+        with self.open_output(artifact) as fp:
             fp.write("""
 def artifact(name, srcs, **kwargs):
     native.genrule(
         name = name,
         srcs = srcs,
         outs = [name + ".artifact"],
-        cmd = "touch $@",
+        cmd = "%s",%s
         **kwargs
-    )""")
+    )""" % (cmd, tools))
 
         # For 'Bazel reasons', there needs to be BUILD.bazel file
         # here, too.  It's for the bzl file.  It doesn't need anything
-        # in it, however.
+        # in it, however, unless it exports the action's shim.
 
         build = os.path.join(self.src_root_, "BUILD.bazel")
-        with open(build, "w") as fp:
+        with self.open_output(build) as fp:
+            if self.action_script_ is not None:
+                fp.write("exports_files([\"%s\"])" %
+                         (os.path.basename(self.action_script_)))
             fp.write("\n")
 
     def write_interface_empty(self):
         artifact = os.path.join(self.src_root_, "interface", "BUILD.bazel")
-        with open(artifact, "w") as fp:
+        with self.open_output(artifact) as fp:
             fp.write("\n")
 
     def get_interface_export_pathname(self, dir_num):
         return os.path.join(self.src_root_, "interface",
-                            str(dir_num), "BUILD.bazel")
+                            self.graph_.dir_path(dir_num), "BUILD.bazel")
 
     def write_exports_files(self, fp, residual, start_index, n_files):
         fp.write("# residual: %s  start: %d  n_files: %d\n" %
@@ -63,58 +71,50 @@ def artifact(name, srcs, **kwargs):
             fp.write("   \"m%d.interface\",\n" % (start_index + j))
         fp.write("])")
 
-    def write_interface_exports(self):
-        # Each interface file in the corresponding directory.
-        for i in range(0, self.n_modules_, self.files_per_dir_):
-            fname = self.get_interface_export_pathname(i // self.files_per_dir_)
-            with open(fname, "w") as fp:
-                self.write_exports_files(fp, False, i, self.files_per_dir_)
-        # Get residual files in last directory.
-        n_residual = self.n_modules_ % self.files_per_dir_
-        if n_residual == 0:
-            # Last directory is full, not partially full.
-            n_residual = self.files_per_dir_
-        fname = self.get_interface_export_pathname(i // self.files_per_dir_)
-        with open(fname, "w") as fp:
-            self.write_exports_files(fp, True, i, n_residual)
-
-
-    def write_file_rules(self):
+    def write_interface_exports(self, modules):
+        # Each interface file in the corresponding directory.  The last
+        # directory may be only partially full.
+        lo    = modules[0].module_num_
+        fname = self.get_interface_export_pathname(modules[0].dir_num())
+        with self.open_output(fname) as fp:
+            self.write_exports_files(fp, lo + len(modules) == self.n_modules_,
+                                     lo, len(modules))
+
+    def write_file_rules(self, modules):
         # Each source file in the corresponding directory.
         # artifact(<source-name>, [prerequi-list])
-        for m in self.modules_:
-            fname = os.path.join(os.path.dirname(m.source_), "BUILD.bazel")
-            if not os.path.exists(fname):
-                # Load the 'artifact' file
-                with open(fname, "a") as fp:
-                    fp.write("load(\"//:artifact.bzl\", \"artifact\")\n\n")
-
-            with open(fname, "a") as fp:
+        fname = os.path.join(os.path.dirname(modules[0].source_),
+                             "BUILD.bazel")
+        with self.open_output(fname) as fp:
+            # Load the 'artifact' file
+            fp.write("load(\"//:artifact.bzl\", \"artifact\")\n\n")
+            for m in modules:
                 fp.write("artifact(\"m%s\",\n"
                          "         [ \"%s\",\n" %
                          (str(m.module_num_),
                           os.path.basename(m.source_)))
                 for imp in m.imports_:
-                    dir_name = os.path.dirname(imp.interface_)
-                    dir_num  = os.path.basename(dir_name)
+                    # The package is the interface directory, which
+                    # may be nested.
+                    package = self.graph_.dir_path(imp.dir_num())
                     fp.write("           \"//interface/%s:%s\",\n" %
-                             (dir_num, os.path.basename(imp.interface_)))
+                             (package, os.path.basename(imp.interface_)))
                 fp.write("         ])\n")
 
-    def write(self):
+    def begin(self):
         self.write_workspace()
         self.write_artifact_bzl()
         self.write_interface_empty()
-        self.write_interface_exports()
-        self.write_file_rules()
 
-def create(verbose, src_root, files_per_dir, modules):
-    assert(isinstance(verbose, bool))
-
-    n_modules  = len(modules)
-    builder = Builder(src_root, n_modules, files_per_dir)
+    def write_directory(self, modules):
+        # Each BUILD.bazel file is written once, when all the modules
+        # of its directory are known.
+        self.write_file_rules(modules)
+        self.write_interface_exports(modules)
 
-    for m in modules:
-        builder.add_module(m)
+def create(verbose, src_root, files_per_dir, modules,
+           action_kind = action.TOUCH):
+    assert(isinstance(verbose, bool))
 
-    return builder
+    return Builder(src_root, modules,
+                   action.script_path(src_root, action_kind))
@@ -7,6 +7,18 @@ import inspect
 import module
 
 class BuildTool(object):
+    # A BuildTool writes a build process as modules are streamed to
+    # it: begin() is called once, then add_module() once for each
+    # module, in module number order, and finally end().
+    #
+    # Module-level data is not retained.  Anything needed for all
+    # modules (such as an 'all' target) is recomputed from the module
+    # layout by end().  By default, add_module() collects the modules
+    # of one directory and passes them to write_directory() when the
+    # directory is complete.
+    #
+    # Files are written with open_output(), which records them in the
+    # generation manifest.
     def _fatal(self, msg):
         raise Exception(msg)
 
@@ -15,13 +27,56 @@ class BuildTool(object):
         caller_name = inspect.stack()[1][3]
         return caller_name
 
-    def __init__(self):
-        self.modules_   = [ ]
+    def __init__(self, modules):
+        assert(isinstance(modules, module.Layout))
+        self.graph_       = modules
+        self.n_modules_   = len(modules)
+        self.dir_modules_ = [ ]
+        self.manifest_    = None
+
+    def set_manifest(self, manifest):
+        self.manifest_ = manifest
+
+    def open_output(self, pathname, executable = False, binary = False):
+        assert(self.manifest_ is not None)
+        return self.manifest_.open(pathname, executable, binary)
+
+    def artifact_dirs(self):
+        # The artifact directory, relative to the BOD, of each module
+        # directory.
+        for d in range(0, self.graph_.n_dirs()):
+            yield self.graph_.rela_artifact_dir(d)
+
+    def artifacts(self):
+        # The artifact, relative to the BOD, of each module.
+        for n in range(0, self.n_modules_):
+            yield self.graph_.artifact_path(n)
+
+    def begin(self):
+        pass
 
     def add_module(self, m):
         assert(isinstance(m, module.Module))
-        self.modules_.append(m)
+        if (len(self.dir_modules_) > 0 and
+            self.dir_modules_[0].dir_num() != m.dir_num()):
+            self.end_directory()
+        self.dir_modules_.append(m)
 
-    def write(self):
+    def end_directory(self):
+        if len(self.dir_modules_) > 0:
+            self.write_directory(self.dir_modules_)
+            self.dir_modules_ = [ ]
+
+    def write_directory(self, modules):
         self._fatal("%s.%s must be implemented" % (type(self),
                                                    self._get_function_name()))
+
+    def end(self):
+        self.end_directory()
+
+    def write(self):
+        # Write the whole build process in one pass over the modules.
+        self.begin()
+        for m in self.graph_:
+            self.add_module(m)
+        self.end()
@@ -0,0 +1,91 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# Discovered dependencies.
+#
+# With --depfile, the Ninja and Make build processes do not declare
+# the imports of each module.  Instead, the action that creates an
+# artifact scans the module's source for its imports, as a compiler
+# scans a source file for the headers it includes, and writes them to
+# a depfile ('<artifact>.d') that the build tool reads: Ninja through
+# 'deps = gcc', and Make through '-include'.
+#
+# The scanner is an awk script written at the root of the source
+# tree.  It maps each imported interface name to its path as the
+# module Layout does.  The artifact is then created by the action
+# (see action.py), from the source alone.
+
+import os
+
+import action
+import buildtool
+
+SCRIPT = "depfile.awk"
+
+
+def script_path(src_root):
+    return os.path.join(os.path.normpath(src_root), SCRIPT)
+
+
+def command(script, target, source, action_script = None):
+    # The shell command that writes the depfile of 'target' and then
+    # creates 'target', the action reading the interfaces listed in
+    # the depfile.  The arguments may be build tool variables.
+    depfile = "%s.d" % (target)
+    return ("awk -v target=%s -f %s %s > %s && %s" %
+            (target, script, source, depfile,
+             action.command(action_script, target, source, depfile)))
+
+
+class Scanner(buildtool.BuildTool):
+    # Written as a build system is, so the script is recorded in the
+    # manifest.  It refers only to the layout of the modules.
+    def __init__(self, src_root, modules):
+        super(Scanner, self).__init__(modules)
+        self.pathname_ = script_path(src_root)
+
+    def write_dirs(self, fp):
+        # The path of each directory, when it is not its number.
+        for d in range(0, self.graph_.n_dirs()):
+            path = self.graph_.dir_path(d)
+            if path != str(d):
+                fp.write("    dirs[%d] = \"%s\";\n" % (d, path))
+
+    def begin(self):
+        with self.open_output(self.pathname_) as fp:
+            fp.write("# Writes the depfile of 'target': the interfaces "
+                     "imported by the\n"
+                     "# source read, from its leading import lines.\n"
+                     "function dir(n,    d) {\n"
+                     "    d = int(n / fpd);\n"
+                     "    return (d in dirs) ? dirs[d] : d;\n"
+                     "}\n\n"
+                     "BEGIN {\n"
+                     "    incl = \"%s\";\n"
+                     "    fpd  = %d;\n" % (self.graph_.incl_dir_,
+                                            self.graph_.files_per_dir_))
+            self.write_dirs(fp)
+            fp.write("    printf(\"%s:\", target);\n"
+                     "}\n\n"
+                     "/^import \"m[0-9]+\\.interface\"$/ {\n"
+                     "    name = substr($0, 9, length($0) - 9);\n"
+                     "    printf(\" \\\\\\n  %s/%s/%s\", incl, "
+                     "dir(substr(name, 2) + 0), name);\n"
+                     "    next;\n"
+                     "}\n\n"
+                     "{\n"
+                     "    exit;\n"
+                     "}\n\n"
+                     "END {\n"
+                     "    printf(\"\\n\");\n"
+                     "}\n")
+
+    def add_module(self, m):
+        pass
+
+
+def create(verbose, src_root, files_per_dir, modules):
+    assert(isinstance(verbose, bool))
+
+    return Scanner(src_root, modules)
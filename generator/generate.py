@@ -4,20 +4,37 @@
 # Licensed under Gnu GPL V3.
 
 import argparse
+import cProfile
+import json
+import multiprocessing
 import os
-import random
+import resource
 import sys
 
+import graphindex
+import importer
+import manifest
 import module
+import payload
+import profiling
+import topology
 import utility
+import version
 
 # Build process creators.
+import action                   # Action shim for --action simulate.
 import bash                     # Bash shell script.
 import bazel                    # Bazel files.
+import mbash                    # Bash shell script reading times once.
+import depfile                  # Import scanner for --depfile.
 import ninja                    # Ninja files.
+import pbash                    # Parallel Bash shell script.
+import pmakefile                # Single Makefile of static pattern rules.
 import rmakefile                # Recursive Makefile.
 import scons                    # Scons
 import smakefile                # Single Makefile.
+import sscons                   # Scons files split by directory.
+import subninja                 # Ninja files split by directory.
 
 
 def configure_parser():
@@ -33,6 +50,86 @@ def configure_parser():
                                         description     = description,
                                         prog            = "generate.py")
 
+    parser.add_argument("--action",
+                        help     = ("The action creating each artifact.  "
+                                    "'touch' creates an empty artifact; "
+                                    "'simulate' runs a shim that reads the "
+                                    "module's source and imported "
+                                    "interfaces, and writes an artifact "
+                                    "in proportion to the source "
+                                    "[default: %(default)s]."),
+                        required = False,
+                        default  = action.TOUCH,
+                        choices  = action.ACTIONS,
+                        action   = "store",
+                        dest     = "arg_action")
+
+    parser.add_argument("--action-passes",
+                        help     = ("Number of times the 'simulate' "
+                                    "action computes a digest of its "
+                                    "inputs, so its CPU time grows with "
+                                    "the inputs' size "
+                                    "[default: %(default)s]."),
+                        required = False,
+                        default  = 1,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_action_passes")
+
+    parser.add_argument("--density",
+                        help     = ("Fraction of the --max-imports import "
+                                    "slots each module uses, on average "
+                                    "[default: %(default)s]."),
+                        required = False,
+                        default  = 1.0,
+                        action   = "store",
+                        type     = float,
+                        dest     = "arg_density")
+
+    parser.add_argument("--cprofile",
+                        help     = ("Run the generator under cProfile, and "
+                                    "write the statistics to this file, "
+                                    "for use with pstats."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_cprofile")
+
+    parser.add_argument("--depfile",
+                        help     = ("Do not declare the imports of each "
+                                    "module in the Ninja and Make build "
+                                    "processes.  Instead, the action "
+                                    "creating an artifact writes a depfile "
+                                    "of the interfaces its module imports, "
+                                    "which the build tool reads."),
+                        required = False,
+                        default  = False,
+                        action   = "store_true",
+                        dest     = "arg_depfile")
+
+    parser.add_argument("--dir-depth",
+                        help     = ("Number of directory levels holding "
+                                    "each module directory.  Beyond the "
+                                    "first level, module directories are "
+                                    "nested under parents chosen by a hash "
+                                    "of the directory, from --fanout names "
+                                    "at each level [default: %(default)s]."),
+                        required = False,
+                        default  = 1,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_dir_depth")
+
+    parser.add_argument("--fanout",
+                        help     = ("Number of subdirectories of each "
+                                    "parent directory, when --dir-depth is "
+                                    "greater than 1 [default: %(default)s]."),
+                        required = False,
+                        default  = module.DEFAULT_FANOUT,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_fanout")
+
     parser.add_argument("--files-per-dir",
                         help     = ("Max number of files that can be "
                                     "written to a directory.  If this "
@@ -45,6 +142,54 @@ def configure_parser():
                         type     = int,
                         dest     = "arg_n_files_per_dir")
 
+    parser.add_argument("--import-graph",
+                        help     = ("Generate modules replicating an "
+                                    "existing dependency graph, given as "
+                                    "FORMAT:PATH, where FORMAT is one of "
+                                    "%s.  The number of modules and their "
+                                    "imports and sizes are taken from the "
+                                    "graph; --modules, --topology, "
+                                    "--max-imports and --density are "
+                                    "ignored." %
+                                    (", ".join(sorted(importer.FORMATS)))),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_import_graph")
+
+    parser.add_argument("--incremental",
+                        help     = ("Update an existing tree, using the "
+                                    "manifest of the generation that wrote "
+                                    "it.  Only files whose content differs "
+                                    "are rewritten, and files no longer "
+                                    "generated are removed."),
+                        required = False,
+                        default  = False,
+                        action   = "store_true",
+                        dest     = "arg_incremental")
+
+    parser.add_argument("--jobs",
+                        help     = ("Number of processes used to write "
+                                    "the source modules and build "
+                                    "systems.  Modules are divided among "
+                                    "the processes by directory; each "
+                                    "build system is written by one "
+                                    "process [default: %(default)s]."),
+                        required = False,
+                        default  = 1,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_jobs")
+
+    parser.add_argument("--max-imports",
+                        help     = ("Max number of modules imported by "
+                                    "each module [default: %(default)s]."),
+                        required = False,
+                        default  = 25,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_max_imports")
+
     parser.add_argument("--modules",
                         help     = ("Number of modules that should be "
                                     "created [default: %(default)s modules]."),
@@ -54,6 +199,43 @@ def configure_parser():
                         type     = int,
                         dest     = "arg_n_modules")
 
+    parser.add_argument("--payload",
+                        help     = ("Method used to fill the source "
+                                    "modules to their selected size.  "
+                                    "'template' and 'zeros' produce "
+                                    "identical content; 'reflink' pads "
+                                    "headers to a block boundary; 'sparse' "
+                                    "files read as NUL bytes; 'random' "
+                                    "content is incompressible "
+                                    "[default: %(default)s]."),
+                        required = False,
+                        default  = "template",
+                        choices  = sorted(payload.STRATEGIES.keys()),
+                        action   = "store",
+                        dest     = "arg_payload")
+
+    parser.add_argument("--profile",
+                        help     = ("Print the wall time, CPU time and "
+                                    "peak traced memory of each stage of "
+                                    "the generation: sampling the graph, "
+                                    "writing the module files, and "
+                                    "writing each build system.  Tracing "
+                                    "memory slows the generation."),
+                        required = False,
+                        default  = False,
+                        action   = "store_true",
+                        dest     = "arg_profile")
+
+    parser.add_argument("--profile-output",
+                        help     = ("Write the time of each stage, and the "
+                                    "largest resident size, to this file, "
+                                    "as JSON.  The peak memory of each "
+                                    "stage is traced only with --profile."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_profile_output")
+
     parser.add_argument("--root",
                         help     = ("Root where source files will be created."),
                         required = True,
@@ -66,8 +248,25 @@ def configure_parser():
                         required = False,
                         default  = 0x19671116,
                         action   = "store",
+                        type     = lambda v: int(v, 0),
                         dest     = "arg_seed")
 
+    parser.add_argument("--topology",
+                        help     = ("Shape of the module dependency graph.  "
+                                    "'uniform' imports from all lower "
+                                    "modules equally; 'layered' imports "
+                                    "from the layer of modules directly "
+                                    "below; 'power-law' concentrates "
+                                    "imports on a few hub modules; "
+                                    "'clustered' imports mostly from the "
+                                    "module's own directory "
+                                    "[default: %(default)s]."),
+                        required = False,
+                        default  = "uniform",
+                        choices  = sorted(topology.MODELS.keys()),
+                        action   = "store",
+                        dest     = "arg_topology")
+
     parser.add_argument("--verbose",
                         help     = ("Cause build process to not be silent."),
                         required = False,
@@ -82,87 +281,440 @@ def configure_parser():
     return parser
 
 
-def get_options():
+def get_options(args = None):
+    # 'args' defaults to the command line.
     parser  = configure_parser()
-    options = parser.parse_args()
+    options = parser.parse_args(args)
 
     options.interface_    = os.path.join(options.arg_root, "interface")
     options.source_       = os.path.join(options.arg_root, "source")
-    options.max_imports   = 25
     options.build_systems = [ ]
 
+    if not (0.0 <= options.arg_density and options.arg_density <= 1.0):
+        parser.error("--density must be between 0 and 1")
+    if options.arg_max_imports < 0:
+        parser.error("--max-imports must not be negative")
+    if options.arg_dir_depth < 1:
+        parser.error("--dir-depth must be at least 1")
+    if options.arg_fanout < 1:
+        parser.error("--fanout must be at least 1")
+    if options.arg_action_passes < 1:
+        parser.error("--action-passes must be at least 1")
+
+    options.topology_ = topology.create(options.arg_topology,
+                                        options.arg_n_modules,
+                                        options.arg_n_files_per_dir,
+                                        options.arg_max_imports,
+                                        options.arg_density)
+
     return options
 
 
 def recursive_make(options, modules):
     m = rmakefile.create(options.arg_verbose, options.arg_root,
-                         options.arg_n_files_per_dir, modules)
+                         options.arg_n_files_per_dir, modules,
+                         options.arg_depfile, options.arg_action)
     assert(isinstance(m, rmakefile.RootMakefile))
     return m
 
 
 def single_make(options, modules):
     m = smakefile.create(options.arg_verbose, options.arg_root,
-                         options.arg_n_files_per_dir, modules)
+                         options.arg_n_files_per_dir, modules,
+                         options.arg_depfile, options.arg_action)
     assert(isinstance(m, smakefile.RootMakefile))
     return m
 
 
+def pattern_make(options, modules):
+    m = pmakefile.create(options.arg_verbose, options.arg_root,
+                         options.arg_n_files_per_dir, modules,
+                         options.arg_depfile, options.arg_action)
+    assert(isinstance(m, pmakefile.Makefile))
+    return m
+
+
 def bash_script(options, modules):
     m = bash.create(options.arg_verbose, options.arg_root,
-                    options.arg_n_files_per_dir, modules)
+                    options.arg_n_files_per_dir, modules,
+                    options.arg_action)
     assert(isinstance(m, bash.Script))
     return m
 
 
+def parallel_bash_script(options, modules):
+    m = pbash.create(options.arg_verbose, options.arg_root,
+                     options.arg_n_files_per_dir, modules,
+                     options.arg_action)
+    assert(isinstance(m, pbash.Script))
+    return m
+
+
+def mtime_bash_script(options, modules):
+    m = mbash.create(options.arg_verbose, options.arg_root,
+                     options.arg_n_files_per_dir, modules,
+                     options.arg_action)
+    assert(isinstance(m, mbash.Script))
+    return m
+
+
 def single_ninja(options, modules):
     m = ninja.create(options.arg_verbose, options.arg_root,
-                     options.arg_n_files_per_dir, modules)
+                     options.arg_n_files_per_dir, modules,
+                     options.arg_depfile, options.arg_action)
     assert(isinstance(m, ninja.RootNinja))
     return m
 
 
+def split_ninja(options, modules):
+    m = subninja.create(options.arg_verbose, options.arg_root,
+                        options.arg_n_files_per_dir, modules,
+                        options.arg_depfile, options.arg_action)
+    assert(isinstance(m, subninja.RootNinja))
+    return m
+
+
 def scons_script(options, modules):
     m = scons.create(options.arg_verbose, options.arg_root,
-                    options.arg_n_files_per_dir, modules)
+                    options.arg_n_files_per_dir, modules,
+                    options.arg_action)
     assert(isinstance(m, scons.SConstruct))
     return m
 
 
+def split_scons_script(options, modules):
+    m = sscons.create(options.arg_verbose, options.arg_root,
+                      options.arg_n_files_per_dir, modules,
+                      options.arg_action)
+    assert(isinstance(m, sscons.SConscript))
+    return m
+
+
 def bazel_script(options, modules):
     m = bazel.create(options.arg_verbose, options.arg_root,
-                    options.arg_n_files_per_dir, modules)
+                    options.arg_n_files_per_dir, modules,
+                    options.arg_action)
     assert(isinstance(m, bazel.Builder))
     return m
 
 
-def main():
-    try:
-        options = get_options()
-        random.seed(options.arg_seed)
+def depfile_scanner(options, modules):
+    m = depfile.create(options.arg_verbose, options.arg_root,
+                       options.arg_n_files_per_dir, modules)
+    assert(isinstance(m, depfile.Scanner))
+    return m
+
+
+def action_shim(options, modules):
+    m = action.create(options.arg_verbose, options.arg_root,
+                      options.arg_n_files_per_dir, modules,
+                      options.arg_action_passes)
+    assert(isinstance(m, action.Shim))
+    return m
+
+
+def graph_index(options, modules):
+    m = graphindex.Writer(options.arg_root, modules,
+                          action.script_path(options.arg_root,
+                                             options.arg_action))
+    assert(isinstance(m, graphindex.Writer))
+    return m
+
 
-        print("Creating %d source modules, max %d files per directory." %
-              (options.arg_n_modules, options.arg_n_files_per_dir))
-        modules   = module.create(options.arg_verbose,
-                                  options.source_, options.interface_,
+# Build systems, in the order they are written.  The graph index is
+# written in the same pass as the build systems.
+BUILD_SYSTEMS = [
+    single_ninja,
+    split_ninja,
+    recursive_make,
+    single_make,
+    pattern_make,
+    bash_script,
+    parallel_bash_script,
+    mtime_bash_script,
+    scons_script,
+    split_scons_script,
+    bazel_script,
+    graph_index,
+]
+
+# Written only with --depfile.
+DEPFILE_SYSTEMS = [
+    depfile_scanner,
+]
+
+# Written only with '--action simulate'.
+ACTION_SYSTEMS = [
+    action_shim,
+]
+
+
+# Modules, payload, manifest, build systems and profiler shared with
+# the worker processes of write_modules() and write_build_systems().
+# The workers are forked, so they inherit these rather than having
+# them pickled to them.
+shared_modules       = None
+shared_payload       = None
+shared_manifest      = None
+shared_build_systems = None
+shared_profiler      = None
+
+
+def build_system_name(bs):
+    # The profiling stage of a build system.
+    return "%s.%s" % (type(bs).__module__, type(bs).__name__)
+
+
+def write_directory(bounds):
+    (lo, hi) = bounds
+    return module.write_modules(shared_modules[lo:hi], shared_payload,
+                                shared_manifest)
+
+
+def write_modules(options, modules, mf, profiler):
+    # Write the module files, one directory at a time.  After each
+    # directory is written, in module number order, its bounds are
+    # yielded so the caller can consume the modules in the same pass.
+    # The manifest entries of the files are added to 'mf' by this
+    # process, as the workers' copies of it are discarded.
+    #
+    # With several processes, the 'modules' stage is the time this
+    # process waits for each directory to be written.
+    global shared_modules
+    global shared_payload
+    global shared_manifest
+
+    directories = [ modules.dir_bounds(d) for d in range(0, modules.n_dirs()) ]
+
+    shared_modules  = modules
+    shared_manifest = mf
+    with profiler.stage("modules"):
+        shared_payload = payload.create(options.arg_payload,
+                                        options.arg_root, options.arg_seed)
+        shared_payload.prepare()
+    try:
+        if options.arg_jobs <= 1:
+            for bounds in directories:
+                with profiler.stage("modules"):
+                    for entry in write_directory(bounds):
+                        mf.add(entry)
+                yield bounds
+        else:
+            context = multiprocessing.get_context("fork")
+            with context.Pool(options.arg_jobs) as pool:
+                results = pool.imap(write_directory, directories)
+                for bounds in directories:
+                    with profiler.stage("modules"):
+                        for entry in next(results):
+                            mf.add(entry)
+                    yield bounds
+    finally:
+        with profiler.stage("modules"):
+            shared_payload.cleanup()
+    shared_modules  = None
+    shared_payload  = None
+    shared_manifest = None
+
+
+def write_build_system(index):
+    # The module graph is inherited by the worker; the build system
+    # regenerates each module from it as it is written.  The worker
+    # profiles itself, sampling included, and returns its stages to
+    # be merged.
+    bs       = shared_build_systems[index]
+    name     = build_system_name(bs)
+    sub      = shared_manifest.subordinate()
+    profiler = profiling.Profiler(shared_profiler.trace_memory_)
+    bs.set_manifest(sub)
+    if isinstance(bs.graph_, module.Stream):
+        bs.graph_.set_profiler(profiler)
+    profiler.start()
+    with profiler.stage(name):
+        bs.write()
+    profiler.stop()
+    return (index, profiler.elapsed(name), sub.results(),
+            profiler.results()["stages"])
+
+
+def write_build_systems(options, mf, profiler):
+    # Write each build system in its own process, after the modules
+    # have been written.  The build systems write disjoint files.
+    # Their stages are measured by the workers, and so overlap.
+    global shared_manifest
+    global shared_build_systems
+    global shared_profiler
+
+    shared_manifest      = mf
+    shared_build_systems = options.build_systems
+    shared_profiler      = profiler
+
+    n_jobs  = min(options.arg_jobs, len(options.build_systems))
+    context = multiprocessing.get_context("fork")
+    with context.Pool(n_jobs) as pool:
+        for (index, elapsed, results, stages) in pool.imap_unordered(
+                write_build_system, range(0, len(options.build_systems))):
+            mf.merge(results)
+            profiler.merge(stages)
+            print("Wrote build system: %s (%.3f seconds)" %
+                  (options.build_systems[index].__class__, elapsed))
+
+    shared_manifest      = None
+    shared_build_systems = None
+    shared_profiler      = None
+
+
+def stream_build_systems(options, modules, mf, profiler):
+    # Modules are generated, written and passed to each build system
+    # in one pass; no build system retains them.
+    build_systems = options.build_systems
+    names         = [ build_system_name(bs) for bs in build_systems ]
+
+    for (name, bs) in zip(names, build_systems):
+        with profiler.stage(name):
+            bs.begin()
+
+    for (lo, hi) in write_modules(options, modules, mf, profiler):
+        if options.arg_verbose and lo % 1000 < hi - lo:
+            print("%d: Writing source modules" % (lo))
+        dir_modules = modules[lo:hi]
+        for (name, bs) in zip(names, build_systems):
+            with profiler.stage(name):
+                for m in dir_modules:
+                    bs.add_module(m)
+
+    for (name, bs) in zip(names, build_systems):
+        with profiler.stage(name):
+            bs.end()
+        print("Wrote build system: %s (%.3f seconds)" %
+              (bs.__class__, profiler.elapsed(name)))
+
+
+def generation_parameters(options):
+    # The options that determine the content of the generated tree.
+    return {
+        "action"        : options.arg_action,
+        "action-passes" : options.arg_action_passes,
+        "density"       : options.arg_density,
+        "depfile"       : options.arg_depfile,
+        "dir-depth"     : options.arg_dir_depth,
+        "fanout"        : options.arg_fanout,
+        "files-per-dir" : options.arg_n_files_per_dir,
+        "import-graph"  : options.arg_import_graph,
+        "max-imports"   : options.arg_max_imports,
+        "modules"       : options.arg_n_modules,
+        "payload"       : options.arg_payload,
+        "seed"          : options.arg_seed,
+        "topology"      : options.arg_topology,
+    }
+
+
+def create_manifest(options):
+    return manifest.Manifest(options.arg_root,
+                             generation_parameters(options),
+                             options.arg_incremental)
+
+
+def max_rss():
+    # Largest resident size, in bytes, of this process or any worker.
+    return 1024 * max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def write_profile(options, mf, profiler):
+    if options.arg_profile:
+        print("Profile:")
+        for line in profiler.report():
+            print("  %s" % (line))
+        print("  max resident size: %dK" % (max_rss() // 1024))
+
+    if options.arg_profile_output is not None:
+        results = {
+            "version"       : version.version(),
+            "parameters"    : mf.parameters_,
+            "jobs"          : options.arg_jobs,
+            "max-rss-bytes" : max_rss(),
+        }
+        results.update(profiler.results())
+        with open(options.arg_profile_output, "w") as fp:
+            json.dump(results, fp, indent = 2, sort_keys = True)
+
+
+def generate(options, profiler):
+    if options.arg_import_graph is not None:
+        with profiler.stage("graph"):
+            modules = importer.load(options.arg_import_graph,
+                                    options.arg_seed,
+                                    options.source_, options.interface_,
+                                    options.arg_n_files_per_dir,
+                                    options.arg_dir_depth,
+                                    options.arg_fanout)
+        options.arg_n_modules = len(modules)
+        print("Creating %d source modules, max %d files per directory, "
+              "imported from '%s'." % (options.arg_n_modules,
+                                       options.arg_n_files_per_dir,
+                                       options.arg_import_graph))
+    else:
+        print("Creating %d source modules, max %d files per directory, "
+              "'%s' topology." % (options.arg_n_modules,
                                   options.arg_n_files_per_dir,
-                                  options.arg_n_modules, options.max_imports)
-        assert(isinstance(modules, list))
-
-        options.build_systems.append(single_ninja(options, modules))
-        options.build_systems.append(recursive_make(options, modules))
-        options.build_systems.append(single_make(options, modules))
-        options.build_systems.append(bash_script(options, modules))
-        options.build_systems.append(scons_script(options, modules))
-        options.build_systems.append(bazel_script(options, modules))
-
-        print("Writing %d source modules." % (options.arg_n_modules))
-        for m in modules:
-            m.create()
-
-        for bs in options.build_systems:
-            print("Writing build system: %s" % (bs.__class__))
-            bs.write()
+                                  options.arg_topology))
+        modules = module.stream(options.arg_verbose, options.arg_seed,
+                                options.source_, options.interface_,
+                                options.arg_n_files_per_dir,
+                                options.arg_n_modules, options.topology_,
+                                options.arg_dir_depth,
+                                options.arg_fanout)
+        modules.set_profiler(profiler)
+    assert(isinstance(modules, module.Layout))
+    mf        = create_manifest(options)
+
+    build_systems = BUILD_SYSTEMS
+    if options.arg_depfile:
+        build_systems = build_systems + DEPFILE_SYSTEMS
+    if options.arg_action != action.TOUCH:
+        build_systems = build_systems + ACTION_SYSTEMS
+    for build_system in build_systems:
+        bs = build_system(options, modules)
+        bs.set_manifest(mf)
+        options.build_systems.append(bs)
+
+    print("Writing %d source modules using %d process(es), "
+          "'%s' payload." % (options.arg_n_modules, options.arg_jobs,
+                             options.arg_payload))
+    if options.arg_jobs <= 1:
+        stream_build_systems(options, modules, mf, profiler)
+    else:
+        for (lo, hi) in write_modules(options, modules, mf, profiler):
+            if options.arg_verbose and lo % 1000 < hi - lo:
+                print("%d: Writing source modules" % (lo))
+        print("Wrote source modules (%.3f seconds)" %
+              (profiler.elapsed("modules")))
+        write_build_systems(options, mf, profiler)
+
+    with profiler.stage("manifest"):
+        mf.remove_stale()
+        mf.save()
+    print("Manifest: %s." % (mf.summary()))
+    return mf
+
+
+def main():
+    try:
+        options  = get_options()
+        profiler = profiling.Profiler(options.arg_profile)
+        cprof    = None
+        if options.arg_cprofile is not None:
+            cprof = cProfile.Profile()
+            cprof.enable()
+
+        profiler.start()
+        mf = generate(options, profiler)
+        profiler.stop()
+
+        if cprof is not None:
+            cprof.disable()
+            cprof.dump_stats(options.arg_cprofile)
+        write_profile(options, mf, profiler)
 
     except KeyboardInterrupt as exc:
         print("Ctrl-C interrupt")
@@ -0,0 +1,283 @@
+#!/usr/bin/python3 -B
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# A binary index of the module graph, written with the generated tree
+# so that the graph can be queried without reading the tree.
+#
+# The index holds arrays of native integers, each starting on an
+# 8-byte boundary, followed by JSON metadata and a fixed trailer:
+#
+#   imports       int32[n_imports]   imports of all modules, in order
+#   import_start  int64[n + 1]       imports of module 'i' are
+#                                    imports[import_start[i]:
+#                                            import_start[i + 1]]
+#   fan_in        int32[n]           number of modules importing 'i'
+#   level         int32[n]           0 if 'i' imports nothing, else
+#                                    1 + the highest level it imports
+#   interface_kb  uint16[n]
+#   source_kb     uint16[n]
+#   metadata      JSON: section offsets, layout, summary
+#   trailer       uint64 metadata length, 8-byte magic
+#
+# The arrays come first so the writer can stream the imports as
+# modules are generated.  The reader maps the file and accesses the
+# arrays in place.
+import argparse
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+
+import buildtool
+import module
+
+MAGIC   = b"BPCGRAPH"
+TRAILER = struct.Struct("<Q8s")
+VERSION = 2
+
+SECTIONS = [                    # (name, array type code)
+    ("imports",      "i"),
+    ("import_start", "q"),
+    ("fan_in",       "i"),
+    ("level",        "i"),
+    ("interface_kb", "H"),
+    ("source_kb",    "H"),
+]
+
+
+class Writer(buildtool.BuildTool):
+    # Written as a build system is: the modules are streamed to it.
+    # Only per-module counts are held; the imports are written as
+    # they are seen.  'action_script' is the shim creating each
+    # artifact, or None if artifacts are touched (see action.py).
+    def __init__(self, src_root, modules, action_script = None):
+        super(Writer, self).__init__(modules)
+        self.pathname_      = os.path.join(src_root, "graph.index")
+        self.action_script_ = action_script
+        self.fp_            = None
+        self.offset_        = 0
+
+    def write_section(self, data):
+        # Returns the [offset, length] of the section written.
+        padding = -self.offset_ % 8
+        self.fp_.write(b"\0" * padding)
+        self.offset_ += padding
+        section = [ self.offset_, len(data) ]
+        self.fp_.write(data)
+        self.offset_ += len(data)
+        return section
+
+    def begin(self):
+        zeros              = bytes(4 * self.n_modules_)
+        self.fp_           = self.open_output(self.pathname_, binary = True)
+        self.offset_       = 0
+        self.import_start_ = array.array("q", [ 0 ])
+        self.fan_in_       = array.array("i", zeros)
+        self.level_        = array.array("i", zeros)
+        self.interface_kb_ = array.array("H")
+        self.source_kb_    = array.array("H")
+
+    def add_module(self, m):
+        imports = self.graph_.module_imports(m.module_num_)
+        level   = 0
+        for i in imports:
+            self.fan_in_[i] += 1
+            if i < m.module_num_ and self.level_[i] >= level:
+                level = self.level_[i] + 1
+        self.level_[m.module_num_] = level
+        self.import_start_.append(self.import_start_[-1] + len(imports))
+        self.interface_kb_.append(m.interface_kb_)
+        self.source_kb_.append(m.source_kb_)
+        self.fp_.write(imports.tobytes())
+        self.offset_ += len(imports) * imports.itemsize
+
+    def most_used(self):
+        # The module whose interface is imported by the most modules.
+        # Ties are broken as 'sort --reverse' would the interface
+        # names, so the same interface is chosen as by searching the
+        # tree.
+        best = None
+        if self.n_modules_ > 0:
+            fan = max(self.fan_in_)
+            if fan > 0:
+                best = max([ n for n in range(0, self.n_modules_)
+                             if self.fan_in_[n] == fan ],
+                           key = lambda n: "m%d.interface" % (n))
+        return best
+
+    def end(self):
+        sections = {
+            "imports"      : [ 0, self.offset_ ],
+            "import_start" : self.write_section(self.import_start_.tobytes()),
+            "fan_in"       : self.write_section(self.fan_in_.tobytes()),
+            "level"        : self.write_section(self.level_.tobytes()),
+            "interface_kb" : self.write_section(self.interface_kb_.tobytes()),
+            "source_kb"    : self.write_section(self.source_kb_.tobytes()),
+        }
+        action_script = None
+        if self.action_script_ is not None:
+            action_script = os.path.abspath(self.action_script_)
+        metadata = {
+            "version"       : VERSION,
+            "action"        : action_script,
+            "byteorder"     : sys.byteorder,
+            "modules"       : self.n_modules_,
+            "files-per-dir" : self.graph_.files_per_dir_,
+            "dir-depth"     : self.graph_.dir_depth_,
+            "fanout"        : self.graph_.fanout_,
+            "source-dir"    : os.path.abspath(self.graph_.src_dir_),
+            "interface-dir" : os.path.abspath(self.graph_.incl_dir_),
+            "levels"        : max(self.level_, default = -1) + 1,
+            "most-used"     : self.most_used(),
+            "sections"      : sections,
+        }
+        data = json.dumps(metadata, sort_keys = True).encode()
+        self.fp_.write(data)
+        self.fp_.write(TRAILER.pack(len(data), MAGIC))
+        self.fp_.close()
+        self.fp_ = None
+
+
+class Index(object):
+    # Read access to a graph index.  The arrays are not copied; each
+    # query reads the mapped file directly.
+    def __init__(self, pathname):
+        with open(pathname, "rb") as fp:
+            self.map_ = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+        (length, magic) = TRAILER.unpack_from(self.map_,
+                                              len(self.map_) - TRAILER.size)
+        if magic != MAGIC:
+            raise Exception("'%s' is not a graph index" % (pathname))
+        start          = len(self.map_) - TRAILER.size - length
+        self.metadata_ = json.loads(self.map_[start:start + length])
+        if (self.metadata_["version"] != VERSION or
+            self.metadata_["byteorder"] != sys.byteorder):
+            raise Exception("'%s' was written by an incompatible "
+                            "generator" % (pathname))
+
+        view = memoryview(self.map_)
+        for (name, code) in SECTIONS:
+            (offset, size) = self.metadata_["sections"][name]
+            setattr(self, name + "_", view[offset:offset + size].cast(code))
+        self.layout_ = module.Layout(self.metadata_["source-dir"],
+                                     self.metadata_["interface-dir"],
+                                     self.metadata_["files-per-dir"],
+                                     self.metadata_["dir-depth"],
+                                     self.metadata_["fanout"])
+
+    def close(self):
+        for (name, code) in SECTIONS:
+            getattr(self, name + "_").release()
+        self.map_.close()
+
+    def __len__(self):
+        return self.metadata_["modules"]
+
+    def imports(self, n):
+        return self.imports_[self.import_start_[n]:self.import_start_[n + 1]]
+
+    def fan_in(self, n):
+        return self.fan_in_[n]
+
+    def level(self, n):
+        return self.level_[n]
+
+    def n_levels(self):
+        return self.metadata_["levels"]
+
+    def interface_kb(self, n):
+        return self.interface_kb_[n]
+
+    def source_kb(self, n):
+        return self.source_kb_[n]
+
+    def source_path(self, n):
+        return self.layout_.source_path(n)
+
+    def interface_path(self, n):
+        return self.layout_.interface_path(n)
+
+    def most_used(self):
+        # The module whose interface is imported by the most modules,
+        # or None if no module imports another.
+        return self.metadata_["most-used"]
+
+    def action(self):
+        # The shim creating each artifact, or None if artifacts are
+        # touched.  Indexes written before the shim have none.
+        return self.metadata_.get("action")
+
+
+def configure_parser():
+    description = ("""
+  Return Code:
+    0       : success
+    non-zero: failure
+""")
+
+    formatter = argparse.RawDescriptionHelpFormatter
+    parser    = argparse.ArgumentParser(usage           = None,
+                                        formatter_class = formatter,
+                                        description     = description,
+                                        prog            = "graphindex.py")
+
+    parser.add_argument("--index",
+                        help     = ("Graph index written by generate.py."),
+                        required = True,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_index")
+
+    parser.add_argument("--most-used",
+                        help     = ("Print the pathname of the interface "
+                                    "imported by the most modules."),
+                        required = False,
+                        default  = False,
+                        action   = "store_true",
+                        dest     = "arg_most_used")
+
+    parser.add_argument("--module",
+                        help     = ("Print the imports, fan-in, level and "
+                                    "sizes of a module."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_module")
+
+    return parser
+
+
+def main():
+    options = configure_parser().parse_args()
+    index   = Index(options.arg_index)
+    try:
+        if options.arg_most_used:
+            n = index.most_used()
+            if n is None:
+                print("No interface is imported.", file = sys.stderr)
+                return 1
+            print(index.interface_path(n))
+
+        if options.arg_module is not None:
+            n = options.arg_module
+            print("module       : %d" % (n))
+            print("source       : %s (%d Kb)" % (index.source_path(n),
+                                                  index.source_kb(n)))
+            print("interface    : %s (%d Kb)" % (index.interface_path(n),
+                                                  index.interface_kb(n)))
+            print("fan-in       : %d" % (index.fan_in(n)))
+            print("level        : %d of %d" % (index.level(n),
+                                               index.n_levels()))
+            print("imports      : %s" % (" ".join([ str(i) for i in
+                                                    index.imports(n) ])))
+    finally:
+        index.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# Import the dependency graph of an existing build, so that the build
+# systems can be generated for a replica of its shape.
+#
+# Each file named in the graph (target or prerequisite) becomes one
+# module, and each dependency of a target on a prerequisite becomes
+# an import of the prerequisite's module.  The modules are numbered
+# so that prerequisites precede the files that depend on them.  A
+# module's sizes are the size of its file, when the file can be
+# found; otherwise they are sampled as for a generated module.
+#
+# The supported formats are:
+#
+#   ninja-graph : output of 'ninja -t graph'
+#   ninja-deps  : output of 'ninja -t deps'
+#   compdb      : compile_commands.json; the dependencies are read
+#                 from the depfiles (-MF, or -MD/-MMD) of each command
+#   make        : output of 'make -p' (the 'Files' database)
+#
+# Relative paths are taken relative to the directory holding the
+# imported file, or for compdb, to each command's directory.
+import array
+import json
+import os
+import re
+import shlex
+
+import module
+import sampler
+import utility
+
+NINJA_NODE = re.compile(r'^"([^"]+)" \[label="((?:[^"\\]|\\.)*)"(.*)\]$')
+NINJA_EDGE = re.compile(r'^"([^"]+)" -> "([^"]+)"(.*)$')
+WORDS      = re.compile(r'(?<!\\)\s+')
+SPECIAL    = re.compile(r'^\.[A-Z_]+\s*:')
+
+# Largest module size, in Kb; see payload.MAX_PAYLOAD.
+MAX_KB = 1024
+
+
+class Dependencies(object):
+    # The files of the imported graph and their prerequisites.  Each
+    # file has an index, so prerequisites are held as integers rather
+    # than as one string per dependency.
+    def __init__(self, base_dir):
+        self.base_dir_ = base_dir
+        self.index_    = { }    # Path -> index.
+        self.paths_    = [ ]    # Index -> path.
+        self.prereqs_  = [ ]    # Index -> list of prerequisite indices.
+
+    def node(self, name, base_dir):
+        path = os.path.normpath(os.path.join(base_dir, name))
+        index = self.index_.get(path)
+        if index is None:
+            index = len(self.paths_)
+            self.index_[path] = index
+            self.paths_.append(path)
+            self.prereqs_.append([ ])
+        return index
+
+    def add(self, target, prereqs, base_dir = None):
+        if base_dir is None:
+            base_dir = self.base_dir_
+        t = self.node(target, base_dir)
+        for p in prereqs:
+            p = self.node(p, base_dir)
+            if p != t:
+                self.prereqs_[t].append(p)
+
+    def order(self):
+        # The file indices in dependency order: each file follows its
+        # prerequisites.  A dependency that closes a cycle is ignored
+        # for the order, but kept in the graph.
+        ordered = [ ]
+        state   = [ 0 ] * len(self.paths_) # 0: new, 1: open, 2: done.
+        for root in sorted(range(0, len(self.paths_)),
+                           key = lambda i: self.paths_[i]):
+            if state[root] != 0:
+                continue
+            state[root] = 1
+            stack = [ (root, iter(self.prereqs_[root])) ]
+            while len(stack) > 0:
+                (n, prereqs) = stack[-1]
+                for p in prereqs:
+                    if state[p] == 0:
+                        state[p] = 1
+                        stack.append((p, iter(self.prereqs_[p])))
+                        break
+                else:
+                    stack.pop()
+                    state[n] = 2
+                    ordered.append(n)
+        return ordered
+
+    def file_kb(self, path):
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            return None
+        return max(1, min(MAX_KB, (size + 1023) // 1024))
+
+    def graph(self, seed, src_dir, incl_dir, files_per_dir,
+              dir_depth, fanout):
+        ordered = self.order()
+        number  = [ 0 ] * len(ordered)
+        for (n, i) in enumerate(ordered):
+            number[i] = n
+
+        counts  = array.array("i")
+        targets = array.array("i")
+        for i in ordered:
+            imports = list(dict.fromkeys([ number[p]
+                                           for p in self.prereqs_[i] ]))
+            counts.append(len(imports))
+            targets.extend(imports)
+
+        interface_kb = sampler.sample_sizes(seed, 0, len(ordered),
+                                            module.INTERFACE_SIZES, 0)
+        source_kb    = sampler.sample_sizes(seed, 0, len(ordered),
+                                            module.SOURCE_SIZES, 1)
+        for (n, i) in enumerate(ordered):
+            kb = self.file_kb(self.paths_[i])
+            if kb is not None:
+                interface_kb[n] = kb
+                source_kb[n]    = kb
+
+        g = module.Graph(src_dir, incl_dir, files_per_dir, dir_depth, fanout)
+        g.add_modules(counts, targets, interface_kb, source_kb)
+        return g
+
+
+def unescape(word):
+    return word.replace("\\ ", " ").replace("\\#", "#").replace("$$", "$")
+
+
+def split_words(text):
+    return [ unescape(w) for w in WORDS.split(text.strip()) if len(w) > 0 ]
+
+
+def parse_rules(deps, lines, base_dir):
+    # Makefile rules, as written to depfiles: 'targets: prerequisites'.
+    # Continuation lines must already be joined.  Order-only
+    # prerequisites (after '|') are ignored.
+    for line in lines:
+        if len(line.strip()) == 0 or line.startswith(("#", "\t")):
+            continue
+        (targets, colon, prereqs) = line.partition(":")
+        if len(colon) == 0 or prereqs.startswith("="):
+            continue            # Not a rule; a variable assignment.
+        prereqs = prereqs.lstrip(":") # Double-colon rule.
+        if "=" in prereqs:
+            continue            # Target-specific variable.
+        prereqs = prereqs.partition("|")[0]
+        for target in split_words(targets):
+            deps.add(target, split_words(prereqs), base_dir)
+
+
+def join_continuations(text):
+    return text.replace("\\\r\n", " ").replace("\\\n", " ").splitlines()
+
+
+def parse_ninja_graph(deps, pathname):
+    # 'ninja -t graph' writes Graphviz: one node for each file, and
+    # for a build statement with several inputs or outputs, a node for
+    # the statement itself.  Order-only inputs (dotted) are ignored.
+    labels = { }
+    rules  = set()
+    edges  = [ ]
+    with open(pathname, "r") as fp:
+        for line in fp:
+            line = line.strip()
+            m = NINJA_EDGE.match(line)
+            if m is not None:
+                if "style=dotted" not in m.group(3):
+                    edges.append((m.group(1), m.group(2)))
+                continue
+            m = NINJA_NODE.match(line)
+            if m is not None:
+                if "shape=ellipse" in m.group(3):
+                    rules.add(m.group(1))
+                else:
+                    labels[m.group(1)] = m.group(2).replace('\\"', '"')
+
+    inputs  = { }
+    outputs = { }
+    for (src, dst) in edges:
+        if dst in rules:
+            inputs.setdefault(dst, [ ]).append(labels[src])
+        elif src in rules:
+            outputs.setdefault(src, [ ]).append(labels[dst])
+        else:
+            deps.add(labels[dst], [ labels[src] ])
+    for rule in sorted(rules):
+        for out in outputs.get(rule, [ ]):
+            deps.add(out, inputs.get(rule, [ ]))
+
+
+def parse_ninja_deps(deps, pathname):
+    # 'ninja -t deps' writes each target, followed by its discovered
+    # dependencies, indented, one per line.
+    target  = None
+    prereqs = [ ]
+    with open(pathname, "r") as fp:
+        for line in fp:
+            if line.startswith((" ", "\t")):
+                if target is not None and len(line.strip()) > 0:
+                    prereqs.append(line.strip())
+                continue
+            if target is not None:
+                deps.add(target, prereqs)
+            (target, prereqs) = (None, [ ])
+            if ": #deps" in line:
+                target = line.partition(": #deps")[0]
+    if target is not None:
+        deps.add(target, prereqs)
+
+
+def compdb_depfile(args, directory):
+    # The depfile written by a compiler command, if any.
+    output = None
+    for (i, arg) in enumerate(args):
+        if arg == "-MF" and i + 1 < len(args):
+            return os.path.join(directory, args[i + 1])
+        if arg.startswith("-MF") and len(arg) > 3:
+            return os.path.join(directory, arg[3:])
+        if arg == "-o" and i + 1 < len(args):
+            output = args[i + 1]
+    if output is not None and ("-MD" in args or "-MMD" in args):
+        return os.path.join(directory, os.path.splitext(output)[0] + ".d")
+    return None
+
+
+def compdb_output(entry, args):
+    if "output" in entry:
+        return entry["output"]
+    for (i, arg) in enumerate(args):
+        if arg == "-o" and i + 1 < len(args):
+            return args[i + 1]
+    return os.path.splitext(entry["file"])[0] + ".o"
+
+
+def parse_compdb(deps, pathname):
+    # Each command compiles one file into one output.  When the
+    # command's depfile exists, it supplies all the dependencies;
+    # otherwise, the output depends only on the compiled file.
+    with open(pathname, "r") as fp:
+        entries = json.load(fp)
+    for entry in entries:
+        directory = entry.get("directory", deps.base_dir_)
+        if "arguments" in entry:
+            args = entry["arguments"]
+        else:
+            args = shlex.split(entry["command"])
+        depfile = compdb_depfile(args, directory)
+        if depfile is not None and os.path.exists(depfile):
+            with open(depfile, "r") as fp:
+                parse_rules(deps, join_continuations(fp.read()), directory)
+        else:
+            deps.add(compdb_output(entry, args), [ entry["file"] ], directory)
+
+
+def parse_make_database(deps, pathname):
+    # 'make -p' prints its rules in the 'Files' section.  Entries
+    # marked 'Not a target', pattern rules and special targets (such
+    # as .PHONY) are ignored.
+    with open(pathname, "r") as fp:
+        lines = join_continuations(fp.read())
+    if "# Files" in lines:
+        lines = lines[lines.index("# Files") + 1:]
+    rules      = [ ]
+    not_target = False
+    for line in lines:
+        if line.startswith("# files hash-table stats"):
+            break
+        if line.startswith("# Not a target:"):
+            not_target = True
+            continue
+        if len(line.strip()) == 0 or line.startswith(("#", "\t")):
+            continue
+        if (not not_target and SPECIAL.match(line) is None and
+            "%" not in line):
+            rules.append(line)
+        not_target = False
+    parse_rules(deps, rules, deps.base_dir_)
+
+
+FORMATS = {
+    "compdb"      : parse_compdb,
+    "make"        : parse_make_database,
+    "ninja-deps"  : parse_ninja_deps,
+    "ninja-graph" : parse_ninja_graph,
+}
+
+
+def load(spec, seed, src_dir, incl_dir, files_per_dir, dir_depth, fanout):
+    # 'spec' is FORMAT:PATH.  Returns a module.Graph.
+    (fmt, colon, pathname) = spec.partition(":")
+    if fmt not in FORMATS or len(pathname) == 0:
+        utility.fatal("import graph '%s' must be FORMAT:PATH, with FORMAT "
+                      "one of %s" % (spec, ", ".join(sorted(FORMATS))))
+    if not os.path.isfile(pathname):
+        utility.fatal("import graph '%s' does not exist" % (pathname))
+
+    deps = Dependencies(os.path.dirname(os.path.abspath(pathname)))
+    FORMATS[fmt](deps, pathname)
+    if len(deps.paths_) == 0:
+        utility.fatal("import graph '%s' has no dependencies" % (pathname))
+    return deps.graph(seed, src_dir, incl_dir, files_per_dir,
+                      dir_depth, fanout)
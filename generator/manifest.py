@@ -0,0 +1,220 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+
+import copy
+import hashlib
+import json
+import os
+import stat
+
+import utility
+
+VERSION = 1
+
+# Number of characters an Output accumulates before they are encoded,
+# hashed and written as one block.
+BUFFER_SIZE = 1024 * 1024
+
+EXECUTABLE = (stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR |
+              stat.S_IRGRP | stat.S_IXGRP |
+              stat.S_IROTH | stat.S_IXOTH)
+
+
+class Output(object):
+    # A build process file being written.  Build systems write their
+    # files in many small pieces; these are accumulated and written in
+    # blocks of at least 'buffer_size' characters, so each piece costs
+    # only a list append.  Its content is hashed as it is written.
+    # When the tree is regenerated incrementally, the content is
+    # written to a temporary file that replaces the original only if
+    # the content differs, so unchanged files keep their timestamps.
+    # A 'binary' Output is written bytes rather than text.
+    def __init__(self, manifest, pathname, executable, binary, buffer_size):
+        self.manifest_    = manifest
+        self.pathname_    = pathname
+        self.executable_  = executable
+        self.binary_      = binary
+        self.buffer_size_ = buffer_size
+        self.chunks_      = [ ]
+        self.n_pending_   = 0
+        self.hash_        = hashlib.sha1()
+        self.size_        = 0
+        if manifest.incremental_:
+            self.temp_ = "%s.tmp" % (pathname)
+        else:
+            self.temp_ = pathname
+        self.fp_ = open(self.temp_, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, text):
+        self.chunks_.append(text)
+        self.n_pending_ += len(text)
+        if self.n_pending_ >= self.buffer_size_:
+            self.flush()
+
+    def flush(self):
+        if self.binary_:
+            data = b"".join(self.chunks_)
+        else:
+            data = "".join(self.chunks_).encode()
+        self.chunks_    = [ ]
+        self.n_pending_ = 0
+        self.hash_.update(data)
+        self.size_ += len(data)
+        self.fp_.write(data)
+
+    def close(self):
+        self.flush()
+        self.fp_.close()
+        if self.executable_:
+            os.chmod(self.temp_, EXECUTABLE)
+
+        hexdigest = self.hash_.hexdigest()
+        written   = True
+        if self.temp_ != self.pathname_:
+            if self.manifest_.unchanged(self.pathname_, self.size_, hexdigest):
+                os.unlink(self.temp_)
+                written = False
+            else:
+                os.replace(self.temp_, self.pathname_)
+        self.manifest_.add(self.manifest_.entry(self.pathname_, self.size_,
+                                                hexdigest, written))
+
+
+class Manifest(object):
+    # The manifest records the parameters used to generate a tree, and
+    # the size, modification time and content digest of each file
+    # written.  For module files, the digest is of the description of
+    # the content (header, payload method and size) rather than of
+    # the content itself, so it can be computed without reading or
+    # writing the file.
+    #
+    # When 'incremental' is set, the manifest of the previous
+    # generation is loaded.  A file whose digest and size are
+    # unchanged, and whose size and modification time on disk match
+    # the previous manifest, is not rewritten.  Files recorded
+    # previously but not in this generation are removed by
+    # remove_stale().
+    def __init__(self, root, parameters, incremental,
+                 buffer_size = BUFFER_SIZE):
+        self.root_        = root
+        self.buffer_size_ = buffer_size
+        self.pathname_    = os.path.join(root, "manifest.json")
+        self.parameters_  = parameters
+        self.incremental_ = incremental
+        self.previous_    = { }
+        self.files_       = { }
+        self.n_written_   = 0
+        self.n_unchanged_ = 0
+        self.n_removed_   = 0
+
+        if incremental and os.path.exists(self.pathname_):
+            with open(self.pathname_, "r") as fp:
+                previous = json.load(fp)
+            if previous.get("version") == VERSION:
+                self.previous_ = previous["files"]
+
+    def relpath(self, pathname):
+        return os.path.relpath(pathname, self.root_)
+
+    def unchanged(self, pathname, size, hexdigest):
+        previous = self.previous_.get(self.relpath(pathname))
+        if previous is None:
+            return False
+        (p_size, p_mtime, p_digest) = previous
+        if p_size != size or p_digest != hexdigest:
+            return False
+        try:
+            st = os.stat(pathname)
+        except FileNotFoundError:
+            return False
+        return st.st_size == p_size and st.st_mtime_ns == p_mtime
+
+    def detach(self, pathname):
+        # Remove a file that is about to be rewritten, so that a file
+        # hard linked to a cached snapshot of the tree (see
+        # scripts/tree_cache.py) is replaced rather than modified.
+        # Only an incremental generation writes over existing files.
+        if self.incremental_:
+            try:
+                os.unlink(pathname)
+            except FileNotFoundError:
+                pass
+
+    def entry(self, pathname, size, hexdigest, written):
+        # Returns the manifest entry for a file, as a tuple that can be
+        # returned from a worker process.
+        relpath = self.relpath(pathname)
+        if written:
+            mtime = os.stat(pathname).st_mtime_ns
+        else:
+            mtime = self.previous_[relpath][1]
+        return (relpath, size, mtime, hexdigest, written)
+
+    def add(self, entry):
+        (relpath, size, mtime, hexdigest, written) = entry
+        self.files_[relpath] = (size, mtime, hexdigest)
+        if written:
+            self.n_written_ += 1
+        else:
+            self.n_unchanged_ += 1
+
+    def subordinate(self):
+        # A manifest for the files written by a worker process.  It
+        # shares the previous generation's entries, and starts with no
+        # entries of its own.  Its results() are returned to the
+        # parent process and passed to merge().
+        sub = copy.copy(self)
+        sub.files_       = { }
+        sub.n_written_   = 0
+        sub.n_unchanged_ = 0
+        sub.n_removed_   = 0
+        return sub
+
+    def results(self):
+        return (self.files_, self.n_written_, self.n_unchanged_)
+
+    def merge(self, results):
+        (files, n_written, n_unchanged) = results
+        self.files_.update(files)
+        self.n_written_   += n_written
+        self.n_unchanged_ += n_unchanged
+
+    def open(self, pathname, executable = False, binary = False):
+        utility.mkdir(os.path.dirname(pathname))
+        return Output(self, pathname, executable, binary, self.buffer_size_)
+
+    def remove_stale(self):
+        for relpath in self.previous_:
+            if relpath not in self.files_:
+                pathname = os.path.join(self.root_, relpath)
+                try:
+                    os.unlink(pathname)
+                    self.n_removed_ += 1
+                except FileNotFoundError:
+                    pass
+                # Remove the directories left empty, as when the
+                # directory layout changes.
+                try:
+                    os.removedirs(os.path.dirname(pathname))
+                except OSError:
+                    pass
+
+    def save(self):
+        content = {
+            "version"    : VERSION,
+            "parameters" : self.parameters_,
+            "files"      : self.files_,
+        }
+        with open(self.pathname_, "w") as fp:
+            json.dump(content, fp, sort_keys = True)
+
+    def summary(self):
+        return ("%d files written, %d unchanged, %d removed" %
+                (self.n_written_, self.n_unchanged_, self.n_removed_))
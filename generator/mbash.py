@@ -0,0 +1,107 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# A Bash script that reads modification times once.
+#
+# The Bash script (bash.py) tests each prerequisite of each artifact
+# with '-ot', so each test stats two files, and the most imported
+# interfaces are stat'ed once for each importer.  This script instead
+# lists the modification time of every source, interface and artifact
+# with a single 'find', into an associative array, and decides whether
+# each artifact is out of date from the array.  A NULL build stats
+# each file once, rather than twice for each import.
+#
+# The script runs one snippet for each module directory, sourced so
+# the array is shared.  Like the Bash script, it runs serially, and it
+# shares the Bash script's commands (see bash.py).  The script exits
+# with a failure status if any action fails.
+
+import os
+
+import action
+import bash
+import buildtool
+import utility
+
+class Script(buildtool.BuildTool):
+    def __init__(self, src_root, modules, files_per_dir, action_script):
+        super(Script, self).__init__(modules)
+        self.pathname_      = os.path.join(src_root, "build-mtime.sh")
+        self.bash_dir_      = os.path.join(src_root, "bash-mtime")
+        self.action_script_ = action_script # None: touch.
+
+    def snippet_script(self, dir_num):
+        assert(isinstance(dir_num, int))
+        return os.path.join(self.bash_dir_, "artifacts_%d.sh" % (dir_num))
+
+    def read_mtimes(self, fp):
+        # Module files are named by module number, so a file's name is
+        # its key.  Times are kept as integer nanoseconds, to be
+        # compared arithmetically; 'find' prints fractional seconds,
+        # which 'sed' turns into assignments.
+        fp.write("# Read the modification time of every module file.\n"
+                 "declare -A MTIME;\n"
+                 "source <(find \"%s\" \"%s\" \"${BOD}\" -type f \\\n"
+                 "              \\( -name '*.source' -o -name '*.interface' "
+                 "-o -name '*.artifact' \\) \\\n"
+                 "              -printf '%%T@ %%f\\n' \\\n"
+                 "          | sed -E 's/^([0-9]+)\\.([0-9]{9})[0-9]* (.*)$/"
+                 "MTIME[\\3]=\\1\\2/');\n\n" % (self.graph_.src_dir_,
+                                                   self.graph_.incl_dir_))
+
+    def begin(self):
+        utility.mkdir(self.bash_dir_)
+
+        with self.open_output(self.pathname_, executable = True) as fp:
+            bash.prolog(fp)
+            bash.make_directories(fp, self.artifact_dirs())
+            fp.write("\n")
+
+            self.read_mtimes(fp)
+            fp.write("status=0;\n"
+                     "for (( d = 0; d < %d; d++ )) ; do\n"
+                     "    source \"%s/artifacts_${d}.sh\";\n"
+                     "done;\n"
+                     "exit ${status};\n" % (self.graph_.n_dirs(),
+                                            self.bash_dir_))
+
+    def create_artifact(self, fp, m):
+        # A missing artifact has time 0, so it is older than its source.
+        # The failure of an action, rather than of a test, is the
+        # script's.
+        fp.write("\n"
+                 "t=${MTIME[%s]:-0};\n"
+                 "if (( t < MTIME[%s] \\\n"
+                 "      || t < MTIME[%s] \\" %
+                 (os.path.basename(m.artifact_),
+                  os.path.basename(m.source_),
+                  os.path.basename(m.interface_)))
+        for imp in m.imports_:
+            name = os.path.basename(imp.interface_)
+            fp.write("\n"
+                     "      || t < MTIME[%s] \\" % (name))
+        fp.write("\n   )) ; then\n"
+                 "    if %s ; then\n"
+                 "        [ ! -z \"${VERBOSE:-}\" ] \\\n"
+                 "        && builtin echo \"Creating '${BOD}/%s'\";\n"
+                 "    else\n"
+                 "        status=1;\n"
+                 "    fi;\n"
+                 "fi;\n" %
+                 (bash.artifact_action(self.action_script_, m),
+                  m.artifact_))
+
+    def write_directory(self, modules):
+        pathname = self.snippet_script(modules[0].dir_num())
+        with self.open_output(pathname) as fp:
+            for m in modules:
+                self.create_artifact(fp, m)
+
+
+def create(verbose, src_root, files_per_dir, modules,
+           action_kind = action.TOUCH):
+    assert(isinstance(verbose, bool))
+
+    return Script(src_root, modules, files_per_dir,
+                  action.script_path(src_root, action_kind))
@@ -1,74 +1,87 @@
 # Copyright (c) 2025 Logic Magicians Software.
 # All Rights Reserved.
 # Licensed under Gnu GPL V3.
+import array
 import os
-import random
 
+import profiling
+import sampler
 import utility
 
+# Number of names at each parent level of the module directory
+# hierarchy; see Layout.
+DEFAULT_FANOUT = 16
+
 class Module(object):
-    def __init__(self, n):
-        self.module_num_    = n
-        self.imports_       = []
-        self.source_        = None
-        self.artifact_      = None
-        self.interface_     = None
-
-    def set_file_locations(self, src_dir, incl_dir, dir_num):
-        mname        = self.module_name()
-        cfname       = "%s.source"    % (mname)
-        ofname       = "%s.artifact"  % (mname)
-        ifname       = "%s.interface" % (mname)
-        self.source_ = os.path.join(src_dir, str(dir_num), cfname)
-
-        self.rela_artifact_dir_ = os.path.join(os.path.basename(src_dir),
-                                               str(dir_num))
+    # A Module is a lightweight view of one module in a Graph.  All
+    # data is held by the Graph; the attributes used by the build
+    # process generators (source_, artifact_, imports_, ...) are
+    # computed on demand from the module number.
+    __slots__ = ("graph_", "module_num_")
+
+    def __init__(self, graph, n):
+        self.graph_      = graph
+        self.module_num_ = n
+
+    def __eq__(self, other):
+        return (isinstance(other, Module) and
+                self.graph_ is other.graph_ and
+                self.module_num_ == other.module_num_)
+
+    def __hash__(self):
+        return self.module_num_
+
+    @property
+    def imports_(self):
+        return [ Module(self.graph_, i)
+                 for i in self.graph_.module_imports(self.module_num_) ]
+
+    @property
+    def source_(self):
+        return self.graph_.source_path(self.module_num_)
 
+    @property
+    def interface_(self):
+        return self.graph_.interface_path(self.module_num_)
+
+    @property
+    def rela_artifact_dir_(self):
+        return self.graph_.rela_artifact_dir(self.dir_num())
+
+    @property
+    def artifact_(self):
         # self.artifact_ is relative so build output can be in a
         # different location than sources.
-        self.artifact_ = os.path.join(self.rela_artifact_dir_, ofname)
-        self.interface_ = os.path.join(incl_dir, str(dir_num), ifname)
+        return self.graph_.artifact_path(self.module_num_)
+
+    @property
+    def interface_kb_(self):
+        # Size of interface payload, in Kb.
+        return self.graph_.interface_kb(self.module_num_)
 
-    def import_module(self, module):
-        assert(isinstance(module, Module))
-        if module not in self.imports_:
-            # Import iff the randomly selected module is not imported.
-            self.imports_.append(module)
+    @property
+    def source_kb_(self):
+        # Size of source payload, in Kb.
+        return self.graph_.source_kb(self.module_num_)
+
+    def dir_num(self):
+        return self.graph_.dir_num(self.module_num_)
 
     def module_name(self):
         return "m%s" % (self.module_num_)
 
-    def random_interface_length(self):
-        minimum_size = 1        # In Kb.
-        percent = random.random()
-
-        if percent < 0.60:
-            # 60% of results.
-            return random_select(minimum_size,  10)
-        elif percent < 0.85:
-            # 25% of results.
-            return random_select(10, 25)
-        elif percent < 0.97:
-            # 12% of results.
-            return random_select(25, 50)
-        elif percent < 0.99:
-            # 2% of results.
-            return random_select(50, 150)
-        else:
-            # 1% of results.
-            return random_select(150, 300)
-
-    def write_public_interface(self):
-        utility.mkdir(os.path.dirname(self.interface_))
-        mname = self.module_name()
-        with open(self.interface_, "w") as fp:
-            fp.write("# Module '%s' interface.\n" % (mname))
-            length_in_kb = self.random_interface_length()
-            # Fill the file with '0' to the randomly selected size.
-            fp.write("0" * 1024 * length_in_kb)
-
-    def write_import(self, fp):
-        fp.write("import \"%s\"\n" % (os.path.basename(self.interface_)))
+    def interface_header(self):
+        return "# Module '%s' interface.\n" % (self.module_name())
+
+    def write_public_interface(self, payload, manifest):
+        # The directory must already exist; see write_modules().
+        header = self.interface_header().encode()
+        # Fill the file to the randomly selected size.
+        return write_file(payload, manifest, self.interface_, header,
+                          1024 * self.interface_kb_)
+
+    def import_line(self):
+        return "import \"%s\"\n" % (os.path.basename(self.interface_))
 
     def include_directory(self):
         return os.path.dirname(self.interface_)
@@ -76,61 +89,273 @@ class Module(object):
     def object_path(self):
         return self.artifact_
 
-    def random_file_length(self):
-        minimum_size = 30       # In Kb.
-        percent = random.random()
-
-        if percent < 0.60:
-            # 60% of results.
-            return random_select(minimum_size,  100)
-        elif percent < 0.85:
-            # 25% of results.
-            return random_select(100, 250)
-        elif percent < 0.97:
-            # 12% of results.
-            return random_select(250, 500)
-        else:
-            # 3% of results.
-            return random_select(500, 1024)
-
-    def write_source(self):
-        utility.mkdir(os.path.dirname(self.source_))
-        with open(self.source_, "w") as fp:
-            mname = self.module_name()
-            for imp in self.imports_:
-                imp.write_import(fp)
-
-            length_in_kb = self.random_file_length()
-            # Fill the file with '0' to the randomly selected size.
-            fp.write("0" * 1024 * length_in_kb)
-
-    def create(self):
-        self.write_public_interface()
-        self.write_source()
+    def source_header(self):
+        return "".join([ imp.import_line() for imp in self.imports_ ])
+
+    def write_source(self, payload, manifest):
+        # The directory must already exist; see write_modules().
+        header = self.source_header().encode()
+        # Fill the file to the randomly selected size.
+        return write_file(payload, manifest, self.source_, header,
+                          1024 * self.source_kb_)
+
+    def create(self, payload, manifest):
+        # Returns the manifest entries of the files.
+        return [ self.write_public_interface(payload, manifest),
+                 self.write_source(payload, manifest) ]
 
     def get_make_line(self):
         return "%s: %s" % (self.artifact_, self.source_)
 
 
-def random_select(lo, hi):
-    return random.randint(lo, hi)
+class Layout(object):
+    # The location of each module's files, computed from the
+    # directory and module numbers.  Subclasses provide the modules
+    # themselves; indexing or iterating a Layout produces Module
+    # views.
+    #
+    # Each module directory is a leaf of a hierarchy dir_depth levels
+    # deep.  Its parents are named by a hash of the directory number,
+    # each from 'fanout' names, so the directories are spread evenly
+    # however many there are.  With a depth of 1, the module
+    # directories are directly below the source and interface
+    # directories.
+    def __init__(self, src_dir, incl_dir, files_per_dir,
+                 dir_depth = 1, fanout = DEFAULT_FANOUT):
+        assert(dir_depth >= 1)
+        assert(fanout >= 1)
+        self.src_dir_       = os.path.normpath(src_dir)
+        self.incl_dir_      = os.path.normpath(incl_dir)
+        self.rela_src_dir_  = os.path.basename(self.src_dir_)
+        self.files_per_dir_ = files_per_dir
+        self.dir_depth_     = dir_depth
+        self.fanout_        = fanout
+        self.dir_path_      = (None, None) # Last (dir_num, dir_path()).
+
+    def __len__(self):
+        raise Exception("%s.__len__ must be implemented" % (type(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ Module(self, i)
+                     for i in range(*index.indices(len(self))) ]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("module %d does not exist" % (index))
+        return Module(self, index)
+
+    def __iter__(self):
+        for i in range(0, len(self)):
+            yield Module(self, i)
+
+    def n_dirs(self):
+        return (len(self) + self.files_per_dir_ - 1) // self.files_per_dir_
+
+    def dir_bounds(self, dir_num):
+        # The range of module numbers held in directory 'dir_num'.
+        lo = dir_num * self.files_per_dir_
+        return (lo, min(lo + self.files_per_dir_, len(self)))
+
+    def dir_num(self, n):
+        return n // self.files_per_dir_
+
+    def dir_path(self, dir_num):
+        # The path of directory 'dir_num', relative to the source and
+        # interface directories.  The last path is kept, as paths are
+        # computed for each use and modules are used in directory
+        # order.
+        if self.dir_depth_ == 1:
+            return str(dir_num)
+        if self.dir_path_[0] != dir_num:
+            h     = sampler.mix(dir_num ^ sampler.DIR_STREAM)
+            names = [ ]
+            for level in range(1, self.dir_depth_):
+                names.append(str(h % self.fanout_))
+                h //= self.fanout_
+            names.append(str(dir_num))
+            self.dir_path_ = (dir_num, "/".join(names))
+        return self.dir_path_[1]
+
+    # Paths are formatted directly, rather than with os.path.join(),
+    # as they are computed for each use.
+    def rela_artifact_dir(self, dir_num):
+        return "%s/%s" % (self.rela_src_dir_, self.dir_path(dir_num))
+
+    def source_path(self, n):
+        return "%s/%s/m%d.source" % (self.src_dir_,
+                                     self.dir_path(self.dir_num(n)), n)
+
+    def interface_path(self, n):
+        return "%s/%s/m%d.interface" % (self.incl_dir_,
+                                        self.dir_path(self.dir_num(n)), n)
+
+    def artifact_path(self, n):
+        return "%s/%s/m%d.artifact" % (self.rela_src_dir_,
+                                       self.dir_path(self.dir_num(n)), n)
+
+
+class Graph(Layout):
+    # The module graph, held in compact arrays rather than as one
+    # Python object per module.  The imports of module 'n' are
+    # imports_[import_start_[n]:import_start_[n + 1]] (compressed
+    # sparse row form).
+    def __init__(self, src_dir, incl_dir, files_per_dir,
+                 dir_depth = 1, fanout = DEFAULT_FANOUT):
+        super(Graph, self).__init__(src_dir, incl_dir, files_per_dir,
+                                    dir_depth, fanout)
+        self.import_start_  = array.array("q", [ 0 ])
+        self.imports_       = array.array("i")
+        self.interface_kb_  = array.array("H")
+        self.source_kb_     = array.array("H")
+
+    def __len__(self):
+        return len(self.source_kb_)
+
+    def add_modules(self, counts, imports, interface_kb, source_kb):
+        # Append modules; module 'j' of the batch has counts[j]
+        # imports, taken in order from 'imports'.
+        assert(len(counts) == len(interface_kb) == len(source_kb))
+        start = self.import_start_[-1]
+        for n in counts:
+            start += n
+            self.import_start_.append(start)
+        self.imports_.extend(imports)
+        self.interface_kb_.extend(interface_kb)
+        self.source_kb_.extend(source_kb)
+
+    def module_imports(self, n):
+        return self.imports_[self.import_start_[n]:self.import_start_[n + 1]]
+
+    def interface_kb(self, n):
+        return self.interface_kb_[n]
+
+    def source_kb(self, n):
+        return self.source_kb_[n]
+
+
+class Stream(Layout):
+    # The module graph, sampled one directory at a time as it is
+    # used.  Only the directory most recently used is held, so memory
+    # use does not depend on the number of modules.  Modules are
+    # sampled exactly as by create(), so a Stream and a Graph made
+    # with the same arguments describe the same modules.
+    def __init__(self, seed, src_dir, incl_dir, files_per_dir,
+                 n_modules, topology, dir_depth = 1, fanout = DEFAULT_FANOUT):
+        super(Stream, self).__init__(src_dir, incl_dir, files_per_dir,
+                                     dir_depth, fanout)
+        self.seed_        = seed
+        self.n_modules_   = n_modules
+        self.topology_    = topology
+        self.window_      = None # Graph of the current directory.
+        self.window_lo_   = None # First module number in window_.
+        self.profiler_    = profiling.Profiler()
+
+    def set_profiler(self, profiler):
+        # Sampling is accounted as the 'graph' stage of 'profiler'.
+        self.profiler_ = profiler
+
+    def __len__(self):
+        return self.n_modules_
+
+    def window(self, n):
+        # Returns the window holding module 'n' and the module's
+        # index in the window.
+        dir_num = self.dir_num(n)
+        if (self.window_ is None or
+            self.dir_num(self.window_lo_) != dir_num):
+            (lo, hi) = self.dir_bounds(dir_num)
+            self.window_    = Graph(self.src_dir_, self.incl_dir_,
+                                    self.files_per_dir_)
+            self.window_lo_ = lo
+            with self.profiler_.stage("graph"):
+                sample(self.window_, self.seed_, lo, hi, self.topology_)
+        return (self.window_, n - self.window_lo_)
+
+    def module_imports(self, n):
+        (window, i) = self.window(n)
+        return window.module_imports(i)
+
+    def interface_kb(self, n):
+        (window, i) = self.window(n)
+        return window.interface_kb(i)
+
+    def source_kb(self, n):
+        (window, i) = self.window(n)
+        return window.source_kb(i)
+
+
+# Module sizes, in Kb, as (thresholds, ranges); see
+# sampler.sample_sizes().
+INTERFACE_SIZES = ([ 0.60, 0.85, 0.97, 0.99 ],
+                   [ (1, 10),           # 60% of results.
+                     (10, 25),          # 25% of results.
+                     (25, 50),          # 12% of results.
+                     (50, 150),         #  2% of results.
+                     (150, 300) ])      #  1% of results.
+
+SOURCE_SIZES    = ([ 0.60, 0.85, 0.97 ],
+                   [ (30, 100),         # 60% of results.
+                     (100, 250),        # 25% of results.
+                     (250, 500),        # 12% of results.
+                     (500, 1024) ])     #  3% of results.
+
+# Number of modules sampled at once by create().  A Stream samples
+# one directory at a time.
+BATCH_SIZE = 65536
+
+
+def sample(graph, seed, lo, hi, topology):
+    # Append modules [lo, hi) to 'graph'.  Each module's imports and
+    # sizes are derived only from the seed and the module number, so
+    # the content of a module is independent of the order in which
+    # modules are created or written, and of how many processes write
+    # them.
+    (counts, targets) = sampler.sample_imports(seed, lo, hi, topology)
+    graph.add_modules(counts, targets,
+                      sampler.sample_sizes(seed, lo, hi,
+                                           INTERFACE_SIZES, 0),
+                      sampler.sample_sizes(seed, lo, hi,
+                                           SOURCE_SIZES, 1))
+
+
+def create(verbose, seed, src_dir, incl_dir, n_file_per_dir,
+           n_modules, topology, dir_depth = 1, fanout = DEFAULT_FANOUT):
+    graph = Graph(src_dir, incl_dir, n_file_per_dir, dir_depth, fanout)
+    for lo in range(0, n_modules, BATCH_SIZE):
+        hi = min(lo + BATCH_SIZE, n_modules)
+        if verbose:
+            print("%d: Creating source modules" % (lo))
+        sample(graph, seed, lo, hi, topology)
+    return graph
 
 
-def create(verbose, src_dir, incl_dir, n_file_per_dir, n_modules, max_imports):
-    modules = [ ]
-    for i in range(0, n_modules):
-        dir_number = i // n_file_per_dir
-        n_imports  = min(max_imports, i - 1)
+def stream(verbose, seed, src_dir, incl_dir, n_file_per_dir,
+           n_modules, topology, dir_depth = 1, fanout = DEFAULT_FANOUT):
+    return Stream(seed, src_dir, incl_dir, n_file_per_dir,
+                  n_modules, topology, dir_depth, fanout)
 
-        if verbose and (i % 1000 == 0):
-            print("%d: Creating source module" % (i))
-        m = Module(i)
-        m.set_file_locations(src_dir, incl_dir, dir_number)
-        modules.append(m)
-        for j in range(0, n_imports):
-            m.import_module(modules[random_select(0, i - 1)])
 
-    return modules
+def write_file(payload, manifest, pathname, header, n_bytes):
+    # Write a module file, unless the manifest shows the file on disk
+    # already has this content.  Returns the file's manifest entry.
+    size    = payload.size(header, n_bytes)
+    digest  = payload.digest(header, n_bytes)
+    written = not manifest.unchanged(pathname, size, digest)
+    if written:
+        manifest.detach(pathname)
+        payload.write(pathname, header, n_bytes)
+    return manifest.entry(pathname, size, digest, written)
 
 
-    
+def write_modules(modules, payload, manifest):
+    # All of 'modules' reside in the same directory, so the
+    # directories are created once rather than once per file.
+    # Returns the manifest entries of the files.
+    entries = [ ]
+    if len(modules) > 0:
+        utility.mkdir(modules[0].include_directory())
+        utility.mkdir(os.path.dirname(modules[0].source_))
+        for m in modules:
+            entries.extend(m.create(payload, manifest))
+    return entries
@@ -4,76 +4,87 @@
 
 import os
 
+import action
 import buildtool
-import utility
+import depfile
 
 class Ninja(buildtool.BuildTool):
-    def __init__(self, src_root):
-        super(Ninja, self).__init__()
+    def __init__(self, src_root, modules, use_depfile, action_script):
+        super(Ninja, self).__init__(modules)
         self.pathname_          = os.path.join(src_root, "build.ninja")
-        self.rela_artifact_dir_ = None
         self.src_root_          = src_root
+        self.use_depfile_       = use_depfile
+        self.action_script_     = action_script # None: touch.
         self.bod_               = os.environ["BPC_BOD"]
         assert(self.bod_ is not None)
 
-    def set_rela_artifact_dir(self, rela_dir):
-        self.rela_artifact_dir_ = rela_dir
-
-    def write(self, fp):
-        for m in self.modules_:
-            fp.write("build %s/%s: touch %s " % (self.bod_,
-                                                 m.artifact_, m.source_))
-            for imp in m.imports_:
-                fp.write("$\n  %s " % (imp.interface_))
-            fp.write("\n\n")
+    def write_module(self, fp, m):
+        # With depfiles, the imports are discovered by the 'scan'
+        # rule rather than declared.
+        if self.use_depfile_:
+            fp.write("build %s/%s: scan %s\n\n" % (self.bod_,
+                                                   m.artifact_, m.source_))
+            return
+        fp.write("build %s/%s: %s %s " % (self.bod_, m.artifact_,
+                                          self.rule(), m.source_))
+        for imp in m.imports_:
+            fp.write("$\n  %s " % (imp.interface_))
+        fp.write("\n\n")
+
+    def rule(self):
+        # The rule creating artifacts.  'all' is always touched.
+        if self.action_script_ is None:
+            return "touch"
+        return "action"
 
 
 class RootNinja(Ninja):
-    def __init__(self, src_root, n_modules, files_per_dir):
-        super(RootNinja, self).__init__(src_root)
-        self.files_per_dir_ = files_per_dir
-        self.subordinates_  = [ ]
-
-    def add_subordinate(self, ninja):
-        assert(isinstance(ninja, Ninja))
-        self.subordinates_.append(ninja)
+    def __init__(self, src_root, modules, use_depfile, action_script):
+        super(RootNinja, self).__init__(src_root, modules, use_depfile,
+                                        action_script)
+        self.fp_ = None
 
     def prolog(self, fp):
         fp.write("rule touch\n"
                  "  command = touch $out\n"
                  "\n")
-
-    def write(self):
-        utility.mkdir(os.path.dirname(self.pathname_))
-        with open(self.pathname_, "w") as fp:
-            self.prolog(fp)
-
-            for sub in self.subordinates_:
-                sub.write(fp)
-
-            fp.write("build all: touch ")
-            for sub in self.subordinates_:
-                for m in sub.modules_:
-                    fp.write("$\n"
-                             "  %s/%s " % (self.bod_, m.artifact_))
-            fp.write("\n")
-
-
-def create(verbose, src_root, files_per_dir, modules):
+        if self.action_script_ is not None:
+            fp.write("rule action\n"
+                     "  command = %s\n"
+                     "\n" % (action.command(self.action_script_,
+                                            "$out", "$in")))
+        if self.use_depfile_:
+            script = depfile.script_path(self.src_root_)
+            fp.write("rule scan\n"
+                     "  command = %s\n"
+                     "  depfile = $out.d\n"
+                     "  deps = gcc\n"
+                     "\n" % (depfile.command(script, "$out", "$in",
+                                             self.action_script_)))
+
+    def epilog(self, fp):
+        fp.write("build all: touch ")
+        for artifact in self.artifacts():
+            fp.write("$\n"
+                     "  %s/%s " % (self.bod_, artifact))
+        fp.write("\n")
+
+    def begin(self):
+        self.fp_ = self.open_output(self.pathname_)
+        self.prolog(self.fp_)
+
+    def add_module(self, m):
+        self.write_module(self.fp_, m)
+
+    def end(self):
+        self.epilog(self.fp_)
+        self.fp_.close()
+        self.fp_ = None
+
+
+def create(verbose, src_root, files_per_dir, modules, use_depfile = False,
+           action_kind = action.TOUCH):
     assert(isinstance(verbose, bool))
 
-    n_modules = len(modules)
-    ninja     = RootNinja(src_root, n_modules, files_per_dir)
-
-    for m in modules:
-        mf_index = m.module_num_ // files_per_dir
-
-        if len(ninja.subordinates_) <= mf_index:
-            module_dir = os.path.dirname(m.source_)
-            mf = Ninja(module_dir)
-            mf.set_rela_artifact_dir(m.rela_artifact_dir_)
-            ninja.add_subordinate(mf)
-
-        ninja.subordinates_[mf_index].add_module(m)
-
-    return ninja
+    return RootNinja(src_root, modules, use_depfile,
+                     action.script_path(src_root, action_kind))
@@ -0,0 +1,234 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+
+import errno
+import fcntl
+import hashlib
+import os
+import random
+import shutil
+import struct
+
+import utility
+
+# Largest payload written into any file, in bytes.  This must be at
+# least as large as the largest size produced by
+# Module.random_file_length() and Module.random_interface_length().
+MAX_PAYLOAD = 1024 * 1024
+
+# ioctl(2) request for cloning a range of one file into another
+# (linux/fs.h: _IOW(0x94, 13, struct file_clone_range)).
+FICLONERANGE = 0x4020940d
+
+# Errors indicating a kernel or filesystem does not support an
+# in-kernel copy or clone; the caller falls back to a slower method.
+UNSUPPORTED = (errno.EBADF, errno.EINVAL, errno.ENOSYS, errno.ENOTTY,
+               errno.EOPNOTSUPP, errno.EXDEV, errno.ETXTBSY)
+
+
+class Payload(object):
+    # A Payload writes a file consisting of a short header (module
+    # text, such as imports) followed by 'n_bytes' of filler.  The
+    # filler is what gives the simulated modules their size.
+    #
+    # prepare() is called once before any file is written, and
+    # cleanup() once after all files are written.  Worker processes
+    # are forked after prepare(), so any state it creates is shared.
+    def __init__(self, root, seed):
+        self.root_ = root
+        self.seed_ = seed
+
+    def prepare(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+    def fill(self, fp, n_bytes):
+        raise Exception("%s.fill must be implemented" % (type(self)))
+
+    def header(self, header):
+        return header
+
+    def identity(self):
+        # Describes the filler, for digest().  Strategies producing
+        # identical content have the same identity.
+        return type(self).__name__
+
+    def size(self, header, n_bytes):
+        return len(self.header(header)) + n_bytes
+
+    def digest(self, header, n_bytes):
+        # A digest of the content write() produces, computed from its
+        # description rather than from the content.
+        h = hashlib.sha1(("%s:%d:" % (self.identity(), n_bytes)).encode())
+        h.update(self.header(header))
+        return h.hexdigest()
+
+    def write(self, pathname, header, n_bytes):
+        assert(isinstance(header, bytes))
+        assert(n_bytes <= MAX_PAYLOAD)
+        with open(pathname, "wb") as fp:
+            fp.write(self.header(header))
+            self.fill(fp, n_bytes)
+
+
+class Zeros(Payload):
+    # The filler is the character '0', written from one block that is
+    # allocated once per process.
+    def __init__(self, root, seed):
+        super(Zeros, self).__init__(root, seed)
+        self.block_ = memoryview(b"0" * MAX_PAYLOAD)
+
+    def identity(self):
+        return "Zeros"
+
+    def fill(self, fp, n_bytes):
+        fp.write(self.block_[0:n_bytes])
+
+
+class Random(Payload):
+    # The filler is incompressible data, so tools that decide if a
+    # file has changed by hashing its content (such as Scons' default
+    # md5 decider) must do realistic work.  The block is generated
+    # once from the seed, rather than by os.urandom(), so that the
+    # tree is reproducible.
+    def __init__(self, root, seed):
+        super(Random, self).__init__(root, seed)
+        rng         = random.Random("%s:payload" % (seed))
+        self.block_ = memoryview(rng.randbytes(MAX_PAYLOAD))
+
+    def identity(self):
+        return "Random:%s" % (self.seed_)
+
+    def fill(self, fp, n_bytes):
+        fp.write(self.block_[0:n_bytes])
+
+
+class Sparse(Payload):
+    # The filler is a hole; no data blocks are allocated.  Reads of
+    # the filler return NUL bytes.
+    def fill(self, fp, n_bytes):
+        fp.flush()
+        fd = fp.fileno()
+        os.ftruncate(fd, os.lseek(fd, 0, os.SEEK_CUR) + n_bytes)
+
+
+class Template(Zeros):
+    # The filler is copied in-kernel from a template file of '0'
+    # characters, so no payload data passes through Python.  The
+    # content is identical to Zeros, which is also used as a fallback
+    # when the kernel cannot copy between the files.
+    def __init__(self, root, seed):
+        super(Template, self).__init__(root, seed)
+        self.dir_          = os.path.join(root, ".payload")
+        self.template_     = os.path.join(self.dir_, "template")
+        self.template_fd_  = None
+        self.copy_range_   = hasattr(os, "copy_file_range")
+        self.sendfile_     = hasattr(os, "sendfile")
+
+    def prepare(self):
+        utility.mkdir(self.dir_)
+        with open(self.template_, "wb") as fp:
+            fp.write(self.block_)
+        self.template_fd_ = os.open(self.template_, os.O_RDONLY)
+
+    def cleanup(self):
+        if self.template_fd_ is not None:
+            os.close(self.template_fd_)
+            self.template_fd_ = None
+        shutil.rmtree(self.dir_, ignore_errors = True)
+
+    def copy(self, fd, n_bytes):
+        # Returns the number of bytes that could not be copied
+        # in-kernel.
+        offset = 0
+        while offset < n_bytes and self.copy_range_:
+            try:
+                n = os.copy_file_range(self.template_fd_, fd,
+                                       n_bytes - offset, offset)
+            except OSError as exc:
+                if exc.errno not in UNSUPPORTED:
+                    raise
+                self.copy_range_ = False
+                break
+            if n == 0:
+                break
+            offset += n
+
+        while offset < n_bytes and self.sendfile_:
+            try:
+                n = os.sendfile(fd, self.template_fd_,
+                                offset, n_bytes - offset)
+            except OSError as exc:
+                if exc.errno not in UNSUPPORTED:
+                    raise
+                self.sendfile_ = False
+                break
+            if n == 0:
+                break
+            offset += n
+
+        return n_bytes - offset
+
+    def fill(self, fp, n_bytes):
+        fp.flush()
+        residual = self.copy(fp.fileno(), n_bytes)
+        if residual > 0:
+            super(Template, self).fill(fp, residual)
+
+
+class Reflink(Template):
+    # The filler shares the template's data blocks (FICLONERANGE), on
+    # filesystems that support it (Btrfs, XFS, ...).  A clone must
+    # start on a block boundary, so the header is padded with newlines
+    # to a multiple of the filesystem block size.  If cloning is not
+    # supported, the Template copy is used; the content is the same.
+    def __init__(self, root, seed):
+        super(Reflink, self).__init__(root, seed)
+        self.clone_      = True
+        self.block_size_ = None
+
+    def prepare(self):
+        super(Reflink, self).prepare()
+        self.block_size_ = os.fstat(self.template_fd_).st_blksize
+        assert(MAX_PAYLOAD % self.block_size_ == 0)
+
+    def header(self, header):
+        padding = -len(header) % self.block_size_
+        return header + b"\n" * padding
+
+    def clone(self, fd, n_bytes):
+        length = n_bytes + (-n_bytes % self.block_size_)
+        offset = os.lseek(fd, 0, os.SEEK_CUR)
+        arg    = struct.pack("qQQQ", self.template_fd_, 0, length, offset)
+        try:
+            fcntl.ioctl(fd, FICLONERANGE, arg)
+        except OSError as exc:
+            if exc.errno not in UNSUPPORTED:
+                raise
+            self.clone_ = False
+            return False
+        # The clone is rounded up to a whole block; trim it.
+        os.ftruncate(fd, offset + n_bytes)
+        return True
+
+    def fill(self, fp, n_bytes):
+        fp.flush()
+        if not (self.clone_ and self.clone(fp.fileno(), n_bytes)):
+            super(Reflink, self).fill(fp, n_bytes)
+
+
+STRATEGIES = {
+    "random"   : Random,
+    "reflink"  : Reflink,
+    "sparse"   : Sparse,
+    "template" : Template,
+    "zeros"    : Zeros,
+}
+
+
+def create(kind, root, seed):
+    assert(kind in STRATEGIES)
+    return STRATEGIES[kind](root, seed)
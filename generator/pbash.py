@@ -0,0 +1,92 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# A parallel Bash script.
+#
+# The Bash script (bash.py) is a serial chain of scripts.  This script
+# instead divides the modules into one batch script for each module
+# directory, and runs up to BPC_PARALLEL batches at once as background
+# jobs, starting the next batch as each finishes ('wait -n').
+# Artifacts do not depend on other artifacts, so the batches are
+# independent.  Each batch creates its artifacts with the Bash
+# script's tests and action (see bash.py), and exits with a non-zero
+# status if any action fails, as does the script.
+
+import os
+
+import action
+import bash
+import buildtool
+import utility
+
+class Script(buildtool.BuildTool):
+    def __init__(self, src_root, modules, files_per_dir, action_script):
+        super(Script, self).__init__(modules)
+        self.pathname_      = os.path.join(src_root, "build-parallel.sh")
+        self.bash_dir_      = os.path.join(src_root, "bash-parallel")
+        self.action_script_ = action_script # None: touch.
+
+    def batch_script(self, dir_num):
+        assert(isinstance(dir_num, int))
+        return os.path.join(self.bash_dir_, "batch_%d.sh" % (dir_num))
+
+    def begin(self):
+        utility.mkdir(self.bash_dir_)
+
+        with self.open_output(self.pathname_, executable = True) as fp:
+            bash.prolog(fp)
+            bash.make_directories(fp, self.artifact_dirs())
+
+            fp.write("\n"
+                     "# Run the batches, at most PARALLEL at once.\n"
+                     "PARALLEL=${BPC_PARALLEL:-1};\n"
+                     "status=0;\n"
+                     "running=0;\n"
+                     "for (( d = 0; d < %d; d++ )) ; do\n"
+                     "    if (( running >= PARALLEL )) ; then\n"
+                     "        wait -n || status=1;\n"
+                     "        running=$(( running - 1 ));\n"
+                     "    fi;\n"
+                     "    \"%s/batch_${d}.sh\" &\n"
+                     "    running=$(( running + 1 ));\n"
+                     "done;\n"
+                     "while (( running > 0 )) ; do\n"
+                     "    wait -n || status=1;\n"
+                     "    running=$(( running - 1 ));\n"
+                     "done;\n"
+                     "exit ${status};\n" % (self.graph_.n_dirs(),
+                                            self.bash_dir_))
+
+    def create_artifact(self, fp, m):
+        # The failure of an action, rather than of a test, is the
+        # batch's.
+        fp.write("\n"
+                 "if %s ; then\n"
+                 "    if %s ; then\n"
+                 "        [ ! -z \"${VERBOSE:-}\" ] \\\n"
+                 "        && builtin echo \"Creating '${BOD}/%s'\";\n"
+                 "    else\n"
+                 "        status=1;\n"
+                 "    fi;\n"
+                 "fi;\n" %
+                 (" \\\n   || ".join(bash.out_of_date_tests(m)),
+                  bash.artifact_action(self.action_script_, m),
+                  m.artifact_))
+
+    def write_directory(self, modules):
+        pathname = self.batch_script(modules[0].dir_num())
+        with self.open_output(pathname, executable = True) as fp:
+            bash.prolog(fp)
+            fp.write("status=0;\n")
+            for m in modules:
+                self.create_artifact(fp, m)
+            fp.write("\nexit ${status};\n")
+
+
+def create(verbose, src_root, files_per_dir, modules,
+           action_kind = action.TOUCH):
+    assert(isinstance(verbose, bool))
+
+    return Script(src_root, modules, files_per_dir,
+                  action.script_path(src_root, action_kind))
@@ -0,0 +1,112 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# A lean single Makefile.
+#
+# The single Makefile (smakefile.py) writes an explicit rule, with its
+# own recipe, for each module, and computes each source path with a
+# function when the Makefile is parsed.  This Makefile holds the same
+# dependency graph in the form that is cheapest for Make to read:
+#
+#   . the built-in rules and suffixes are disabled in the Makefile,
+#   . each module directory has one static pattern rule, with the
+#     only recipe, for all its artifacts,
+#   . the imports of each module are a dependency line with no
+#     recipe, and
+#   . every path is written in full, so nothing is computed when the
+#     Makefile is parsed.
+#
+# The difference between the two Makefiles' results is the cost of
+# the Makefile style, rather than of Make.
+
+import os
+
+import action
+import buildtool
+import depfile
+
+class Makefile(buildtool.BuildTool):
+    def __init__(self, src_root, modules, depfile_script, action_script):
+        super(Makefile, self).__init__(modules)
+        self.pathname_       = os.path.join(src_root, "Makefile.pattern")
+        self.src_root_       = src_root
+        self.depfile_script_ = depfile_script # None: imports declared.
+        self.action_script_  = action_script  # None: touch.
+        self.bod_            = os.environ["BPC_BOD"]
+        self.fp_             = None
+        assert(self.bod_ is not None)
+
+    def recipe(self):
+        if self.depfile_script_ is None:
+            return action.command(self.action_script_, "$@", "$^")
+        return depfile.command(self.depfile_script_, "$@", "$<",
+                               self.action_script_)
+
+    def prolog(self, fp):
+        fp.write("MAKEFLAGS\t+= --no-builtin-rules\n"
+                 ".SUFFIXES:\n\n"
+                 "$(if $(BOD),,$(error BOD "
+                 "must be set to build output location. "
+                 "It must not be in the source tree))\n\n"
+                 "Q\t:= $(if $(VERBOSE),,@)\n"
+                 ".DEFAULT_GOAL\t:=\tbuild\n\n"
+                 "clean:\n\trm -rf $(BOD);\n\n")
+
+    def write_directory(self, modules):
+        rela_dir = modules[0].rela_artifact_dir_
+        var      = "ARTIFACT_%d" % (modules[0].dir_num())
+        bod_dir  = os.path.join(self.bod_, rela_dir)
+        src_dir  = os.path.dirname(modules[0].source_)
+        fp       = self.fp_
+
+        fp.write("%s\t:=" % (var))
+        for m in modules:
+            fp.write("\t\\\n\t%s/%s" % (self.bod_, m.artifact_))
+        fp.write("\n\n"
+                 "%s:\n"
+                 "\t$(Q)mkdir --parents $@\n\n" % (bod_dir))
+        fp.write("$(%s): %s/%%.artifact: %s/%%.source | %s\n"
+                 "\t$(Q)%s\n\n" % (var, bod_dir, src_dir, bod_dir,
+                                   self.recipe()))
+
+        if self.depfile_script_ is not None:
+            # The imports are discovered when each artifact is made.
+            fp.write("-include $(%s:=.d)\n\n" % (var))
+        else:
+            for m in modules:
+                if len(m.imports_) == 0:
+                    continue
+                fp.write("%s/%s:" % (self.bod_, m.artifact_))
+                for imp in m.imports_:
+                    fp.write(" \\\n\t%s" % (imp.interface_))
+                fp.write("\n")
+            fp.write("\n")
+
+        fp.write("build: $(%s)\n\n" % (var))
+
+    def epilog(self, fp):
+        fp.write(".PHONY:\tbuild\n\n"
+                 "build:\n"
+                 "\t$(Q)echo \"All targets up-to-date.\";\n")
+
+    def begin(self):
+        self.fp_ = self.open_output(self.pathname_)
+        self.prolog(self.fp_)
+
+    def end(self):
+        super(Makefile, self).end()
+        self.epilog(self.fp_)
+        self.fp_.close()
+        self.fp_ = None
+
+
+def create(verbose, src_root, files_per_dir, modules, use_depfile = False,
+           action_kind = action.TOUCH):
+    assert(isinstance(verbose, bool))
+
+    depfile_script = None
+    if use_depfile:
+        depfile_script = depfile.script_path(src_root)
+    return Makefile(src_root, modules, depfile_script,
+                    action.script_path(src_root, action_kind))
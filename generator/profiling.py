@@ -0,0 +1,134 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# Per-stage accounting of the generator's time and memory.
+#
+# The generator's work is divided into named stages (sampling the
+# module graph, writing the module files, writing each build system,
+# ...).  The stages of a single-process generation are interleaved,
+# one directory at a time, so each stage accumulates over all the
+# intervals it is entered.  Stages may nest; time spent in an inner
+# stage is charged only to the inner stage.
+#
+# Wall and CPU time are always accounted, as the cost is a few clock
+# reads per directory.  Peak memory is accounted only when requested,
+# as tracemalloc slows every allocation.
+import contextlib
+import time
+import tracemalloc
+
+
+class Stage(object):
+    def __init__(self, name):
+        self.name_  = name
+        self.calls_ = 0
+        self.wall_  = 0.0       # Seconds.
+        self.cpu_   = 0.0       # Seconds.
+        self.peak_  = 0         # Bytes traced at most, while in the stage.
+
+    def results(self):
+        return {
+            "calls"        : self.calls_,
+            "cpu-seconds"  : self.cpu_,
+            "peak-bytes"   : self.peak_,
+            "wall-seconds" : self.wall_,
+        }
+
+
+class Profiler(object):
+    def __init__(self, trace_memory = False):
+        self.trace_memory_ = trace_memory
+        self.stages_       = { } # Name -> Stage, in order of first use.
+        self.stack_        = [ ] # Stages entered, innermost last.
+        self.wall_         = time.perf_counter()
+        self.cpu_          = time.process_time()
+        self.start_wall_   = self.wall_
+        self.start_cpu_    = self.cpu_
+
+    def start(self):
+        if self.trace_memory_:
+            tracemalloc.start()
+        self.wall_       = time.perf_counter()
+        self.cpu_        = time.process_time()
+        self.start_wall_ = self.wall_
+        self.start_cpu_  = self.cpu_
+
+    def stop(self):
+        self.charge()
+        if self.trace_memory_:
+            tracemalloc.stop()
+
+    def charge(self):
+        # Charge the time since the last stage was entered or left to
+        # the innermost stage.
+        wall = time.perf_counter()
+        cpu  = time.process_time()
+        if len(self.stack_) > 0:
+            s        = self.stack_[-1]
+            s.wall_ += wall - self.wall_
+            s.cpu_  += cpu - self.cpu_
+            if self.trace_memory_ and tracemalloc.is_tracing():
+                s.peak_ = max(s.peak_, tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+        self.wall_ = wall
+        self.cpu_  = cpu
+
+    def get_stage(self, name):
+        s = self.stages_.get(name)
+        if s is None:
+            s = Stage(name)
+            self.stages_[name] = s
+        return s
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.charge()
+        s = self.get_stage(name)
+        s.calls_ += 1
+        self.stack_.append(s)
+        try:
+            yield s
+        finally:
+            self.charge()
+            self.stack_.pop()
+
+    def merge(self, stages):
+        # Add the stages measured by another process; see results().
+        for (name, r) in stages.items():
+            s         = self.get_stage(name)
+            s.calls_ += r["calls"]
+            s.wall_  += r["wall-seconds"]
+            s.cpu_   += r["cpu-seconds"]
+            s.peak_   = max(s.peak_, r["peak-bytes"])
+
+    def elapsed(self, name):
+        return self.get_stage(name).wall_
+
+    def total(self):
+        # Wall and CPU seconds since start().
+        return (self.wall_ - self.start_wall_, self.cpu_ - self.start_cpu_)
+
+    def results(self):
+        (wall, cpu) = self.total()
+        return {
+            "cpu-seconds"  : cpu,
+            "wall-seconds" : wall,
+            "stages"       : { s.name_ : s.results()
+                               for s in self.stages_.values() },
+        }
+
+    def report(self):
+        # Lines of a table of the stages.
+        lines = [ "%-24s %10s %10s %12s" % ("stage", "wall", "cpu",
+                                            "peak memory") ]
+        for s in self.stages_.values():
+            if self.trace_memory_:
+                peak = "%dK" % (s.peak_ // 1024)
+            else:
+                peak = "-"
+            lines.append("%-24s %10.3f %10.3f %12s" % (s.name_, s.wall_,
+                                                       s.cpu_, peak))
+        (wall, cpu) = self.total()
+        lines.append("%-24s %10.3f %10.3f" % ("total", wall, cpu))
+        return lines
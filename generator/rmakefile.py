@@ -4,15 +4,18 @@
 
 import os
 
+import action
 import buildtool
-import utility
+import depfile
 
 class Makefile(buildtool.BuildTool):
-    def __init__(self, src_root):
-        super(Makefile, self).__init__()
+    def __init__(self, src_root, modules, depfile_script, action_script):
+        super(Makefile, self).__init__(modules)
         self.pathname_          = os.path.join(src_root, "Makefile.recursive")
         self.rela_artifact_dir_ = None
         self.src_root_          = src_root
+        self.depfile_script_    = depfile_script # None: imports declared.
+        self.action_script_     = action_script  # None: touch.
 
     def atsign(self):
         return "$(if $(VERBOSE),,@)"
@@ -20,16 +23,21 @@ class Makefile(buildtool.BuildTool):
     def set_rela_artifact_dir(self, rela_dir):
         self.rela_artifact_dir_ = rela_dir
 
-    def write(self):
-        utility.mkdir(os.path.dirname(self.pathname_))
-        with open(self.pathname_, "w") as fp:
+    def recipe(self):
+        if self.depfile_script_ is None:
+            return "%s;" % (action.command(self.action_script_, "$@", "$^"))
+        return "%s;" % (depfile.command(self.depfile_script_, "$@", "$<",
+                                        self.action_script_))
+
+    def write_subordinate(self, modules):
+        with self.open_output(self.pathname_) as fp:
             # Pattern rule to turn sources into artifacts.
             fp.write("%%.artifact:\t%%.source\n"
-                     "\t%stouch $@;\n\n" % (self.atsign()))
+                     "\t%s%s\n\n" % (self.atsign(), self.recipe()))
 
             fp.write("SOURCE\t:=\t\t\\\n")
             first = True
-            for m in self.modules_:
+            for m in modules:
                 if not first:
                     fp.write("\t\t\\\n")
                 fp.write("\t%s" % (os.path.basename(m.source_)))
@@ -37,33 +45,32 @@ class Makefile(buildtool.BuildTool):
             fp.write("\n\n"
                      "ARTIFACT\t= $(SOURCE:.source=.artifact)\n\n")
 
-            # Set all import files as prerequisites.
-            for m in self.modules_:
-                for imp in m.imports_:
-                    fp.write("%s: %s\n" % (os.path.basename(m.artifact_),
-                                           imp.interface_))
+            if self.depfile_script_ is not None:
+                # The imports are discovered when each artifact is made.
+                fp.write("-include $(ARTIFACT:=.d)\n")
+            else:
+                # Set all import files as prerequisites.
+                for m in modules:
+                    for imp in m.imports_:
+                        fp.write("%s: %s\n" % (os.path.basename(m.artifact_),
+                                               imp.interface_))
             fp.write("\nsubdirectory__: $(ARTIFACT)\n\n")
 
 
 class RootMakefile(Makefile):
-    def __init__(self, src_root, n_modules, files_per_dir):
-        super(RootMakefile, self).__init__(src_root)
-        self.files_per_dir_ = files_per_dir
-        self.subordinates_  = [ ]
-
-    def add_subordinate(self, makefile):
-        assert(isinstance(makefile, Makefile))
-        self.subordinates_.append(makefile)
+    def __init__(self, src_root, modules, depfile_script, action_script):
+        super(RootMakefile, self).__init__(src_root, modules, depfile_script,
+                                           action_script)
 
     def create_subordinate_directories(self, fp):
         # Create rules for creating build output directories for subordinate
         # Makefiles.
         fp.write("$(addprefix $(BOD)/,")
         first = True
-        for sub in self.subordinates_:
+        for rela_dir in self.artifact_dirs():
             if not first:
                 fp.write(" ")
-            fp.write("%s" % (sub.rela_artifact_dir_))
+            fp.write("%s" % (rela_dir))
             first = False
         fp.write("):\n")
         fp.write("\t%smkdir --parents $@; "
@@ -72,17 +79,17 @@ class RootMakefile(Makefile):
 
         fp.write("create-build-directories:\t\\\n\t|")
         first = True
-        for sub in self.subordinates_:
+        for rela_dir in self.artifact_dirs():
             if not first:
                 fp.write("\t ")
-            fp.write(" $(addprefix $(BOD)/,%s)\t\\\n" % (sub.rela_artifact_dir_))
+            fp.write(" $(addprefix $(BOD)/,%s)\t\\\n" % (rela_dir))
             first = False
         fp.write("\n\n")
 
     def invoke_subordinate_make(self, fp):
         silent = ""
-        for sub in self.subordinates_:
-            fp.write("%s " % (sub.rela_artifact_dir_))
+        for rela_dir in self.artifact_dirs():
+            fp.write("%s " % (rela_dir))
         fp.write(":\tcreate-build-directories\n"
                  "\t%s$(MAKE)\t\t\t\\\n"
                  "\t    $(if $(VERBOSE),,--silent)\t\\\n"
@@ -113,43 +120,35 @@ class RootMakefile(Makefile):
     def default_goal(self, fp):
         fp.write(".PHONY:\tbuild\n\n")
         fp.write("build:\t")
-        for sub in self.subordinates_:
-            fp.write("\t%s" % (sub.rela_artifact_dir_))
+        for rela_dir in self.artifact_dirs():
+            fp.write("\t%s" % (rela_dir))
         fp.write("\n\t%secho \"All targets up-to-date.\";\n" % self.atsign())
         fp.write("\n")
 
-    def write(self):
-        utility.mkdir(os.path.dirname(self.pathname_))
-        with open(self.pathname_, "w") as fp:
+    def begin(self):
+        # The root Makefile refers only to the module directories, so
+        # it is written before any module is seen.
+        with self.open_output(self.pathname_) as fp:
             self.prolog(fp)
             self.subordinate_rules(fp)
             self.default_goal(fp)
 
-        for sub in self.subordinates_:
-            sub.write()
+    def write_directory(self, modules):
+        # Write the subordinate Makefile for this set of modules.
+        module_dir = os.path.dirname(modules[0].source_)
+        mf = Makefile(module_dir, self.graph_, self.depfile_script_,
+                      self.action_script_)
+        mf.set_manifest(self.manifest_)
+        mf.set_rela_artifact_dir(modules[0].rela_artifact_dir_)
+        mf.write_subordinate(modules)
 
 
-def create(verbose, src_root, files_per_dir, modules):
+def create(verbose, src_root, files_per_dir, modules, use_depfile = False,
+           action_kind = action.TOUCH):
     assert(isinstance(verbose, bool))
 
-    n_modules     = len(modules)
-    root_makefile = RootMakefile(src_root, n_modules, files_per_dir)
-
-    # Compute number of recursively invoked Makefiles.
-    n_makefiles = n_modules // files_per_dir + 1
-    makefiles   = [ ]
-
-    for m in modules:
-        mf_index = m.module_num_ // files_per_dir
-
-        # Add a subordinate Makefile for this set of modules.
-
-        if len(root_makefile.subordinates_) <= mf_index:
-            module_dir = os.path.dirname(m.source_)
-            mf = Makefile(module_dir)
-            mf.set_rela_artifact_dir(m.rela_artifact_dir_)
-            root_makefile.add_subordinate(mf)
-
-        root_makefile.subordinates_[mf_index].add_module(m)
-
-    return root_makefile
+    depfile_script = None
+    if use_depfile:
+        depfile_script = depfile.script_path(src_root)
+    return RootMakefile(src_root, modules, depfile_script,
+                        action.script_path(src_root, action_kind))
@@ -0,0 +1,190 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# Batched sampling of the module graph.
+#
+# Every random value is a counter-based hash (splitmix64) of the
+# seed, the module number and the purpose of the value.  Nothing
+# depends on the order in which values are drawn, so a range of
+# modules can be sampled at once, and the NumPy and pure-Python
+# implementations below produce identical graphs for a seed.
+import array
+import bisect
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MASK64  = (1 << 64) - 1
+GOLDEN  = 0x9e3779b97f4a7c15
+MIX1    = 0xbf58476d1ce4e5b9
+MIX2    = 0x94d049bb133111eb
+
+# Hash streams used for module sizes, for the number of imports of a
+# module, and for the parents of a module directory (see
+# module.Layout).  Import streams are (slot << 32) | round, and never
+# have the top bit set.
+SIZE_STREAM  = 1 << 63
+COUNT_STREAM = (1 << 63) | (1 << 62)
+DIR_STREAM   = (1 << 63) | (1 << 61)
+
+
+def mix(z):
+    z = (z + GOLDEN) & MASK64
+    z = ((z ^ (z >> 30)) * MIX1) & MASK64
+    z = ((z ^ (z >> 27)) * MIX2) & MASK64
+    return z ^ (z >> 31)
+
+
+def unit_interval(h):
+    # The top 53 bits of a hash, as a float in [0, 1).
+    return (h >> 11) * (1.0 / (1 << 53))
+
+
+def py_imports(seed, lo, hi, topology):
+    # Each module 'i' imports topology.n_imports(i) distinct modules
+    # from [0, i).  Slot 'j' takes the module that the topology maps
+    # the hash of (j, round) to; a slot whose value duplicates that of
+    # a lower slot is redrawn with its next round until all slots are
+    # distinct.
+    counts  = array.array("i")
+    targets = array.array("i")
+    for i in range(lo, hi):
+        base   = mix((seed ^ i) & MASK64)
+        k      = topology.n_imports(i, base)
+        rounds = [ 0 ] * k
+        values = [ topology.target(i, mix(base ^ (j << 32)), 0)
+                   for j in range(0, k) ]
+        while True:
+            seen   = set()
+            marked = [ ]
+            for j in range(0, k):
+                if values[j] in seen:
+                    marked.append(j)
+                else:
+                    seen.add(values[j])
+            if len(marked) == 0:
+                break
+            for j in marked:
+                rounds[j] += 1
+                values[j] = topology.target(i, mix(base ^ ((j << 32) |
+                                                           rounds[j])),
+                                            rounds[j])
+        counts.append(k)
+        targets.extend(values)
+    return (counts, targets)
+
+
+def py_sizes(seed, lo, hi, table, stream):
+    # 'table' is (thresholds, ranges): a module's size is drawn
+    # uniformly from ranges[b], where 'b' is the number of thresholds
+    # not exceeding a uniform value in [0, 1).
+    (thresholds, ranges) = table
+    sizes = array.array("H")
+    for i in range(lo, hi):
+        base    = mix((seed ^ i) & MASK64)
+        percent = unit_interval(mix(base ^ (SIZE_STREAM | (2 * stream))))
+        value   = mix(base ^ (SIZE_STREAM | (2 * stream + 1)))
+        (s_lo, s_hi) = ranges[bisect.bisect_right(thresholds, percent)]
+        sizes.append(s_lo + value % (s_hi - s_lo + 1))
+    return sizes
+
+
+def np_mix(z):
+    z = z + numpy.uint64(GOLDEN)
+    z = (z ^ (z >> numpy.uint64(30))) * numpy.uint64(MIX1)
+    z = (z ^ (z >> numpy.uint64(27))) * numpy.uint64(MIX2)
+    return z ^ (z >> numpy.uint64(31))
+
+
+def np_bases(seed, lo, hi):
+    modules = numpy.arange(lo, hi, dtype = numpy.uint64)
+    return (modules, np_mix(modules ^ numpy.uint64(seed & MASK64)))
+
+
+def np_imports(seed, lo, hi, topology):
+    # Vectorized form of py_imports(); all slots of all modules in
+    # [lo, hi) are drawn, and redrawn, together.
+    (modules, base) = np_bases(seed, lo, hi)
+    n       = hi - lo
+    width   = topology.max_imports_
+    k       = topology.np_n_imports(modules, base)
+    slots   = numpy.arange(width, dtype = numpy.uint64)
+    valid   = slots[None, :] < k[:, None].astype(numpy.uint64)
+    rounds  = numpy.zeros((n, width), dtype = numpy.uint64)
+    shift   = numpy.uint64(32)
+
+    values = topology.np_target(modules[:, None],
+                                np_mix(base[:, None] ^
+                                       (slots[None, :] << shift)),
+                                rounds)
+
+    # Only rows holding a duplicate are examined again.
+    active = numpy.arange(n)
+    while len(active) > 0:
+        # Mark every valid slot whose value is held by a lower slot.
+        # A stable sort keeps equal values in slot order, so all but
+        # the first of each run of equal values are marked.
+        keyed  = numpy.where(valid[active], values[active],
+                             numpy.uint64(MASK64))
+        order  = numpy.argsort(keyed, axis = 1, kind = "stable")
+        ranked = numpy.take_along_axis(keyed, order, axis = 1)
+        marked = numpy.zeros(keyed.shape, dtype = bool)
+        numpy.put_along_axis(marked, order[:, 1:],
+                             ranked[:, 1:] == ranked[:, :-1], axis = 1)
+        marked &= valid[active]
+
+        redraw = marked.any(axis = 1)
+        active = active[redraw]
+        (rows, cols) = numpy.nonzero(marked[redraw])
+        rows = active[rows]
+        rounds[rows, cols] += numpy.uint64(1)
+        values[rows, cols] = topology.np_target(modules[rows],
+                                                np_mix(base[rows] ^
+                                                       ((slots[cols] << shift) |
+                                                        rounds[rows, cols])),
+                                                rounds[rows, cols])
+
+    counts  = array.array("i")
+    targets = array.array("i")
+    counts.frombytes(k.astype(numpy.int32).tobytes())
+    targets.frombytes(values[valid].astype(numpy.int32).tobytes())
+    return (counts, targets)
+
+
+def np_sizes(seed, lo, hi, table, stream):
+    # Vectorized form of py_sizes().
+    (thresholds, ranges) = table
+    (modules, base) = np_bases(seed, lo, hi)
+    stream  = numpy.uint64(SIZE_STREAM | (2 * stream))
+    percent = (np_mix(base ^ stream) >> numpy.uint64(11)).astype(numpy.float64)
+    percent = percent * (1.0 / (1 << 53))
+    value   = np_mix(base ^ (stream | numpy.uint64(1)))
+    bucket  = numpy.searchsorted(numpy.array(thresholds), percent,
+                                 side = "right")
+    s_lo    = numpy.array([ r[0] for r in ranges ], dtype = numpy.uint64)
+    span    = numpy.array([ r[1] - r[0] + 1 for r in ranges ],
+                          dtype = numpy.uint64)
+    sizes   = array.array("H")
+    sizes.frombytes((s_lo[bucket] +
+                     value % span[bucket]).astype(numpy.uint16).tobytes())
+    return sizes
+
+
+def sample_imports(seed, lo, hi, topology):
+    # Returns (counts, targets): the number of imports of each module
+    # in [lo, hi), and the imported module numbers, concatenated.
+    # 'topology' is a topology.Topology.
+    if numpy is not None:
+        return np_imports(seed, lo, hi, topology)
+    return py_imports(seed, lo, hi, topology)
+
+
+def sample_sizes(seed, lo, hi, table, stream):
+    # Returns the size of each module in [lo, hi), drawn from 'table';
+    # 'stream' distinguishes independent sizes of the same module.
+    if numpy is not None:
+        return np_sizes(seed, lo, hi, table, stream)
+    return py_sizes(seed, lo, hi, table, stream)
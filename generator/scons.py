@@ -4,59 +4,60 @@
 
 import os
 
+import action
 import buildtool
-import utility
 
 class SConstruct(buildtool.BuildTool):
-    def __init__(self, src_root, n_modules, files_per_dir):
-        super(SConstruct, self).__init__()
+    def __init__(self, src_root, modules, files_per_dir, action_script):
+        super(SConstruct, self).__init__(modules)
         self.pathname_          = os.path.join(src_root, "SConstruct")
         self.rela_artifact_dir_ = None
         self.src_root_          = src_root
         self.bod_               = os.environ["BPC_BOD"]
+        self.fp_                = None
+        self.action_script_     = action_script # None: touch.
 
     def set_rela_artifact_dir(self, rela_dir):
         self.rela_artifact_dir_ = rela_dir
 
     def epilog(self, fp):
         fp.write("env.Alias(\"all\",[\n")
-        for m in self.modules_:
-            fp.write("          \"%s/%s\",\n" % (self.bod_, m.artifact_))
+        for artifact in self.artifacts():
+            fp.write("          \"%s/%s\",\n" % (self.bod_, artifact))
         fp.write("          ])\n")
 
     def prolog(self, fp):
         fp.write("import os\n\n")
-        fp.write("arti = Builder(action='touch $TARGET')\n"
+        fp.write("arti = Builder(action='%s')\n"
                  "env  = Environment(BUILDERS={'CreateArtifact': arti})\n"
                  "SetOption('silent', True)\n"
-                 "\n")
+                 "\n" % (action.command(self.action_script_,
+                                        "$TARGET", "$SOURCES")))
         fp.write("if os.getenv(\"SCONS_MAKE\", None) is not None:\n"
                  "    Decider('make')\n\n")
 
-    def write(self):
-        utility.mkdir(os.path.dirname(self.pathname_))
-        with open(self.pathname_, "w") as fp:
-            self.prolog(fp)
+    def begin(self):
+        self.fp_ = self.open_output(self.pathname_)
+        self.prolog(self.fp_)
 
-            for m in self.modules_:
-                fp.write("env.CreateArtifact(\"%s/%s\",\n"
-                         "                   [\"%s\",\n" % (self.bod_,
-                                                            m.artifact_,
-                                                            m.source_))
-                for i in m.imports_:
-                    fp.write("                    \"%s\",\n" % (i.interface_))
+    def add_module(self, m):
+        self.fp_.write("env.CreateArtifact(\"%s/%s\",\n"
+                       "                   [\"%s\",\n" % (self.bod_,
+                                                          m.artifact_,
+                                                          m.source_))
+        for i in m.imports_:
+            self.fp_.write("                    \"%s\",\n" % (i.interface_))
 
-                fp.write("                   ])\n\n")
+        self.fp_.write("                   ])\n\n")
 
-            self.epilog(fp)
+    def end(self):
+        self.epilog(self.fp_)
+        self.fp_.close()
+        self.fp_ = None
 
-def create(verbose, src_root, files_per_dir, modules):
+def create(verbose, src_root, files_per_dir, modules,
+           action_kind = action.TOUCH):
     assert(isinstance(verbose, bool))
 
-    n_modules  = len(modules)
-    sconstruct = SConstruct(src_root, n_modules, files_per_dir)
-
-    for m in modules:
-        sconstruct.add_module(m)
-
-    return sconstruct
+    return SConstruct(src_root, modules, files_per_dir,
+                      action.script_path(src_root, action_kind))
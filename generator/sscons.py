@@ -0,0 +1,90 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# SCons files split by directory.
+#
+# The SConstruct (scons.py) holds every module's builder call and an
+# 'all' alias naming every artifact.  SConstruct.split instead reads
+# one SConscript for each module directory, with the directory's
+# artifact directory as its 'variant_dir', so each SConscript names
+# its files relative to its own directory.  'all' is an alias of the
+# artifact directories.
+#
+# SConstruct.split can be tuned through the environment:
+#
+#   SCONS_DECIDER        : the Decider() ('make', 'timestamp-match',
+#                          ...); by default, file content.
+#   SCONS_IMPLICIT_CACHE : when set, SetOption('implicit_cache').
+#
+# SCons command line options, such as --max-drift, are given with
+# BPC_BUILD_ADDITIONAL_ARGS.
+
+import os
+
+import action
+import buildtool
+
+class SConscript(buildtool.BuildTool):
+    def __init__(self, src_root, modules, action_script):
+        super(SConscript, self).__init__(modules)
+        self.pathname_      = os.path.join(src_root, "SConstruct.split")
+        self.src_root_      = src_root
+        self.action_script_ = action_script # None: touch.
+        self.bod_           = os.environ["BPC_BOD"]
+        assert(self.bod_ is not None)
+
+    def dir_pathname(self, modules):
+        return os.path.join(os.path.dirname(modules[0].source_),
+                            "SConscript")
+
+    def prolog(self, fp):
+        fp.write("import os\n\n")
+        fp.write("arti = Builder(action='%s')\n"
+                 "env  = Environment(BUILDERS={'CreateArtifact': arti})\n"
+                 "SetOption('silent', True)\n"
+                 "\n" % (action.command(self.action_script_,
+                                        "$TARGET", "$SOURCES")))
+        fp.write("if os.getenv(\"SCONS_DECIDER\", None) is not None:\n"
+                 "    Decider(os.getenv(\"SCONS_DECIDER\"))\n\n"
+                 "if os.getenv(\"SCONS_IMPLICIT_CACHE\", None) is not None:\n"
+                 "    SetOption('implicit_cache', 1)\n\n"
+                 "Export('env')\n\n")
+
+    def begin(self):
+        # The root file refers only to the module directories, so it
+        # is written before any module is seen.
+        with self.open_output(self.pathname_) as fp:
+            self.prolog(fp)
+            for d in range(0, self.graph_.n_dirs()):
+                fp.write("SConscript(\"%s\",\n"
+                         "           variant_dir = \"%s/%s\",\n"
+                         "           duplicate   = 0)\n" %
+                         (os.path.join(self.graph_.src_dir_,
+                                       self.graph_.dir_path(d), "SConscript"),
+                          self.bod_, self.graph_.rela_artifact_dir(d)))
+
+            fp.write("\nenv.Alias(\"all\", [\n")
+            for rela_dir in self.artifact_dirs():
+                fp.write("          \"%s/%s\",\n" % (self.bod_, rela_dir))
+            fp.write("          ])\n")
+
+    def write_directory(self, modules):
+        with self.open_output(self.dir_pathname(modules)) as fp:
+            fp.write("Import('env')\n\n")
+            for m in modules:
+                fp.write("env.CreateArtifact(\"%s\",\n"
+                         "                   [\"%s\",\n" %
+                         (os.path.basename(m.artifact_),
+                          os.path.basename(m.source_)))
+                for i in m.imports_:
+                    fp.write("                    \"%s\",\n" % (i.interface_))
+                fp.write("                   ])\n\n")
+
+
+def create(verbose, src_root, files_per_dir, modules,
+           action_kind = action.TOUCH):
+    assert(isinstance(verbose, bool))
+
+    return SConscript(src_root, modules,
+                      action.script_path(src_root, action_kind))
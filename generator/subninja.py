@@ -0,0 +1,120 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# Ninja files split by directory: the root file holds the rules and
+# variables, and includes one 'subninja' file for each module
+# directory.  Each directory has a 'phony' target for its artifacts,
+# and 'all' is a phony target of the directories, so no artifact or
+# command is produced for it.  Paths are written relative to shared
+# variables for the source root and the BOD.
+#
+# Two root files are written, sharing the directory files: one with
+# 'restat = 1' on the rule, and one without.  Ninja's logs are kept
+# in the BOD ('builddir').  With depfiles, the rule discovers the
+# imports of each module, and they are not declared.  The rule is
+# named 'touch' whatever its action.
+
+import os
+
+import action
+import buildtool
+import depfile
+
+class Ninja(buildtool.BuildTool):
+    def __init__(self, src_root, modules, use_depfile, action_script):
+        super(Ninja, self).__init__(modules)
+        self.src_root_      = os.path.normpath(src_root)
+        self.use_depfile_   = use_depfile
+        self.action_script_ = action_script # None: touch.
+        self.bod_           = os.environ["BPC_BOD"]
+        assert(self.bod_ is not None)
+
+    def src(self, pathname):
+        # 'pathname', relative to the source root variable.
+        assert(pathname.startswith(self.src_root_ + "/"))
+        return "$src/%s" % (pathname[len(self.src_root_) + 1:])
+
+    def dir_target(self, rela_dir):
+        # The phony target of a module directory.
+        return "%s/all" % (rela_dir)
+
+    def dir_pathname(self, rela_dir):
+        return os.path.join(self.src_root_, rela_dir, "split.ninja")
+
+    def write_subordinate(self, modules):
+        rela_dir = modules[0].rela_artifact_dir_
+        with self.open_output(self.dir_pathname(rela_dir)) as fp:
+            for m in modules:
+                fp.write("build $bod/%s: touch %s" % (m.artifact_,
+                                                      self.src(m.source_)))
+                if not self.use_depfile_:
+                    for imp in m.imports_:
+                        fp.write(" $\n  %s" % (self.src(imp.interface_)))
+                fp.write("\n")
+
+            fp.write("\nbuild %s: phony" % (self.dir_target(rela_dir)))
+            for m in modules:
+                fp.write(" $\n  $bod/%s" % (m.artifact_))
+            fp.write("\n")
+
+
+class RootNinja(Ninja):
+    def __init__(self, src_root, modules, use_depfile, action_script):
+        super(RootNinja, self).__init__(src_root, modules, use_depfile,
+                                        action_script)
+
+    def action_script(self):
+        if self.action_script_ is None:
+            return None
+        return self.src(self.action_script_)
+
+    def write_root(self, pathname, restat):
+        with self.open_output(pathname) as fp:
+            fp.write("ninja_required_version = 1.3\n\n"
+                     "bod      = %s\n"
+                     "src      = %s\n"
+                     "builddir = $bod\n\n" % (self.bod_, self.src_root_))
+            if self.use_depfile_:
+                fp.write("rule touch\n"
+                         "  command = %s\n"
+                         "  depfile = $out.d\n"
+                         "  deps = gcc\n" %
+                         (depfile.command(self.src(depfile.script_path(
+                             self.src_root_)), "$out", "$in",
+                                          self.action_script())))
+            else:
+                fp.write("rule touch\n"
+                         "  command = %s\n" %
+                         (action.command(self.action_script(),
+                                         "$out", "$in")))
+            if restat:
+                fp.write("  restat = 1\n")
+            fp.write("\n")
+
+            for rela_dir in self.artifact_dirs():
+                fp.write("subninja %s\n" %
+                         (self.src(self.dir_pathname(rela_dir))))
+
+            fp.write("\nbuild all: phony")
+            for rela_dir in self.artifact_dirs():
+                fp.write(" $\n  %s" % (self.dir_target(rela_dir)))
+            fp.write("\n\ndefault all\n")
+
+    def begin(self):
+        # The root files refer only to the module directories, so they
+        # are written before any module is seen.
+        self.write_root(os.path.join(self.src_root_, "split.ninja"), False)
+        self.write_root(os.path.join(self.src_root_, "split-restat.ninja"),
+                        True)
+
+    def write_directory(self, modules):
+        self.write_subordinate(modules)
+
+
+def create(verbose, src_root, files_per_dir, modules, use_depfile = False,
+           action_kind = action.TOUCH):
+    assert(isinstance(verbose, bool))
+
+    return RootNinja(src_root, modules, use_depfile,
+                     action.script_path(src_root, action_kind))
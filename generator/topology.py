@@ -0,0 +1,162 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# Models of the module dependency graph.
+#
+# A Topology decides how many modules each module imports, and maps
+# the hash drawn for each import slot (see sampler.py) to an imported
+# module.  A module imports only modules with lower numbers.  Each
+# model has a pure-Python and a NumPy form, which must produce
+# identical results.
+import sampler
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Number of layers in the Layered model.
+N_LAYERS = 16
+
+# Fraction of the imports of a Clustered module that are drawn from
+# its own directory.
+LOCALITY = 0.9
+
+# After this many redraws of a duplicate slot, the skewed models
+# (PowerLaw, Clustered) draw uniformly from all lower modules, so
+# that a module with few candidates still completes quickly.
+SKEWED_ROUNDS = 8
+
+
+def np_unit_interval(h):
+    return (h >> numpy.uint64(11)).astype(numpy.float64) * (1.0 / (1 << 53))
+
+
+class Topology(object):
+    # Each module has max_imports import slots, of which 'density'
+    # are used, on average.  The fractional part is rounded up or
+    # down for each module by a hash of the module.
+    def __init__(self, n_modules, files_per_dir, max_imports, density):
+        self.n_modules_     = n_modules
+        self.files_per_dir_ = files_per_dir
+        self.max_imports_   = max_imports
+        self.density_       = density
+
+    def capacity(self, module_num):
+        # The most modules that 'module_num' may import.
+        return max(0, min(self.max_imports_, module_num - 1))
+
+    def n_imports(self, module_num, base):
+        u = sampler.unit_interval(sampler.mix(base ^ sampler.COUNT_STREAM))
+        n = int(self.max_imports_ * self.density_ + u)
+        return min(n, self.capacity(module_num))
+
+    def target(self, module_num, h, n_round):
+        raise Exception("%s.target must be implemented" % (type(self)))
+
+    def np_capacity(self, modules):
+        return numpy.clip(numpy.minimum(self.max_imports_,
+                                        modules.astype(numpy.int64) - 1),
+                          0, None)
+
+    def np_n_imports(self, modules, base):
+        u = np_unit_interval(sampler.np_mix(base ^
+                                            numpy.uint64(sampler.COUNT_STREAM)))
+        n = numpy.floor(self.max_imports_ * self.density_ + u)
+        return numpy.minimum(n.astype(numpy.int64), self.np_capacity(modules))
+
+    def np_target(self, modules, h, rounds):
+        raise Exception("%s.np_target must be implemented" % (type(self)))
+
+
+class Uniform(Topology):
+    # Imports are drawn uniformly from all lower modules.
+    def target(self, module_num, h, n_round):
+        return h % module_num
+
+    def np_target(self, modules, h, rounds):
+        return h % numpy.maximum(modules, numpy.uint64(1))
+
+
+class Layered(Topology):
+    # The modules are divided into N_LAYERS layers of consecutive
+    # modules.  Imports are drawn uniformly from the layer directly
+    # below a module's own layer; modules in the lowest layer import
+    # nothing.
+    def __init__(self, n_modules, files_per_dir, max_imports, density):
+        super(Layered, self).__init__(n_modules, files_per_dir,
+                                      max_imports, density)
+        self.width_ = max(1, (n_modules + N_LAYERS - 1) // N_LAYERS)
+
+    def capacity(self, module_num):
+        if module_num < self.width_:
+            return 0
+        return min(self.max_imports_, self.width_)
+
+    def target(self, module_num, h, n_round):
+        layer = module_num // self.width_
+        return (layer - 1) * self.width_ + h % self.width_
+
+    def np_capacity(self, modules):
+        return numpy.where(modules >= numpy.uint64(self.width_),
+                           min(self.max_imports_, self.width_), 0)
+
+    def np_target(self, modules, h, rounds):
+        width = numpy.uint64(self.width_)
+        layer = numpy.maximum(modules // width, numpy.uint64(1))
+        return (layer - numpy.uint64(1)) * width + h % width
+
+
+class PowerLaw(Topology):
+    # Imports are drawn from lower modules with a probability that
+    # falls off as a power of the module number (floor(i * u^3), for
+    # a uniform 'u'), so the earliest modules become hubs with very
+    # large fan-in, as under preferential attachment.
+    def target(self, module_num, h, n_round):
+        if n_round >= SKEWED_ROUNDS:
+            return h % module_num
+        u = sampler.unit_interval(h)
+        return int(u * u * u * module_num)
+
+    def np_target(self, modules, h, rounds):
+        u      = np_unit_interval(h)
+        skewed = (u * u * u * modules.astype(numpy.float64)).astype(numpy.uint64)
+        return numpy.where(rounds < numpy.uint64(SKEWED_ROUNDS), skewed,
+                           h % numpy.maximum(modules, numpy.uint64(1)))
+
+
+class Clustered(Topology):
+    # Most imports (LOCALITY) are drawn from the lower modules in a
+    # module's own directory, and the rest from all lower modules.
+    def target(self, module_num, h, n_round):
+        lo = module_num - module_num % self.files_per_dir_
+        if (module_num > lo and n_round < SKEWED_ROUNDS and
+            sampler.unit_interval(sampler.mix(h)) < LOCALITY):
+            return lo + h % (module_num - lo)
+        return h % module_num
+
+    def np_target(self, modules, h, rounds):
+        lo    = modules - modules % numpy.uint64(self.files_per_dir_)
+        span  = modules - lo
+        local = ((span > numpy.uint64(0)) &
+                 (rounds < numpy.uint64(SKEWED_ROUNDS)) &
+                 (np_unit_interval(sampler.np_mix(h)) < LOCALITY))
+        return numpy.where(local,
+                           lo + h % numpy.maximum(span, numpy.uint64(1)),
+                           h % numpy.maximum(modules, numpy.uint64(1)))
+
+
+MODELS = {
+    "uniform"   : Uniform,
+    "layered"   : Layered,
+    "power-law" : PowerLaw,
+    "clustered" : Clustered,
+}
+
+
+def create(model, n_modules, files_per_dir, max_imports, density):
+    assert(model in MODELS)
+    assert(max_imports >= 0)
+    assert(0.0 <= density and density <= 1.0)
+    return MODELS[model](n_modules, files_per_dir, max_imports, density)
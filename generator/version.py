@@ -0,0 +1,28 @@
+# Copyright (c) 2025 Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+# The version of the generator is a digest of its sources, so that
+# results recorded for the generator identify exactly the code that
+# produced them, whether or not it has been committed.
+import glob
+import hashlib
+import os
+
+GENERATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def source_digest():
+    # sha1 of the name and content of each generator source file.
+    h = hashlib.sha1()
+    for pathname in sorted(glob.glob(os.path.join(GENERATOR_DIR, "*.py"))):
+        h.update(os.path.basename(pathname).encode())
+        h.update(b"\0")
+        with open(pathname, "rb") as fp:
+            h.update(fp.read())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def version():
+    return "generator %s" % (source_digest()[0:12])
@@ -0,0 +1,310 @@
+#!/usr/bin/python3 -B
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  Measures the generator itself, for each of several numbers of
+#  modules, and records the results in the metrics file in the same
+#  way as the build tools' results, under the tool label 'generator'.
+#  Each result holds the time of each stage of the generation (see
+#  'generate.py --profile').
+#
+#  The generator's version is a digest of its sources, so each change
+#  to the generator is recorded separately.  Each result is compared
+#  with the latest result of the previous version on the same host and
+#  geometry, and a slowdown beyond --threshold is reported as a
+#  regression.
+#
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "generator"))
+
+import run_build
+import version
+
+GENERATE = os.path.realpath(os.path.join(SCRIPT_DIR, "..",
+                                         "generator", "generate.py"))
+TOOL     = "generator"
+
+
+class GeneratorMetrics(run_build.Metrics):
+    # The geometry is taken from the benchmark's options rather than
+    # from the environment set by 'setup'.
+    def __init__(self, options, n_modules):
+        self.options_       = options
+        self.bench_modules_ = n_modules
+        super(GeneratorMetrics, self).__init__(options.arg_metrics,
+                                               TOOL, TOOL)
+
+    def get_tool_version(self, tool_name):
+        return version.version()
+
+    def get_n_modules(self):
+        return str(self.bench_modules_)
+
+    def get_files_per_dir(self):
+        return str(self.options_.arg_n_files_per_dir)
+
+    def get_parallelism(self):
+        return str(self.options_.arg_jobs)
+
+    def get_generation_options(self):
+        # As for the build tools, options are recorded only when set.
+        options = { }
+        if self.options_.arg_payload is not None:
+            options["payload"] = self.options_.arg_payload
+        if self.options_.arg_topology is not None:
+            options["topology"] = self.options_.arg_topology
+        return options
+
+    def get_additional_args(self):
+        if self.options_.arg_profile:
+            return "--profile"
+        return "<no-args>"
+
+    def previous_runs(self):
+        # Runs of other generator versions on this host and geometry,
+        # oldest first.
+        runs = [ ]
+        for g in self.json_:
+            if (g is not self.geometry_ and
+                g["host"]     == self.geometry_["host"] and
+                g["geometry"] == self.geometry_["geometry"] and
+                g["tool"]["label"] == TOOL and
+                g["tool"]["args"]  == self.tool_dict_["args"] and
+                g["tool"]["version"] != self.tool_dict_["version"]):
+                runs.extend(g["tool"]["runs"])
+        return sorted(runs, key = lambda r: (r["date"], r["time"]))
+
+
+def configure_parser():
+    description = ("""
+  Return Code:
+    0       : success
+    1       : a regression was found
+    non-zero: failure
+""")
+
+    formatter = argparse.RawDescriptionHelpFormatter
+    parser    = argparse.ArgumentParser(usage           = None,
+                                        formatter_class = formatter,
+                                        description     = description,
+                                        prog            = "bench_generate.py")
+
+    parser.add_argument("--files-per-dir",
+                        help     = ("Max number of files in a directory "
+                                    "[default: %(default)s files]."),
+                        required = False,
+                        default  = 100,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_n_files_per_dir")
+
+    parser.add_argument("--jobs",
+                        help     = ("Number of generator processes "
+                                    "[default: %(default)s]."),
+                        required = False,
+                        default  = 1,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_jobs")
+
+    parser.add_argument("--metrics",
+                        help     = ("Name of Json file where "
+                                    "collected data should be stored."),
+                        required = True,
+                        action   = "store",
+                        dest     = "arg_metrics")
+
+    parser.add_argument("--modules",
+                        help     = ("Comma-separated numbers of modules "
+                                    "to measure [default: %(default)s]."),
+                        required = False,
+                        default  = "10000,100000",
+                        action   = "store",
+                        dest     = "arg_modules")
+
+    parser.add_argument("--payload",
+                        help     = ("Generator --payload."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_payload")
+
+    parser.add_argument("--profile",
+                        help     = ("Also trace the peak memory of each "
+                                    "stage.  This slows the generator, so "
+                                    "these results are recorded "
+                                    "separately."),
+                        required = False,
+                        default  = False,
+                        action   = "store_true",
+                        dest     = "arg_profile")
+
+    parser.add_argument("--repeat",
+                        help     = ("Number of times each tree is "
+                                    "generated; the fastest generation is "
+                                    "recorded [default: %(default)s]."),
+                        required = False,
+                        default  = 3,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_repeat")
+
+    parser.add_argument("--root",
+                        help     = ("Directory where the trees are "
+                                    "generated.  It is removed afterwards "
+                                    "[default: a temporary directory]."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_root")
+
+    parser.add_argument("--threshold",
+                        help     = ("Slowdown, relative to the previous "
+                                    "generator version, reported as a "
+                                    "regression [default: %(default)s]."),
+                        required = False,
+                        default  = 1.10,
+                        action   = "store",
+                        type     = float,
+                        dest     = "arg_threshold")
+
+    parser.add_argument("--topology",
+                        help     = ("Generator --topology."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_topology")
+
+    return parser
+
+
+def get_options():
+    parser  = configure_parser()
+    options = parser.parse_args()
+
+    if options.arg_root is None:
+        options.arg_root = tempfile.mkdtemp(prefix = "bench_generate.")
+    options.arg_root   = os.path.abspath(options.arg_root)
+    options.n_modules_ = [ int(n) for n in options.arg_modules.split(",") ]
+    if options.arg_repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    return options
+
+
+def get_directory_space(directory):
+    # Produces number of bytes.
+    cmd = [ "/usr/bin/du", "--block-size", "1024", "-s", directory ]
+    (stdout,
+     stderr,
+     rc,
+     rusage) = run_build.execute_process(cmd)
+    return int(stdout[0].split("\t")[0]) * 1024
+
+
+def generate(options, n_modules):
+    # Generate a fresh tree; returns the generator's profile results
+    # and the size of the tree.
+    source  = os.path.join(options.arg_root, "source")
+    profile = os.path.join(options.arg_root, "profile.json")
+    shutil.rmtree(source, ignore_errors = True)
+
+    cmd = [ GENERATE,
+            "--files-per-dir",  str(options.arg_n_files_per_dir),
+            "--jobs",           str(options.arg_jobs),
+            "--modules",        str(n_modules),
+            "--profile-output", profile,
+            "--root",           source ]
+    if options.arg_payload is not None:
+        cmd.extend([ "--payload", options.arg_payload ])
+    if options.arg_topology is not None:
+        cmd.extend([ "--topology", options.arg_topology ])
+    if options.arg_profile:
+        cmd.append("--profile")
+
+    (stdout,
+     stderr,
+     rc,
+     rusage) = run_build.execute_process(cmd)
+    if rc != 0:
+        raise Exception("generate.py failed:\n%s" % ("\n".join(stderr)))
+
+    with open(profile, "r") as fp:
+        results = json.load(fp)
+    return (results, get_directory_space(source))
+
+
+def benchmark(options, n_modules):
+    best = None
+    for i in range(0, options.arg_repeat):
+        (results, size) = generate(options, n_modules)
+        if best is None or results["wall-seconds"] < best[0]["wall-seconds"]:
+            best = (results, size)
+    (results, size) = best
+
+    # The generated tree is the generator's build output.
+    metrics = GeneratorMetrics(options, n_modules)
+    metrics.add_metrics({
+        "bod-size-bytes" : size,
+        "cpu-seconds"    : results["cpu-seconds"],
+        "kind"           : "generate",
+        "memory-bytes"   : results["max-rss-bytes"],
+        "seconds"        : results["wall-seconds"],
+        "stages"         : results["stages"],
+    })
+    metrics.save()
+
+    print("%8d modules: %8.3f seconds  %8.3f cpu  %6dM resident" %
+          (n_modules, results["wall-seconds"], results["cpu-seconds"],
+           results["max-rss-bytes"] // (1024 * 1024)))
+    for (name, stage) in sorted(results["stages"].items(),
+                                key = lambda s: -s[1]["wall-seconds"]):
+        print("    %-24s %8.3f" % (name, stage["wall-seconds"]))
+
+    previous = metrics.previous_runs()
+    if len(previous) > 0:
+        ratio = results["wall-seconds"] / previous[-1]["seconds"]
+        print("    %.2fx the previous version (%.3f seconds, %s)" %
+              (ratio, previous[-1]["seconds"], previous[-1]["date"]))
+        if ratio > options.arg_threshold:
+            print("    REGRESSION: slower than the %.2fx threshold" %
+                  (options.arg_threshold))
+            return False
+    return True
+
+
+def main():
+    try:
+        options = get_options()
+        os.environ["BPC_BOD"] = os.path.join(options.arg_root, "bod")
+
+        print("Benchmarking %s" % (version.version()))
+        ok = True
+        try:
+            for n_modules in options.n_modules_:
+                ok = benchmark(options, n_modules) and ok
+        finally:
+            shutil.rmtree(options.arg_root, ignore_errors = True)
+
+    except KeyboardInterrupt as exc:
+        print("Ctrl-C interrupt")
+        sys.exit(10)
+
+    except Exception as exc:
+        print("Unhandled exception '%s'" % (str(exc)))
+        raise exc
+
+    if not ok:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/python3 -B
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  Measures the time each build system takes to write its files, with
+#  and without the buffered output of BuildTool.open_output().  Only
+#  the build system files are written; no source modules are created.
+#
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "generator"))
+
+import action
+import generate
+import manifest
+import module
+import topology
+import utility
+
+
+def configure_parser():
+    description = ("""
+  Return Code:
+    0       : success
+    non-zero: failure
+""")
+
+    formatter = argparse.RawDescriptionHelpFormatter
+    parser    = argparse.ArgumentParser(usage           = None,
+                                        formatter_class = formatter,
+                                        description     = description,
+                                        prog            = "bench_writers.py")
+
+    parser.add_argument("--files-per-dir",
+                        help     = ("Max number of files in a directory "
+                                    "[default: %(default)s files]."),
+                        required = False,
+                        default  = 100,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_n_files_per_dir")
+
+    parser.add_argument("--modules",
+                        help     = ("Comma-separated numbers of modules "
+                                    "to measure [default: %(default)s]."),
+                        required = False,
+                        default  = "10000,100000",
+                        action   = "store",
+                        dest     = "arg_modules")
+
+    parser.add_argument("--repeat",
+                        help     = ("Number of times each build system is "
+                                    "written; the fastest time is "
+                                    "reported [default: %(default)s]."),
+                        required = False,
+                        default  = 3,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_repeat")
+
+    parser.add_argument("--root",
+                        help     = ("Directory where the build system "
+                                    "files are written.  It is removed "
+                                    "afterwards [default: a temporary "
+                                    "directory]."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_root")
+
+    parser.add_argument("--seed",
+                        help     = ("Random seed."),
+                        required = False,
+                        default  = 0x19671116,
+                        action   = "store",
+                        type     = lambda v: int(v, 0),
+                        dest     = "arg_seed")
+
+    return parser
+
+
+def get_options():
+    parser  = configure_parser()
+    options = parser.parse_args()
+
+    if options.arg_root is None:
+        options.arg_root = tempfile.mkdtemp(prefix = "bench_writers.")
+    options.arg_root    = os.path.abspath(options.arg_root)
+    options.arg_verbose = False
+    # The build systems are written as generate.py writes them by
+    # default.
+    options.arg_depfile = False
+    options.arg_action  = action.TOUCH
+    options.n_modules_  = [ int(n) for n in options.arg_modules.split(",") ]
+
+    return options
+
+
+def measure(options, build_system, modules, buffer_size):
+    best = None
+    for i in range(0, options.arg_repeat):
+        mf = manifest.Manifest(options.arg_root, { }, False, buffer_size)
+        bs = build_system(options, modules)
+        bs.set_manifest(mf)
+        start   = time.perf_counter()
+        bs.write()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def benchmark(options, n_modules):
+    modules = module.stream(False, options.arg_seed,
+                            os.path.join(options.arg_root, "source"),
+                            os.path.join(options.arg_root, "interface"),
+                            options.arg_n_files_per_dir,
+                            n_modules,
+                            topology.create("uniform", n_modules,
+                                            options.arg_n_files_per_dir,
+                                            25, 1.0))
+
+    # Some build systems write files into the module directories.
+    for d in range(0, modules.n_dirs()):
+        (lo, hi) = modules.dir_bounds(d)
+        utility.mkdir(os.path.dirname(modules[lo].source_))
+
+    total = [ 0.0, 0.0 ]
+    for build_system in generate.BUILD_SYSTEMS:
+        unbuffered = measure(options, build_system, modules, 0)
+        buffered   = measure(options, build_system, modules,
+                             manifest.BUFFER_SIZE)
+        total[0] += unbuffered
+        total[1] += buffered
+        print("%-16s %8d %12.3f %12.3f %8.2fx" %
+              (build_system.__name__, n_modules,
+               unbuffered, buffered, unbuffered / buffered))
+    print("%-16s %8d %12.3f %12.3f %8.2fx" %
+          ("total", n_modules, total[0], total[1], total[0] / total[1]))
+
+
+def main():
+    try:
+        options = get_options()
+        os.environ.setdefault("BPC_BOD", os.path.join(options.arg_root,
+                                                      "bod"))
+
+        print("%-16s %8s %12s %12s %9s" %
+              ("build system", "modules", "unbuffered", "buffered",
+               "speedup"))
+        try:
+            for n_modules in options.n_modules_:
+                benchmark(options, n_modules)
+        finally:
+            shutil.rmtree(options.arg_root, ignore_errors = True)
+
+    except KeyboardInterrupt as exc:
+        print("Ctrl-C interrupt")
+        sys.exit(10)
+
+    except Exception as exc:
+        print("Unhandled exception '%s'" % (str(exc)))
+        raise exc
+
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,11 @@
 #
 #  This script invokes Bazel on the generated recursive Bazel files.
 #
+#  BPC_BAZEL_DISK_CACHE names a directory for Bazel's disk cache, and
+#  BPC_BAZEL_REMOTE_CACHE the URL of an HTTP remote cache (see
+#  cache_server.py).  BPC_BAZEL_PROFILE names the file to which Bazel
+#  writes its JSON profile.
+#
 set -o pipefail;
 set -o nounset;
 set -o errexit;
@@ -13,9 +18,23 @@ function main ()
 {
     local SRC="${BPC_SOURCE:?Use setup.sh to configure environment.}";
     local BOD="${BPC_BOD:?:?Use setup.sh to configure environment.}";
+    local CACHE="";
+    local PROFILE="";
+
+    if [ ! -z "${BPC_BAZEL_DISK_CACHE:-}" ]; then
+        CACHE="--disk_cache=${BPC_BAZEL_DISK_CACHE}";
+    fi;
+
+    if [ ! -z "${BPC_BAZEL_REMOTE_CACHE:-}" ]; then
+        CACHE="${CACHE} --remote_cache=${BPC_BAZEL_REMOTE_CACHE}";
+    fi;
+
+    if [ ! -z "${BPC_BAZEL_PROFILE:-}" ]; then
+        PROFILE="--profile=${BPC_BAZEL_PROFILE}";
+    fi;
 
     cd ${SRC};
-    exec bazel build //source/...
+    exec bazel build ${CACHE} ${PROFILE} //source/...
 }
 
 main;
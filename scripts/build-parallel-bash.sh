@@ -0,0 +1,22 @@
+#!/bin/bash
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  This script invokes the parallel Bash script to create all the
+#  build artifacts, running BPC_PARALLEL batches at once.
+#
+set -o pipefail;
+set -o nounset;
+set -o errexit;
+
+function main ()
+{
+    local SRC="${BPC_SOURCE:?Use setup.sh to configure environment.}";
+    local BOD="${BPC_BOD:?:?Use setup.sh to configure environment.}";
+    local PARALLEL="${BPC_PARALLEL:?:?Use setup.sh to configure environment.}";
+
+    exec ${SRC}/build-parallel.sh;
+}
+
+main;
@@ -0,0 +1,34 @@
+#!/bin/bash
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  This script invokes the reference build engine (pybuild.py) on the
+#  generated graph index, running BPC_PARALLEL batches at once.
+#
+set -o pipefail;
+set -o nounset;
+set -o errexit;
+
+SCRIPT="${BASH_SOURCE[0]}"
+SRC_DIR=$(dirname "${SCRIPT}");
+
+function main ()
+{
+    local SRC="${BPC_SOURCE:?Use setup.sh to configure environment.}";
+    local BOD="${BPC_BOD:?:?Use setup.sh to configure environment.}";
+    local PARALLEL="${BPC_PARALLEL:?:?Use setup.sh to configure environment.}";
+    local VERBOSE="";
+
+    if [ ! -z "${BPC_VERBOSE:-}" ]; then
+        VERBOSE="--verbose";
+    fi;
+
+    exec ${SRC_DIR}/pybuild.py             \
+         --index ${SRC}/graph.index        \
+         --bod ${BOD}                      \
+         --jobs ${PARALLEL}                \
+         ${VERBOSE};
+}
+
+main;
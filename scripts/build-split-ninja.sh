@@ -0,0 +1,27 @@
+#!/bin/bash
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  This script invokes Ninja on the generated per-directory Ninja
+#  files.  When BPC_NINJA_RESTAT is set, the rule restats its outputs.
+#
+set -o pipefail;
+set -o nounset;
+set -o errexit;
+
+function main ()
+{
+    local SRC="${BPC_SOURCE:?Use setup.sh to configure environment.}";
+    export BOD="${BPC_BOD:?:?Use setup.sh to configure environment.}";
+    local NINJA_FILE="split.ninja";
+
+    if [ ! -z "${BPC_NINJA_RESTAT:-}" ]; then
+        NINJA_FILE="split-restat.ninja";
+    fi;
+
+    cd ${BOD};
+    exec ninja -C ${SRC} -f ${NINJA_FILE} -j ${BPC_PARALLEL} all
+}
+
+main;
@@ -0,0 +1,24 @@
+#!/bin/bash
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  This script invokes Scons on the generated per-directory SConscript
+#  files.  SCONS_DECIDER and SCONS_IMPLICIT_CACHE tune SConstruct.split,
+#  and BPC_BUILD_ADDITIONAL_ARGS is passed to Scons.
+#
+set -o pipefail;
+set -o nounset;
+set -o errexit;
+
+function main ()
+{
+    local SRC="${BPC_SOURCE:?Use setup.sh to configure environment.}";
+    export BOD="${BPC_BOD:?:?Use setup.sh to configure environment.}";
+
+    cd ${BOD};
+    exec scons -Q --file ${SRC}/SConstruct.split -j ${BPC_PARALLEL} \
+         ${BPC_BUILD_ADDITIONAL_ARGS:-} all
+}
+
+main;
@@ -0,0 +1,268 @@
+#!/usr/bin/python3 -B
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  A small HTTP remote cache for Bazel ('--remote_cache=http://...'),
+#  standing in for a shared action cache.
+#
+#  Bazel's HTTP cache protocol has two stores, each keyed by a SHA-256
+#  digest:
+#
+#    /ac/<digest>  : the action cache; action results.
+#    /cas/<digest> : the content addressable store; file contents.
+#
+#  An entry is read with GET (or HEAD), and written with PUT.  Entries
+#  are kept as files below --root.
+#
+#  The server counts the hits, misses and uploads of each store, and
+#  the bytes served and stored.  'GET /stats' returns the counts as
+#  JSON; they are also written to --stats, if given, when the server
+#  is stopped (SIGINT or SIGTERM).
+#
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import sys
+
+ENTRY = re.compile(r"^/(ac|cas)/([0-9a-f]{64})$")
+STORES = [ "ac", "cas" ]
+REASONS = {
+    200 : "OK",
+    400 : "Bad Request",
+    404 : "Not Found",
+    405 : "Method Not Allowed",
+}
+
+
+class Cache(object):
+    def __init__(self, root):
+        self.root_  = root
+        self.stats_ = { store : { "hits"         : 0,
+                                  "misses"       : 0,
+                                  "uploads"      : 0,
+                                  "bytes-served" : 0,
+                                  "bytes-stored" : 0 }
+                        for store in STORES }
+        for store in STORES:
+            os.makedirs(os.path.join(root, store), exist_ok = True)
+
+    def pathname(self, store, digest):
+        return os.path.join(self.root_, store, digest)
+
+    def get(self, store, digest):
+        # Returns the entry, or None.
+        stats = self.stats_[store]
+        try:
+            with open(self.pathname(store, digest), "rb") as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            stats["misses"] += 1
+            return None
+        stats["hits"]         += 1
+        stats["bytes-served"] += len(data)
+        return data
+
+    def put(self, store, digest, data):
+        # Written under a temporary name, so an interrupted write
+        # leaves no entry.
+        pathname = self.pathname(store, digest)
+        temp     = "%s.tmp" % (pathname)
+        with open(temp, "wb") as fp:
+            fp.write(data)
+        os.rename(temp, pathname)
+        stats = self.stats_[store]
+        stats["uploads"]      += 1
+        stats["bytes-stored"] += len(data)
+
+    def request(self, method, target, body):
+        # Returns (status, response body).
+        if target == "/stats" and method == "GET":
+            return (200, json.dumps(self.stats_, indent = 2,
+                                    sort_keys = True).encode())
+        match = ENTRY.match(target)
+        if match is None:
+            return (404, b"")
+        (store, digest) = match.groups()
+        if method in ("GET", "HEAD"):
+            data = self.get(store, digest)
+            if data is None:
+                return (404, b"")
+            return (200, data)
+        if method == "PUT":
+            self.put(store, digest, body)
+            return (200, b"")
+        return (405, b"")
+
+
+def configure_parser():
+    description = ("""
+  Return Code:
+    0       : success
+    non-zero: failure
+""")
+
+    formatter = argparse.RawDescriptionHelpFormatter
+    parser    = argparse.ArgumentParser(usage           = None,
+                                        formatter_class = formatter,
+                                        description     = description,
+                                        prog            = "cache_server.py")
+
+    parser.add_argument("--port",
+                        help     = ("TCP port on 127.0.0.1.  With 0, a "
+                                    "free port is chosen [default: "
+                                    "%(default)s]."),
+                        required = False,
+                        default  = 0,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_port")
+
+    parser.add_argument("--port-file",
+                        help     = ("File to which the port is written, "
+                                    "once the server is listening."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_port_file")
+
+    parser.add_argument("--root",
+                        help     = ("Directory holding the cache entries."),
+                        required = True,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_root")
+
+    parser.add_argument("--stats",
+                        help     = ("File to which the counts are written "
+                                    "when the server is stopped."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_stats")
+
+    return parser
+
+
+def get_options():
+    parser  = configure_parser()
+    options = parser.parse_args()
+    return options
+
+
+async def read_body(reader, headers):
+    if "content-length" in headers:
+        return await reader.readexactly(int(headers["content-length"]))
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = [ ]
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # Trailers, if any, end with an empty line.
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+    return b""
+
+
+def write_response(writer, version, status, body, head):
+    writer.write(("%s %d %s\r\n"
+                  "Content-Length: %d\r\n"
+                  "\r\n" % (version, status, REASONS[status],
+                            len(body))).encode("latin-1"))
+    if not head:
+        writer.write(body)
+
+
+async def serve_connection(cache, reader, writer):
+    # Requests are served in turn until the client closes the
+    # connection.
+    try:
+        while True:
+            line = await reader.readline()
+            if len(line) == 0:
+                break
+            fields = line.decode("latin-1").split()
+            if len(fields) != 3:
+                write_response(writer, "HTTP/1.1", 400, b"", False)
+                break
+            (method, target, version) = fields
+
+            headers = { }
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                (name, sep, value) = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            if headers.get("expect", "").lower() == "100-continue":
+                writer.write(("%s 100 Continue\r\n\r\n" %
+                              (version)).encode("latin-1"))
+            body = await read_body(reader, headers)
+
+            (status, data) = cache.request(method, target, body)
+            write_response(writer, version, status, data, method == "HEAD")
+            await writer.drain()
+
+            if (version == "HTTP/1.0" or
+                headers.get("connection", "").lower() == "close"):
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(options, cache):
+    # Bound to the IPv4 loopback address alone: 'localhost' may also
+    # resolve to ::1, which would be given a port of its own.
+    server = await asyncio.start_server(
+        lambda r, w: serve_connection(cache, r, w),
+        host = "127.0.0.1", port = options.arg_port)
+    port = server.sockets[0].getsockname()[1]
+    if options.arg_port_file is not None:
+        # Written under a temporary name, so the port is read whole.
+        temp = "%s.tmp" % (options.arg_port_file)
+        with open(temp, "w") as fp:
+            fp.write("%d\n" % (port))
+        os.rename(temp, options.arg_port_file)
+    print("Serving '%s' on http://127.0.0.1:%d" % (options.arg_root, port))
+    sys.stdout.flush()
+
+    loop = asyncio.get_running_loop()
+    stop = loop.create_future()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum,
+                                lambda: stop.done() or stop.set_result(None))
+    async with server:
+        await stop
+
+
+def main():
+    try:
+        options = get_options()
+        cache   = Cache(options.arg_root)
+        asyncio.run(serve(options, cache))
+
+        if options.arg_stats is not None:
+            with open(options.arg_stats, "w") as fp:
+                json.dump(cache.stats_, fp, indent = 2, sort_keys = True)
+
+    except KeyboardInterrupt as exc:
+        print("Ctrl-C interrupt")
+        sys.exit(10)
+
+    except Exception as exc:
+        print("Unhandled exception '%s'" % (str(exc)))
+        raise exc
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,12 @@
 #
 #  This script generates all the source modules and build systems.
 #
+#  With '--incremental', the existing source tree is updated rather
+#  than removed; only files whose content differs are rewritten.
+#
+#  When BPC_TREE_CACHE is set, a full generation is done through the
+#  snapshot cache in that directory; see tree_cache.py.
+#
 set -o pipefail;
 set -o nounset;
 set -o errexit;
@@ -19,14 +25,43 @@ function main ()
     local BOD="${BPC_BOD:?:?Use setup.sh to configure environment.}";
     local PARALLEL="${BPC_PARALLEL:?:?Use setup.sh to configure environment.}";
     local FILES_PER_DIR="${BPC_FILES_PER_DIR:-100}"
+    local DIR_DEPTH="${BPC_DIR_DEPTH:-1}"
+    local FANOUT="${BPC_FANOUT:-16}"
+    local PAYLOAD="${BPC_PAYLOAD:-template}"
+    local TOPOLOGY="${BPC_TOPOLOGY:-uniform}"
+    local MAX_IMPORTS="${BPC_MAX_IMPORTS:-25}"
+    local DENSITY="${BPC_DENSITY:-1.0}"
+    local ACTION="${BPC_ACTION:-touch}"
+    local ACTION_PASSES="${BPC_ACTION_PASSES:-1}"
     local VERBOSE="";
+    local INCREMENTAL="";
+    local IMPORT_GRAPH="";
+    local DEPFILE="";
+    local GENERATOR="${SRC_DIR}/../generator/generate.py";
 
     if [ ! -z "${BPC_VERBOSE:-}" ]; then
         VERBOSE="--verbose";
     fi;
 
-    echo "Removing source & build output (BOD).";
-    rm -rf ${SRC} ${BOD};
+    if [ ! -z "${BPC_IMPORT_GRAPH:-}" ]; then
+        IMPORT_GRAPH="--import-graph ${BPC_IMPORT_GRAPH}";
+    fi;
+
+    if [ ! -z "${BPC_DEPFILE:-}" ]; then
+        DEPFILE="--depfile";
+    fi;
+
+    if [ "${1:-}" == "--incremental" ]; then
+        INCREMENTAL="--incremental";
+        echo "Removing build output (BOD).";
+        rm -rf ${BOD};
+    else
+        echo "Removing source & build output (BOD).";
+        rm -rf ${SRC} ${BOD};
+        if [ ! -z "${BPC_TREE_CACHE:-}" ]; then
+            GENERATOR="${SRC_DIR}/tree_cache.py --cache ${BPC_TREE_CACHE} --";
+        fi;
+    fi;
 
     if [ -d ~/.cache/bazel ] ; then
         echo "Removing ~/.cache/bazel";
@@ -39,11 +74,23 @@ function main ()
     echo "Creating BOD.";
     mkdir --parents ${BOD};
 
-    ${SRC_DIR}/../generator/generate.py         \
+    ${GENERATOR}                                \
+        --action ${ACTION}                      \
+        --action-passes ${ACTION_PASSES}        \
+        --density ${DENSITY}                    \
+        ${DEPFILE}                              \
+        --dir-depth ${DIR_DEPTH}                \
+        --fanout ${FANOUT}                      \
         --files-per-dir ${FILES_PER_DIR}        \
+        ${IMPORT_GRAPH}                         \
+        ${INCREMENTAL}                          \
+        --jobs ${PARALLEL}                      \
+        --max-imports ${MAX_IMPORTS}            \
         --modules ${n_modules}                  \
+        --payload ${PAYLOAD}                    \
         --root ${SRC}                           \
+        --topology ${TOPOLOGY}                  \
         ${VERBOSE};
 }
 
-main;
+main "${@}";
@@ -5,15 +5,30 @@
 set -o nounset;
 set -o errexit;
 
+SCRIPT="${BASH_SOURCE[0]}"
+SRC_DIR=$(dirname "${SCRIPT}");
+
 function main ()
 {
     local SRC="${BPC_SOURCE:?Use setup.sh to configure environment.}";
+    local index="${SRC}/graph.index";
     local mu;
+    local path;
 
-    mu=$(grep -h -r "import" ${SRC}/|sort|uniq -c|sort --numeric --reverse|head -1|cut -d '"' -f 2);
-    path=$(find ${SRC} -name "${mu}");
+    if [ -f "${index}" ] ; then
+        # The generator's graph index records the most used interface.
+        path=$(${SRC_DIR}/../generator/graphindex.py    \
+                   --index "${index}"                   \
+                   --most-used);
+    else
+        mu=$(grep -h -r "import" ${SRC}/|sort|uniq -c|sort --numeric --reverse|head -1|cut -d '"' -f 2);
+        path=$(find ${SRC} -name "${mu}");
+    fi;
     echo "Modifying '${path}' using current timestamp.";
-    date >"${path}";
+    # The file is replaced rather than rewritten, as it may be hard
+    # linked to a cached snapshot of the tree (see tree_cache.py).
+    date >"${path}.tmp";
+    mv --force "${path}.tmp" "${path}";
 }
 
 main;
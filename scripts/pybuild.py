@@ -0,0 +1,372 @@
+#!/usr/bin/python3 -B
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  A reference build engine, written for this workload alone.  It
+#  reads the module graph from the graph index written with the
+#  generated tree (see graphindex.py), so it parses no build files,
+#  and it does only the work that any build tool must do:
+#
+#    . the modification time of every source, interface and artifact
+#      is read with one 'os.scandir' for each directory, the
+#      directories being read concurrently,
+#
+#    . an artifact is out of date if it is missing, or if its source
+#      or an interface it imports is newer than when the artifact was
+#      last created, and
+#
+#    . the artifacts that are out of date are created in batches, one
+#      for each module directory, running at most --jobs batches at
+#      once.
+#
+#  Artifacts are touched, or created by the action shim if the tree was
+#  generated with '--action simulate' (see action.py).
+#
+#  The newest time of each artifact's prerequisites, and the time of
+#  the artifact itself, are recorded in a build log in the BOD when
+#  the artifact is created.  As with Ninja's log, prerequisites are
+#  compared with the log; an artifact whose time is not the one
+#  logged, having been rewritten or restored since, is rebuilt.
+#
+import argparse
+import array
+import concurrent.futures
+import hashlib
+import os
+import platform
+import struct
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "generator"))
+
+import graphindex
+
+LOG_NAME   = ".pybuild_log"
+LOG_MAGIC  = b"BPCBLD02"
+LOG_HEADER = struct.Struct("<8sQ")  # Magic, number of modules.
+MISSING    = -1                     # Time of a file that does not exist.
+
+
+def version():
+    # The engine is identified by a digest of its source, as the
+    # generator is.
+    with open(os.path.abspath(__file__), "rb") as fp:
+        digest = hashlib.sha1(fp.read()).hexdigest()
+    return "pybuild %s (Python %s)" % (digest[0:12],
+                                       platform.python_version())
+
+
+def scan(directory, suffix):
+    # Returns [ (module number, mtime_ns) ] of the module files in
+    # 'directory' named with 'suffix'.
+    result = [ ]
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                name = entry.name
+                if not name.endswith(suffix):
+                    continue
+                n = int(name[1:-len(suffix)])
+                result.append((n, entry.stat().st_mtime_ns))
+    except FileNotFoundError:
+        pass
+    return result
+
+
+class StatCache(object):
+    # The modification time, in nanoseconds, of each module's files,
+    # indexed by module number.  Each directory is read once.
+    def __init__(self, index, bod):
+        n = len(index)
+        self.index_     = index
+        self.bod_       = bod
+        self.source_    = array.array("q", [ MISSING ]) * n
+        self.interface_ = array.array("q", [ MISSING ]) * n
+        self.artifact_  = array.array("q", [ MISSING ]) * n
+
+    def n_dirs(self):
+        files_per_dir = self.index_.layout_.files_per_dir_
+        return (len(self.index_) + files_per_dir - 1) // files_per_dir
+
+    def artifact_dir(self, dir_num):
+        return os.path.join(self.bod_,
+                            self.index_.layout_.rela_artifact_dir(dir_num))
+
+    def load(self, pool):
+        layout = self.index_.layout_
+        work   = [ ]
+        for d in range(0, self.n_dirs()):
+            rela = layout.dir_path(d)
+            work.append((self.source_,
+                         os.path.join(layout.src_dir_, rela),
+                         ".source"))
+            work.append((self.interface_,
+                         os.path.join(layout.incl_dir_, rela),
+                         ".interface"))
+            work.append((self.artifact_, self.artifact_dir(d), ".artifact"))
+
+        scans = pool.map(lambda w: scan(w[1], w[2]), work)
+        for (w, entries) in zip(work, scans):
+            times = w[0]
+            for (n, t) in entries:
+                times[n] = t
+
+        for (kind, times) in (("source", self.source_),
+                              ("interface", self.interface_)):
+            if MISSING in times:
+                n = times.index(MISSING)
+                raise Exception("module %d has no %s file" % (n, kind))
+
+
+class BuildLog(object):
+    # For each module, the newest time of the artifact's prerequisites
+    # when the artifact was last created, and the artifact's time
+    # then; 0 if it has not been.  The log is a header and two int64
+    # arrays, replaced as a whole when it is saved.
+    def __init__(self, pathname, n_modules):
+        self.pathname_ = pathname
+        self.exists_   = False
+        self.times_    = array.array("q", [ 0 ]) * n_modules
+        self.artifact_ = array.array("q", [ 0 ]) * n_modules
+        try:
+            with open(pathname, "rb") as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            return
+        if len(data) < LOG_HEADER.size:
+            return
+        (magic, n) = LOG_HEADER.unpack_from(data)
+        size = n * self.times_.itemsize
+        if (magic == LOG_MAGIC and n == n_modules and
+            len(data) == LOG_HEADER.size + 2 * size):
+            start          = LOG_HEADER.size
+            self.times_    = array.array("q", data[start:start + size])
+            self.artifact_ = array.array("q", data[start + size:])
+            self.exists_   = True
+
+    def save(self):
+        # Written under a temporary name, so an interrupted build
+        # leaves the previous log.
+        temp = "%s.tmp" % (self.pathname_)
+        with open(temp, "wb") as fp:
+            fp.write(LOG_HEADER.pack(LOG_MAGIC, len(self.times_)))
+            fp.write(self.times_.tobytes())
+            fp.write(self.artifact_.tobytes())
+        os.rename(temp, self.pathname_)
+
+
+class Engine(object):
+    def __init__(self, options, index):
+        self.options_ = options
+        self.index_   = index
+        self.log_     = BuildLog(options.arg_log, len(index))
+        self.stats_   = StatCache(index, options.arg_bod)
+        self.action_  = index.action()
+
+    def newest_input(self, n):
+        index     = self.index_
+        interface = self.stats_.interface_
+        newest    = self.stats_.source_[n]
+        imports   = index.imports_[index.import_start_[n]:
+                                   index.import_start_[n + 1]]
+        if len(imports) > 0:
+            newest = max(newest, max(map(interface.__getitem__, imports)))
+        return newest
+
+    def out_of_date(self, n, newest):
+        artifact = self.stats_.artifact_[n]
+        if artifact == MISSING:
+            return True
+        logged = self.log_.times_[n]
+        if logged != 0:
+            return newest > logged or artifact != self.log_.artifact_[n]
+        return artifact < newest
+
+    def inputs(self, n):
+        # The arguments of the action shim following the artifact.
+        if self.action_ is None:
+            return None
+        index  = self.index_
+        inputs = [ index.source_path(n) ]
+        for i in index.imports(n):
+            inputs.append(index.interface_path(i))
+        return inputs
+
+    def create_artifacts(self, artifact_dir, work):
+        # Runs in the pool; returns the modules whose artifacts were
+        # created, with the artifacts' times.  Paths are computed before, as the layout keeps the
+        # last directory path computed.
+        os.makedirs(artifact_dir, exist_ok = True)
+        created = [ ]
+        for (n, newest, inputs) in work:
+            pathname = os.path.join(artifact_dir, "m%d.artifact" % (n))
+            if self.options_.arg_verbose:
+                print("Creating '%s'" % (pathname))
+            if inputs is None:
+                os.close(os.open(pathname, os.O_WRONLY | os.O_CREAT, 0o666))
+                os.utime(pathname)
+            else:
+                subprocess.run([ self.action_, pathname ] + inputs,
+                               check = True)
+            created.append((n, newest, os.stat(pathname).st_mtime_ns))
+        return created
+
+    def build(self):
+        # Returns the number of artifacts created.
+        layout = self.index_.layout_
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers = self.options_.arg_jobs) as pool:
+            self.stats_.load(pool)
+
+            futures = [ ]
+            for d in range(0, self.stats_.n_dirs()):
+                lo   = d * layout.files_per_dir_
+                hi   = min(lo + layout.files_per_dir_, len(self.index_))
+                work = [ ]
+                for n in range(lo, hi):
+                    newest = self.newest_input(n)
+                    if self.out_of_date(n, newest):
+                        work.append((n, newest, self.inputs(n)))
+                if len(work) > 0:
+                    futures.append(pool.submit(self.create_artifacts,
+                                               self.stats_.artifact_dir(d),
+                                               work))
+
+            n_created = 0
+            try:
+                for f in concurrent.futures.as_completed(futures):
+                    for (n, newest, artifact) in f.result():
+                        self.log_.times_[n]    = newest
+                        self.log_.artifact_[n] = artifact
+                        n_created += 1
+            finally:
+                # The artifacts created are recorded, even if a batch
+                # fails.
+                if n_created > 0 or not self.log_.exists_:
+                    self.log_.save()
+        return n_created
+
+
+def configure_parser():
+    description = ("""
+  Return Code:
+    0       : success
+    non-zero: failure
+""")
+
+    formatter = argparse.RawDescriptionHelpFormatter
+    parser    = argparse.ArgumentParser(usage           = None,
+                                        formatter_class = formatter,
+                                        description     = description,
+                                        prog            = "pybuild.py")
+
+    parser.add_argument("--index",
+                        help     = ("Graph index written by generate.py "
+                                    "[default: ${BPC_SOURCE}/graph.index]."),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_index")
+
+    parser.add_argument("--bod",
+                        help     = ("Build output directory "
+                                    "[default: ${BPC_BOD}]."),
+                        required = False,
+                        default  = os.environ.get("BPC_BOD"),
+                        action   = "store",
+                        dest     = "arg_bod")
+
+    parser.add_argument("--jobs",
+                        help     = ("Number of batches run at once "
+                                    "[default: ${BPC_PARALLEL}, or 1]."),
+                        required = False,
+                        default  = int(os.environ.get("BPC_PARALLEL", "1")),
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_jobs")
+
+    parser.add_argument("--log",
+                        help     = ("Build log [default: %s in the "
+                                    "BOD]." % (LOG_NAME)),
+                        required = False,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_log")
+
+    parser.add_argument("--verbose",
+                        help     = ("Print each artifact created."),
+                        required = False,
+                        default  = False,
+                        action   = "store_true",
+                        dest     = "arg_verbose")
+
+    parser.add_argument("--version",
+                        help     = ("Print the version of the engine, "
+                                    "and exit."),
+                        required = False,
+                        default  = False,
+                        action   = "store_true",
+                        dest     = "arg_version")
+
+    return parser
+
+
+def get_options():
+    parser  = configure_parser()
+    options = parser.parse_args()
+
+    if options.arg_version:
+        return options
+
+    if options.arg_index is None:
+        src = os.environ.get("BPC_SOURCE")
+        if src is None:
+            parser.error("--index, or BPC_SOURCE, must be set")
+        options.arg_index = os.path.join(src, "graph.index")
+
+    if options.arg_bod is None:
+        parser.error("--bod, or BPC_BOD, must be set")
+    options.arg_bod = os.path.abspath(options.arg_bod)
+
+    if options.arg_log is None:
+        options.arg_log = os.path.join(options.arg_bod, LOG_NAME)
+
+    if options.arg_jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    return options
+
+
+def main():
+    try:
+        options = get_options()
+        if options.arg_version:
+            print(version())
+            return 0
+
+        index = graphindex.Index(options.arg_index)
+        try:
+            n_created = Engine(options, index).build()
+        finally:
+            index.close()
+
+        if n_created == 0:
+            print("pybuild: no work to do.")
+        else:
+            print("pybuild: %d artifacts created." % (n_created))
+
+    except KeyboardInterrupt as exc:
+        print("Ctrl-C interrupt")
+        sys.exit(10)
+
+    except Exception as exc:
+        print("Unhandled exception '%s'" % (str(exc)))
+        raise exc
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -83,9 +83,15 @@ def print_geometry(m):
                                 scale(host["memory-bytes"])))
     print("files/dir   : %s\n"
           "module count: %s\n"
-          "parallelism : %s\n" % (geom["files-per-dir"],
-                                  geom["num-modules"],
-                                  geom["parallelism"]))
+          "parallelism : %s" % (geom["files-per-dir"],
+                                geom["num-modules"],
+                                geom["parallelism"]))
+
+    # Generator options are present only when not defaulted.
+    for key in sorted(geom.keys()):
+        if key not in ("files-per-dir", "num-modules", "parallelism"):
+            print("%-12s: %s" % (key, geom[key]))
+    print("")
 
 
 def print_runs(runs):
@@ -97,6 +103,10 @@ def print_runs(runs):
                r["seconds"],
                scale(r["memory-bytes"]),
                scale(r["bod-size-bytes"])))
+        # Generator runs (see bench_generate.py) include their stages.
+        for (name, stage) in sorted(r.get("stages", { }).items()):
+            print("            %-24s secs: %8.3f" % (name,
+                                                  stage["wall-seconds"]))
     print("")
 
 
@@ -10,10 +10,28 @@ import multiprocessing
 import os
 import platform
 import resource
+import shutil
 import subprocess
 import sys
-import threading
+import tempfile
 import time
+import urllib.request
+
+# Geometry keys and the environment variables, set by 'setup', that
+# supply them.
+GENERATION_OPTIONS = [
+    ("payload",       "BPC_PAYLOAD"),
+    ("topology",      "BPC_TOPOLOGY"),
+    ("max-imports",   "BPC_MAX_IMPORTS"),
+    ("density",       "BPC_DENSITY"),
+    ("import-graph",  "BPC_IMPORT_GRAPH"),
+    ("dir-depth",     "BPC_DIR_DEPTH"),
+    ("fanout",        "BPC_FANOUT"),
+    ("depfile",       "BPC_DEPFILE"),
+    ("action",        "BPC_ACTION"),
+    ("action-passes", "BPC_ACTION_PASSES"),
+]
+
 
 class Metrics(object):
     def __init__(self, metrics_file, tool_name, tool_label):
@@ -50,6 +68,7 @@ class Metrics(object):
             "num-modules"      : int(self.n_modules_),
             "parallelism"      : int(self.parallelism_),
             }
+        self.geometry_dict_.update(self.get_generation_options())
 
         self.tool_dict_ = {
             "label"    : self.tool_label_,
@@ -92,6 +111,18 @@ class Metrics(object):
         else:
             return "<FPD: internal error>"
 
+    def get_generation_options(self):
+        # Generator options that change the generated tree are part
+        # of the geometry.  They are recorded only when set, so that
+        # runs using the defaults continue to match results collected
+        # before the options existed.
+        options = { }
+        for (key, variable) in GENERATION_OPTIONS:
+            value = os.environ.get(variable)
+            if value is not None and len(value) > 0:
+                options[key] = value
+        return options
+
     def get_additional_args(self):
         baa = os.environ.get("BPC_BUILD_ADDITIONAL_ARGS")
         if baa is not None:
@@ -146,6 +177,11 @@ class Metrics(object):
         elif tool_name == "make":
             stdout = self.get_version(["/usr/bin/make", "--version"])
             return stdout[0]
+        elif tool_name == "pybuild":
+            engine = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "pybuild.py")
+            stdout = self.get_version([engine, "--version"])
+            return stdout[0]
         else:
             assert(tool_name == "scons")
             stdout = self.get_version(["/usr/bin/scons", "--version"])
@@ -235,12 +271,67 @@ class build_system(object):
                self.scale(self.disk_space_)))
 
 
+# Bazel's build phases, as named by the markers in its JSON profile,
+# and the metrics they are added to.  Other phases are recorded by
+# name only.
+BAZEL_PHASES = {
+    "Launch Blaze"                  : "server-startup-seconds",
+    "Load and analyze dependencies" : "analysis-seconds",
+    "Analyze licenses"              : "analysis-seconds",
+    "Build artifacts"               : "execution-seconds",
+}
+
+
+def bazel_phases(pathname):
+    # The seconds of each phase of the build profiled in 'pathname'.
+    # Each phase lasts from its marker to the next marker, or to the
+    # end of the profile.
+    with open(pathname, "r") as fp:
+        profile = json.load(fp)
+    if isinstance(profile, dict):
+        events = profile["traceEvents"]
+    else:
+        events = profile
+    end     = max(e.get("ts", 0) + e.get("dur", 0) for e in events)
+    markers = sorted((e["ts"], e["name"]) for e in events
+                     if e.get("cat") == "build phase marker")
+
+    phases = { }
+    for (i, (ts, name)) in enumerate(markers):
+        if i + 1 < len(markers):
+            next_ts = markers[i + 1][0]
+        else:
+            next_ts = end
+        phases[name] = phases.get(name, 0.0) + (next_ts - ts) / 1000000.0
+    return phases
+
+
 class bazel(build_system):
+    # BPC_BAZEL_SERVER selects the state of the Bazel server when the
+    # build starts:
+    #
+    #   fresh : shut down, so the build includes the server's startup.
+    #   warm  : already running.
+    #
+    # Otherwise, the server is left as the previous build left it.
+    # The server is prepared before the build is measured.
     def __init__(self, name, kind):
         super(bazel, self).__init__(name, kind)
-        self.build_complete_  = False
-        self.thread_stopped_  = True
         self.java_daemon_rsz_ = 0
+        self.disk_cache_      = os.environ.get("BPC_BAZEL_DISK_CACHE")
+        self.remote_cache_    = os.environ.get("BPC_BAZEL_REMOTE_CACHE")
+        self.server_mode_     = os.environ.get("BPC_BAZEL_SERVER") or None
+        self.cache_stats_     = None
+        self.phases_          = None
+        if self.server_mode_ not in (None, "fresh", "warm"):
+            raise Exception("BPC_BAZEL_SERVER must be 'fresh' or 'warm', "
+                            "not '%s'" % (self.server_mode_))
+
+    def get_remote_cache_stats(self):
+        # The counts kept by cache_server.py.
+        url = "%s/stats" % (self.remote_cache_)
+        with urllib.request.urlopen(url) as response:
+            return json.load(response)
 
     def set_build_disk_space(self):
         # Bazel writes to these directories.  They are one directory
@@ -273,46 +364,99 @@ class bazel(build_system):
         else:
             return -1           # Invalid PID
 
-    def get_resident_size(self, pid):
-        while not self.build_complete_:
-            time.sleep(5)       # Gather daemon size every 5 seconds.
-
-            pid = self.get_pid("bazel(source)")
-            if pid != -1:
-                # A valid PID found.
-                (stdout,
-                 stderr,
-                 rc,
-                 rusage) = execute_process([ "/usr/bin/ps",
-                                             "-o", "rsz",
-                                             "-p", pid ])
-                if rc == 0:
-                    self.java_daemon_rsz_ = max(self.java_daemon_rsz_,
-                                                int(stdout[1]) * 1024)
-
-            else:
-                # No applicable Java process found, so no need to add
-                # daemon memory consumption.
-                pass
-
-
+    def get_daemon_peak_size(self):
+        # The peak resident size of the Bazel server, from the kernel's
+        # high-water mark, rather than sampled.  A warm server's peak
+        # includes the builds it served before this one.
+        pid = self.get_pid("bazel(source)")
+        if pid == -1:
+            # No applicable Java process found, so no need to add
+            # daemon memory consumption.
+            return 0
+        try:
+            with open("/proc/%s/status" % (pid.split()[0]), "r") as fp:
+                for line in fp:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        except FileNotFoundError:
+            pass
+        return 0
+
+    def bazel_command(self, args):
+        # Run Bazel in the source tree, outside the measured build.
+        # It is found as build-bazel.sh finds it.  A failure is fatal,
+        # as the server would not be in the state recorded.
+        program = shutil.which("bazel")
+        if program is None:
+            raise Exception("'bazel' was not found on PATH")
+        (stdout,
+         stderr,
+         rc,
+         rusage) = execute_process([ program ] + args,
+                                   cwd = os.environ.get("BPC_SOURCE"))
+        if rc != 0:
+            raise Exception("'bazel %s' failed (%d): %s" %
+                            (" ".join(args), rc, "\n".join(stderr)))
+
+    def prepare_server(self):
+        if self.server_mode_ == "fresh":
+            self.bazel_command([ "shutdown" ])
+        elif self.server_mode_ == "warm":
+            # Any command starts the server.
+            self.bazel_command([ "info", "server_pid" ])
 
     def run(self):
-        self.build_complete_ = False
-        thread = threading.Thread(name="java-rsz",
-                                  target=self.get_resident_size,
-                                  args=[self])
-        thread.start()
-        super(bazel, self).run()
-        self.build_complete_ = True
-        thread.join()
+        self.prepare_server()
+        if self.remote_cache_:
+            before = self.get_remote_cache_stats()
+
+        # build-bazel.sh passes BPC_BAZEL_PROFILE to Bazel's --profile.
+        (fd, profile) = tempfile.mkstemp(prefix = "bazel-profile.",
+                                         suffix = ".json")
+        os.close(fd)
+        os.environ["BPC_BAZEL_PROFILE"] = profile
+        try:
+            super(bazel, self).run()
+            if self.rc_ == 0 and os.path.getsize(profile) > 0:
+                self.phases_ = bazel_phases(profile)
+        finally:
+            del os.environ["BPC_BAZEL_PROFILE"]
+            os.unlink(profile)
+
+        self.java_daemon_rsz_ = self.get_daemon_peak_size()
         self.rsz_ += self.java_daemon_rsz_
 
+        if self.remote_cache_:
+            # The counts of this build alone.
+            after = self.get_remote_cache_stats()
+            self.cache_stats_ = {
+                store : { key : after[store][key] - before[store][key]
+                          for key in after[store] }
+                for store in after
+            }
 
-def execute_process(cmd):
+    def metrics(self):
+        metrics = super(bazel, self).metrics()
+        if self.disk_cache_:
+            metrics["disk-cache-bytes"] = \
+                self.get_directory_space(self.disk_cache_)
+        if self.cache_stats_ is not None:
+            metrics["remote-cache"] = self.cache_stats_
+        if self.phases_ is not None:
+            metrics["phases"] = self.phases_
+            for (phase, key) in BAZEL_PHASES.items():
+                metrics[key] = (metrics.get(key, 0.0) +
+                                self.phases_.get(phase, 0.0))
+        if self.server_mode_:
+            metrics["server"] = self.server_mode_
+        return metrics
+
+
+def execute_process(cmd, cwd = None):
     assert(isinstance(cmd, list))
     assert(os.path.exists(cmd[0]))
     p = subprocess.Popen(cmd,
+                         cwd    = cwd,
                          universal_newlines = False,
                          shell  = False,
                          encoding = "utf-8",
@@ -363,7 +507,7 @@ def configure_parser():
                                     "(for determining version)."),
                         required = True,
                         choices  = [ "bash", "bazel", "ninja",
-                                     "make", "scons" ],
+                                     "make", "pybuild", "scons" ],
                         action   = "store",
                         dest     = "arg_tool")
 
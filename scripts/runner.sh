@@ -12,7 +12,7 @@ set -o errexit;
 SCRIPT="${BASH_SOURCE[0]}"
 SRC_DIR=$(dirname "${SCRIPT}");
 
-ALL_TOOLS="bash bazel make ninja scons"; # All tools to test.
+ALL_TOOLS="bash bazel make ninja pybuild scons"; # All tools to test.
 
 
 function run_bash ()
@@ -24,6 +24,22 @@ function run_bash ()
         ${RUN} --metrics "${METRICS}" --tool bash --name bash --kind incremental;
         ${RUN} --metrics "${METRICS}" --tool bash --name bash --kind NULL;
     );
+
+    (
+        echo -e "\nBash: parallel";
+        ${RUN} --metrics "${METRICS}" --tool bash --name parallel-bash --tool-label bash-parallel --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool bash --name parallel-bash --tool-label bash-parallel --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool bash --name parallel-bash --tool-label bash-parallel --kind NULL;
+    );
+
+    (
+        echo -e "\nBash: modification times read once";
+        ${RUN} --metrics "${METRICS}" --tool bash --name mtime-bash --tool-label bash-mtime --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool bash --name mtime-bash --tool-label bash-mtime --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool bash --name mtime-bash --tool-label bash-mtime --kind NULL;
+    );
 }
 
 
@@ -39,6 +55,27 @@ function run_ninja ()
 }
 
 
+function run_split_ninja ()
+{
+    (
+        echo -e "\nNinja: split";
+        ${RUN} --metrics "${METRICS}" --tool ninja --name split-ninja --tool-label ninja-split --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool ninja --name split-ninja --tool-label ninja-split --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool ninja --name split-ninja --tool-label ninja-split --kind NULL;
+    );
+
+    (
+        echo -e "\nNinja: split, restat";
+        export BPC_NINJA_RESTAT=1;
+        ${RUN} --metrics "${METRICS}" --tool ninja --name split-ninja --tool-label ninja-split-restat --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool ninja --name split-ninja --tool-label ninja-split-restat --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool ninja --name split-ninja --tool-label ninja-split-restat --kind NULL;
+    );
+}
+
+
 function run_bazel ()
 {
     (
@@ -51,6 +88,86 @@ function run_bazel ()
 }
 
 
+function run_bazel_server ()
+{
+    (
+        echo -e "\nBazel: fresh server";
+        export BPC_BAZEL_SERVER=fresh;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-fresh-server --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-fresh-server --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-fresh-server --kind NULL;
+    );
+
+    (
+        echo -e "\nBazel: warm server";
+        export BPC_BAZEL_SERVER=warm;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-warm-server --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-warm-server --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-warm-server --kind NULL;
+    );
+}
+
+
+function run_bazel_disk_cache ()
+{
+    local cache=$(mktemp --directory);
+
+    (
+        echo -e "\nBazel: disk cache";
+        export BPC_BAZEL_DISK_CACHE="${cache}";
+        # The first full build fills the cache.  The next starts from
+        # a fresh tree and output base, and is served from the cache.
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-disk-cache-cold --kind full;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-disk-cache --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-disk-cache --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-disk-cache --kind NULL;
+    );
+
+    rm -rf "${cache}";
+}
+
+
+function run_bazel_remote_cache ()
+{
+    local cache=$(mktemp --directory);
+    local pid;
+
+    ${SRC_DIR}/cache_server.py                  \
+        --root "${cache}/entries"               \
+        --port-file "${cache}/port" >/dev/null &
+    pid=$!;
+    while [ ! -f "${cache}/port" ] && kill -0 ${pid} 2>/dev/null ; do
+        sleep 0.1;
+    done;
+
+    if [ ! -f "${cache}/port" ] ; then
+        # The server exited before listening.
+        echo -e "\nBazel remote cache server did not start; testing skipped.\n";
+        wait ${pid} || true;
+        rm -rf "${cache}";
+        return 0;
+    fi;
+
+    (
+        echo -e "\nBazel: remote cache";
+        export BPC_BAZEL_REMOTE_CACHE="http://127.0.0.1:$(cat ${cache}/port)";
+        # As for the disk cache, the first full build fills the cache.
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-remote-cache-cold --kind full;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-remote-cache --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-remote-cache --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool bazel --name bazel --tool-label bazel-remote-cache --kind NULL;
+    );
+
+    kill ${pid} 2>/dev/null || true;
+    wait ${pid} || true;
+    rm -rf "${cache}";
+}
+
+
 function run_recursive_make ()
 {
     (
@@ -98,6 +215,31 @@ function run_single_make ()
 }
 
 
+function run_pattern_make ()
+{
+    (
+        export BPC_BUILD_ADDITIONAL_ARGS="";
+        echo -e "\nPattern Make";
+        ${RUN} --metrics "${METRICS}" --tool make --name pattern-make --tool-label pattern-make --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool make --name pattern-make --tool-label pattern-make --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool make --name pattern-make --tool-label pattern-make --kind NULL;
+    );
+}
+
+
+function run_pybuild ()
+{
+    (
+        echo -e "\nPybuild";
+        ${RUN} --metrics "${METRICS}" --tool pybuild --name pybuild --tool-label pybuild --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool pybuild --name pybuild --tool-label pybuild --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool pybuild --name pybuild --tool-label pybuild --kind NULL;
+    );
+}
+
+
 function run_md5sum_scons ()
 {
     (
@@ -122,13 +264,71 @@ function run_make_scons ()
 }
 
 
+function run_split_scons ()
+{
+    (
+        export BPC_BUILD_ADDITIONAL_ARGS="";
+        echo -e "\nScons: split";
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split --kind NULL;
+    );
+
+    (
+        export BPC_BUILD_ADDITIONAL_ARGS="--max-drift=1";
+        echo -e "\nScons: split, ${BPC_BUILD_ADDITIONAL_ARGS}";
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-max-drift --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-max-drift --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-max-drift --kind NULL;
+    );
+
+    (
+        export BPC_BUILD_ADDITIONAL_ARGS="";
+        export SCONS_DECIDER="make";
+        echo -e "\nScons: split, make";
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-make --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-make --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-make --kind NULL;
+    );
+
+    (
+        export BPC_BUILD_ADDITIONAL_ARGS="";
+        export SCONS_DECIDER="timestamp-match";
+        echo -e "\nScons: split, timestamp-match";
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-timestamp-match --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-timestamp-match --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-timestamp-match --kind NULL;
+    );
+
+    (
+        export BPC_BUILD_ADDITIONAL_ARGS="--max-drift=1 --implicit-deps-unchanged";
+        export SCONS_DECIDER="timestamp-match";
+        export SCONS_IMPLICIT_CACHE=1;
+        echo -e "\nScons: split, timestamp-match, implicit cache, ${BPC_BUILD_ADDITIONAL_ARGS}";
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-tuned --kind full;
+        ${SRC_DIR}/modify-most-used-interface.sh >/dev/null;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-tuned --kind incremental;
+        ${RUN} --metrics "${METRICS}" --tool scons --name split-scons --tool-label scons-split-tuned --kind NULL;
+    );
+}
+
+
 function enabled ()
 {
     local tool="${1}";
+    local program="${tool}";
+
+    if [ "${tool}" == "pybuild" ] ; then
+        program="python3";      # Pybuild is in this repository.
+    fi;
 
     if [[ ${TOOLS_TO_MEASURE} == *${tool}* ]] ; then
         # ${tool} enabled.
-        if [ $(which "${tool}") ] ; then
+        if [ $(which "${program}") ] ; then
             return 0;           # Tool found on path.
         fi;
         return 1;               # Tool not found in path.
@@ -166,12 +366,16 @@ function build_all ()
 
     if enabled "ninja"; then
         run_ninja;
+        run_split_ninja;
     else
         echo -e "\nNinja not enabled or not found; testing skipped.\n"
     fi;
 
     if enabled "bazel"; then
         run_bazel;
+        run_bazel_server;
+        run_bazel_disk_cache;
+        run_bazel_remote_cache;
     else
         echo -e "\nBazel not enabled or not found; testing skipped.\n"
     fi;
@@ -179,13 +383,21 @@ function build_all ()
     if enabled "make"; then
         run_recursive_make;
         run_single_make;
+        run_pattern_make;
     else
         echo -e "\nMake not enabled or not found; testing skipped.\n"
     fi;
 
+    if enabled "pybuild"; then
+        run_pybuild;
+    else
+        echo -e "\nPybuild not enabled or not found; testing skipped.\n"
+    fi;
+
     if enabled "scons"; then
         run_md5sum_scons;
         run_make_scons;
+        run_split_scons;
     else
         echo -e "\nScons not enabled or not found; testing skipped.\n"
     fi;
@@ -231,13 +443,14 @@ function process_args ()
                 cat <<EOF
 This program runs measurements for one or more build tools.
 
-  --all   : Measure all tools.
-  --bash  : Measure runs with Bash.
-  --bazel : Measure runs using Bazel.
-  --make  : Measure runs with Gnu Make.
-  --ninja : Measure runs with Ninja.
-  --scons : Measure runs with Scons.
-  -h      : The help message.
+  --all     : Measure all tools.
+  --bash    : Measure runs with Bash.
+  --bazel   : Measure runs using Bazel.
+  --make    : Measure runs with Gnu Make.
+  --ninja   : Measure runs with Ninja.
+  --pybuild : Measure runs with the reference engine, pybuild.py.
+  --scons   : Measure runs with Scons.
+  -h        : The help message.
 
   If no argument is supplied, '--all' is used.
 EOF
@@ -269,6 +482,11 @@ EOF
                 shift 1;
                 ;;
 
+            --pybuild)
+                export TOOLS_TO_MEASURE="pybuild ${TOOLS_TO_MEASURE}"
+                shift 1;
+                ;;
+
             --scons)
                 export TOOLS_TO_MEASURE="scons ${TOOLS_TO_MEASURE}"
                 shift 1;
@@ -317,7 +535,7 @@ function main ()
     fi;
 }
 
-args=$(/usr/bin/getopt -o h --longoptions help,all,bash,bazel,make,ninja,scons -- "${@}")
+args=$(/usr/bin/getopt -o h --longoptions help,all,bash,bazel,make,ninja,pybuild,scons -- "${@}")
 set -- "${args}"            # Set postional args to ${args}.
 unset args;
 
@@ -0,0 +1,255 @@
+#!/usr/bin/python3 -B
+# Copyright (c) 2025  Logic Magicians Software.
+# All Rights Reserved.
+# Licensed under Gnu GPL V3.
+#
+#  Generates a source tree through a cache of snapshots of generated
+#  trees.  The arguments after '--' are those of generate.py.  When a
+#  snapshot generated with the same arguments exists, it is restored
+#  in place of running the generator; otherwise, the generator is run
+#  and a snapshot of its tree is saved.
+#
+#  A snapshot is keyed by a digest of:
+#
+#    . the generation parameters recorded in the tree's manifest
+#      (seed, number of modules, files per directory, ...),
+#    . the source root and the BOD, as the build processes refer to
+#      both by absolute path,
+#    . the content of the --import-graph file, if any, and
+#    . the generator's version (a digest of its sources).
+#
+#  Trees are copied by the fastest method that works: a reflink copy
+#  (blocks shared copy-on-write), hard links, or a tar stream.  A
+#  hard linked tree shares its files with the snapshot, so anything
+#  that changes a file in the tree must replace it rather than write
+#  over it.  The generator (with --incremental) and
+#  modify-most-used-interface.sh do so.
+#
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "generator"))
+
+import generate
+import version
+
+GENERATE = os.path.realpath(os.path.join(SCRIPT_DIR, "..",
+                                         "generator", "generate.py"))
+METHODS  = [ "reflink", "hardlink", "tar" ]
+
+
+def configure_parser():
+    description = ("""
+  Return Code:
+    0       : success
+    non-zero: failure
+""")
+
+    formatter = argparse.RawDescriptionHelpFormatter
+    parser    = argparse.ArgumentParser(usage           = None,
+                                        formatter_class = formatter,
+                                        description     = description,
+                                        prog            = "tree_cache.py")
+
+    parser.add_argument("--cache",
+                        help     = ("Directory holding the snapshots."),
+                        required = True,
+                        default  = None,
+                        action   = "store",
+                        dest     = "arg_cache")
+
+    parser.add_argument("--keep",
+                        help     = ("Number of snapshots kept; the least "
+                                    "recently used are removed "
+                                    "[default: %(default)s]."),
+                        required = False,
+                        default  = 2,
+                        action   = "store",
+                        type     = int,
+                        dest     = "arg_keep")
+
+    parser.add_argument("--method",
+                        help     = ("Method used to copy trees.  'auto' "
+                                    "uses the first of %s that works "
+                                    "[default: %%(default)s]." %
+                                    (", ".join(METHODS))),
+                        required = False,
+                        default  = "auto",
+                        choices  = [ "auto" ] + METHODS,
+                        action   = "store",
+                        dest     = "arg_method")
+
+    parser.add_argument("arg_tail",
+                        help    = "generate.py arguments.",
+                        nargs = "*")
+
+    return parser
+
+
+def get_options():
+    parser  = configure_parser()
+    options = parser.parse_args()
+
+    options.arg_cache  = os.path.abspath(options.arg_cache)
+    options.generator_ = generate.get_options(options.arg_tail)
+    if options.generator_.arg_incremental:
+        parser.error("an --incremental generation cannot be cached")
+    if options.arg_keep < 1:
+        parser.error("--keep must be at least 1")
+
+    return options
+
+
+def file_digest(pathname):
+    h = hashlib.sha1()
+    with open(pathname, "rb") as fp:
+        for block in iter(lambda: fp.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def snapshot_key(options):
+    # Returns the key and a description of it.
+    gen = options.generator_
+    description = {
+        "bod"        : os.path.abspath(os.environ.get("BPC_BOD", "")),
+        "generator"  : version.source_digest(),
+        "parameters" : generate.generation_parameters(gen),
+        "root"       : os.path.abspath(gen.arg_root),
+    }
+    if gen.arg_import_graph is not None:
+        pathname = gen.arg_import_graph.partition(":")[2]
+        description["import-graph"] = file_digest(pathname)
+    text = json.dumps(description, sort_keys = True)
+    return (hashlib.sha1(text.encode()).hexdigest(), description)
+
+
+def probe(flag, src, dst):
+    # Whether 'cp' can copy files from the tree 'src' to the
+    # directory of 'dst' with 'flag'.  A copy of a tree that fails
+    # does so file by file, so one file is tried first.
+    sample = os.path.join(src, "manifest.json")
+    temp   = "%s.probe" % (dst)
+    rc     = subprocess.call([ "cp", flag, sample, temp ],
+                             stderr = subprocess.DEVNULL)
+    if os.path.exists(temp):
+        os.unlink(temp)
+    return rc == 0
+
+
+def copy_method(options, method, src, dst):
+    # Copy the tree 'src' to 'dst', which must not exist.  Returns
+    # False if 'method' is not supported here.
+    if method in ("reflink", "hardlink"):
+        flag = { "reflink" : "--reflink=always", "hardlink" : "--link" }[method]
+        if not probe(flag, src, dst):
+            if options.arg_method != "auto":
+                raise Exception("copying '%s' to '%s' by %s is not "
+                                "supported" % (src, dst, method))
+            return False
+        cmd = [ "cp", "--archive", flag, src, dst ]
+    else:
+        assert(method == "tar")
+        os.makedirs(dst)
+        # The pax format keeps modification times to the nanosecond,
+        # which the generator's manifest compares.
+        cmd = [ "/bin/bash", "-c",
+                "set -o pipefail; "
+                "tar --format=posix -C \"%s\" -cf - . | "
+                "tar -C \"%s\" -xf -" % (src, dst) ]
+
+    rc = subprocess.call(cmd, stderr = subprocess.DEVNULL)
+    if rc != 0:
+        shutil.rmtree(dst, ignore_errors = True)
+        if method == "tar" or options.arg_method != "auto":
+            raise Exception("copying '%s' to '%s' by %s failed" %
+                            (src, dst, method))
+    return rc == 0
+
+
+def copy_tree(options, src, dst):
+    # Returns the method used.
+    if options.arg_method == "auto":
+        methods = METHODS
+    else:
+        methods = [ options.arg_method ]
+    for method in methods:
+        if copy_method(options, method, src, dst):
+            return method
+    assert(False)               # 'tar' succeeds or raises.
+
+
+def evict(options, keep):
+    # Remove all but the 'keep' most recently used snapshots.
+    snapshots = [ ]
+    for name in os.listdir(options.arg_cache):
+        key = os.path.join(options.arg_cache, name, "key.json")
+        if os.path.exists(key):
+            snapshots.append((os.stat(key).st_mtime, name))
+    for (mtime, name) in sorted(snapshots, reverse = True)[keep:]:
+        print("Removing snapshot %s." % (name))
+        shutil.rmtree(os.path.join(options.arg_cache, name),
+                      ignore_errors = True)
+
+
+def restore(options, snapshot):
+    root  = options.generator_.arg_root
+    start = time.perf_counter()
+    shutil.rmtree(root, ignore_errors = True)
+    method = copy_tree(options, os.path.join(snapshot, "tree"), root)
+    os.utime(os.path.join(snapshot, "key.json")) # Most recently used.
+    print("Restored '%s' from snapshot %s by %s (%.3f seconds)." %
+          (root, os.path.basename(snapshot), method,
+           time.perf_counter() - start))
+
+
+def save(options, snapshot, description):
+    # The snapshot is written under a temporary name, so an
+    # interrupted save leaves no snapshot.
+    root  = options.generator_.arg_root
+    temp  = "%s.%d.tmp" % (snapshot, os.getpid())
+    start = time.perf_counter()
+    os.makedirs(temp)
+    method = copy_tree(options, root, os.path.join(temp, "tree"))
+    with open(os.path.join(temp, "key.json"), "w") as fp:
+        json.dump(description, fp, indent = 2, sort_keys = True)
+    os.rename(temp, snapshot)
+    print("Saved snapshot %s by %s (%.3f seconds)." %
+          (os.path.basename(snapshot), method, time.perf_counter() - start))
+
+
+def main():
+    try:
+        options = get_options()
+        (key, description) = snapshot_key(options)
+        snapshot = os.path.join(options.arg_cache, key)
+        os.makedirs(options.arg_cache, exist_ok = True)
+
+        if os.path.isdir(snapshot):
+            restore(options, snapshot)
+        else:
+            rc = subprocess.call([ GENERATE ] + options.arg_tail)
+            if rc != 0:
+                return rc
+            evict(options, options.arg_keep - 1)
+            save(options, snapshot, description)
+
+    except KeyboardInterrupt as exc:
+        print("Ctrl-C interrupt")
+        sys.exit(10)
+
+    except Exception as exc:
+        print("Unhandled exception '%s'" % (str(exc)))
+        raise exc
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())